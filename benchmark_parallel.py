@@ -0,0 +1,51 @@
+import argparse
+import os
+
+import numpy as np
+
+from mnk.Agent import Agent
+from mnk.benchmark import CIRCLE_OF_ONE, timed_move
+
+# (board side, winning size, stones as (cell, player)), opening positions around the centre
+POSITIONS = [
+    (6, 4, [(14, 0), (15, 1), (21, 0)]),
+    (8, 5, [(27, 0), (28, 1), (36, 0), (35, 1)]),
+    (10, 5, [(44, 0), (45, 1), (55, 0), (54, 1), (34, 0)]),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs parallel search time per move, for a range of worker counts")
+    parser.add_argument("--mode", choices=["root", "lazy_smp"], default="root")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--depths", type=int, nargs="+", default=[3, 4, 5])
+    parser.add_argument("--engine", default="bitboard")
+    parser.add_argument("--tt-size-mb", type=float, default=0, help="Transposition table size (lazy_smp uses 16 MB if 0)")
+    args = parser.parse_args()
+
+    print(f"mode={args.mode} engine={args.engine} cores={os.cpu_count()}")
+    print(f"{'board':>7} {'depth':>5} {'workers':>7} {'time s':>8} {'speedup':>7} {'nodes':>9}  same move")
+    for side, winning_size, stones in POSITIONS:
+        board = np.full(side * side, -1, dtype=np.int32)
+        for cell, player in stones:
+            board[cell] = player
+        player_to_move = len(stones) % 2
+        for depth in args.depths:
+            options = dict(player_number=player_to_move, board_size=(side, side), winning_size=winning_size, scoring_array=[],
+                           circle_of_two=CIRCLE_OF_ONE, depth=depth, engine=args.engine, tt_size_mb=args.tt_size_mb)
+            serial_agent = Agent(**options)
+            serial_move, serial_time = timed_move(serial_agent, board)
+            print(f"{side:>3}x{side:<3} {depth:>5} {1:>7} {serial_time:>8.3f} {1:>6.2f}x {serial_agent.states_evaluated:>9}")
+            for workers in args.workers:
+                parallel_agent = Agent(workers=workers, parallel=args.mode, **options)
+                try:
+                    # Start the pool outside the timing; its workers search nothing before the timed move
+                    parallel_agent.start_workers()
+                    parallel_move, parallel_time = timed_move(parallel_agent, board)
+                finally:
+                    parallel_agent.close()
+                print(f"{'':>7} {'':>5} {workers:>7} {parallel_time:>8.3f} {serial_time / parallel_time:>6.2f}x {parallel_agent.states_evaluated:>9}  {serial_move == parallel_move}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+
+import numpy as np
+
+from mnk.Agent import Agent
+from mnk.Game import Game
+from mnk.benchmark import CIRCLE_OF_ONE, play_out, timed_move
+from mnk.constants import EMPTY, NOONE
+
+# (board side, winning size, stones as (cell, player)), opening positions around the centre
+POSITIONS = [
+    (8, 5, [(27, 0), (28, 1), (36, 0), (35, 1)]),
+    (10, 5, [(44, 0), (45, 1), (55, 0), (54, 1), (34, 0)]),
+    (12, 5, [(66, 0), (67, 1), (79, 0), (78, 1), (57, 0), (54, 1)]),
+]
+
+# Match openings as (dx, dy, player) offsets from the centre; each is played once with each colour
+OPENINGS = [
+    [(0, 0, 0), (1, 0, 1)],
+    [(0, 0, 0), (1, 1, 1)],
+    [(0, 0, 0), (0, 1, 1), (1, 1, 0)],
+    [(0, 0, 0), (2, 0, 1), (1, 1, 0), (-1, 1, 1)],
+]
+
+
+def board_from_stones(side, stones):
+    board = np.full(side * side, EMPTY, dtype=np.int32)
+    for cell, player in stones:
+        board[cell] = player
+    return board
+
+
+def play_game(agents, board):
+    """Play a game between agents (player 0, player 1) from board; returns the winner, NOONE for a draw."""
+    game = Game(agents[0].board_size, agents[0].winning_size, end_turn_print=False)
+    game.board = board.copy()
+    game.player_turn = int(np.count_nonzero(board != EMPTY)) % 2
+    game.agents = agents
+    for agent in agents:
+        agent.forget()
+        agent.set_game(game)
+    play_out(game)
+    return game.winner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Late-move reductions and futility pruning against the unreduced search: "
+                                                 "depth reached in a fixed time, time to each depth, and match results")
+    parser.add_argument("--lmr", type=int, default=3, help="late_move_reductions of the selective agents")
+    parser.add_argument("--futility-margin", type=float, default=0.2, help="futility_margin of the selective agents")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="Seconds per move, for the depth reached and the matches")
+    parser.add_argument("--depths", type=int, nargs="+", default=[4, 5, 6])
+    parser.add_argument("--engine", default="bitboard")
+    parser.add_argument("--tt-size-mb", type=float, default=16)
+    parser.add_argument("--board", type=int, default=9, help="Board side of the matches")
+    parser.add_argument("--winning-size", type=int, default=5, help="Winning size of the matches")
+    parser.add_argument("--no-games", action="store_true", help="Only measure search speed")
+    args = parser.parse_args()
+
+    configs = {
+        "unreduced": {},
+        "lmr": {"late_move_reductions": args.lmr},
+        "futility": {"futility_margin": args.futility_margin},
+        "lmr+futility": {"late_move_reductions": args.lmr, "futility_margin": args.futility_margin},
+    }
+
+    def make_agent(player_number, side, winning_size, depth, time_limit, options):
+        return Agent(player_number=player_number, board_size=(side, side), winning_size=winning_size, scoring_array=[],
+                     circle_of_two=CIRCLE_OF_ONE, depth=depth, engine=args.engine, tt_size_mb=args.tt_size_mb,
+                     time_limit=time_limit, **options)
+
+    print(f"engine={args.engine} tt_size_mb={args.tt_size_mb} lmr={args.lmr} futility_margin={args.futility_margin}")
+    depth_columns = " ".join(f"{f'd{depth} s':>7}" for depth in args.depths)
+    print(f"{'board':>7} {'config':>13} {depth_columns} {f'depth in {args.time_limit:g}s':>13} {'depth/s':>8} {'nodes/s':>8}")
+    for side, winning_size, stones in POSITIONS:
+        board = board_from_stones(side, stones)
+        player_to_move = len(stones) % 2
+        for name, options in configs.items():
+            times = []
+            for depth in args.depths:
+                times.append(timed_move(make_agent(player_to_move, side, winning_size, depth, float("inf"), options), board)[1])
+            agent = make_agent(player_to_move, side, winning_size, 64, args.time_limit, options)
+            elapsed = timed_move(agent, board)[1]
+            depth_reached = agent.completed_depth_in_last_move
+            print(f"{side:>3}x{side:<3} {name:>13} " + " ".join(f"{seconds:>7.3f}" for seconds in times) +
+                  f" {depth_reached:>13} {depth_reached / elapsed:>8.2f} {agent.states_evaluated / elapsed:>8.0f}")
+
+    if args.no_games:
+        return
+    side, winning_size = args.board, args.winning_size
+    centre_x, centre_y = side // 2, side // 2
+    print(f"\nMatches on {side}x{side} k={winning_size}, {args.time_limit:g}s per move, "
+          f"{len(OPENINGS)} openings played with each colour")
+    print(f"{'config':>13} {'wins':>5} {'draws':>5} {'losses':>6} {'score':>6}")
+    for name, options in configs.items():
+        if not options:
+            continue
+        wins = draws = losses = 0
+        for opening in OPENINGS:
+            board = board_from_stones(side, [((centre_y + dy) * side + centre_x + dx, player) for dx, dy, player in opening])
+            for selective_player in (0, 1):
+                agents = [None, None]
+                agents[selective_player] = make_agent(selective_player, side, winning_size, 64, args.time_limit, options)
+                agents[1 - selective_player] = make_agent(1 - selective_player, side, winning_size, 64, args.time_limit, {})
+                winner = play_game(agents, board)
+                if winner == NOONE:
+                    draws += 1
+                elif winner == selective_player:
+                    wins += 1
+                else:
+                    losses += 1
+        print(f"{name:>13} {wins:>5} {draws:>5} {losses:>6} {(wins + 0.5 * draws) / (wins + draws + losses):>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
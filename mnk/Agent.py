@@ -2,11 +2,73 @@ import random
 import numpy as np
 import time
 
-from mnk.constants import EMPTY, NOONE, MAX_TIME
+from mnk.bitboard import BitBoard
+from mnk.book import OpeningBook
+from mnk.constants import DEADLINE_CHECK_NODES, EMPTY, FUTILITY_DEPTH, LMR_MIN_DEPTH, LMR_REDUCTION, NOONE, MAX_TIME, NULL_WINDOW
+from mnk.frontier import Frontier
+from mnk.mcts import MCTS_BATCH_SIZE, MCTS_PLAYOUTS, MCTSSearch
+from mnk.ordering import MoveOrderer
+from mnk.parallel import LazySMPSearch, RootSplitSearch
+from mnk.pns import ProofNumberSearch
+from mnk.profiling import Profiler
+from mnk.rules import is_winning_move
+from mnk.stats import SearchStats, instrument
+from mnk.symmetry import inverse_permutations, symmetric_hashes, symmetry_group, unique_moves
+from mnk.tablebase import Tablebase
+from mnk.threats import ThreatSearch
+from mnk.transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable, zobrist_hash, zobrist_keys
+from mnk.windows import WindowTracker, count_windows_batch, window_indices
+
+class SearchTimeout(Exception):
+    """Raised inside minimax when the per-move deadline has passed, to abandon the current iteration."""
+
 
 class Agent:
-    def __init__(self, player_number, board_size, winning_size, scoring_array, circle_of_two, name="Agent", depth=3): # Added depth parameter with default
-        """Initialize the agent with game parameters"""
+    def __init__(self, player_number, board_size, winning_size, scoring_array, circle_of_two, name="Agent", depth=3, engine="array", tt_size_mb=0, time_limit=MAX_TIME, move_ordering=True, symmetry_plies=0, workers=1, parallel="root", tablebase=None, opening_book=None, book_exit_ply=None, threat_search_nodes=0, strategy="minimax", mcts_playouts=MCTS_PLAYOUTS, mcts_batch_size=MCTS_BATCH_SIZE, pvs=True, aspiration_window=0, late_move_reductions=0, futility_margin=0, search_stats=False, stats_callback=None, verbose=True, profile=None): # Added depth parameter with default
+        """Initialize the agent with game parameters.
+        depth: deepest iteration of the iterative-deepening search.
+        time_limit: seconds per move; the search returns the best move of the last iteration completed in time.
+        engine: "array" searches on int32 board copies, "bitboard" on a pair of Python int bitmasks (see mnk/bitboard.py).
+        tt_size_mb: memory cap of the transposition table in megabytes; 0 searches without one.
+        move_ordering: order moves by PV/TT move, immediate wins, blocks, killers and history (see mnk/ordering.py).
+                       When False, moves are searched in board-index order with only the PV/TT move first.
+        symmetry_plies: if > 0, use the board's rotations/reflections (see mnk/symmetry.py): transposition table keys
+                        are canonical, and at plies below symmetry_plies (0 is the root) only one move of each
+                        symmetric set is searched. 0 disables symmetry handling.
+        workers: if > 1, search with this many processes (see mnk/parallel.py), each with its own copy of this agent.
+                 The pool starts on the first move and lasts until forget() or close().
+        parallel: how workers split the search. "root" searches the root moves of every iteration in parallel;
+                  "lazy_smp" runs the whole iterative deepening in every worker with slightly different root orders
+                  and starting depths, sharing one transposition table in shared memory (tt_size_mb, 16 MB if 0),
+                  and plays the deepest completed result.
+        tablebase: path of a tablebase file for this board (see mnk/tablebase.py), or an open Tablebase. Positions it
+                   covers are played perfectly from the table without searching.
+        opening_book: path of an opening book for this board (see mnk/book.py), or an open OpeningBook. While fewer than
+                      book_exit_ply stones are on the board (default: the ply the book was built to), book moves are played
+                      without searching.
+        threat_search_nodes: if > 0, look for a forced win by continuous k-1 threats (see mnk/threats.py) before
+                             searching, visiting at most this many nodes, and play it if there is one. 0 disables it.
+        strategy: "minimax" (iterative-deepening alpha-beta) or "mcts" (Monte Carlo tree search with batched random
+                  playouts, see mnk/mcts.py): each move plays mcts_playouts playouts, mcts_batch_size at a time, or
+                  stops at time_limit.
+        pvs: search every move after the first with a null window first (principal variation search, see negamax).
+        aspiration_window: if > 0, search the root from depth 3 on with the window (value - aspiration_window,
+                           value + aspiration_window) around the value two iterations back, and again with an open
+                           window on the failing side if the result falls outside it. 0 searches with the full window.
+                           Values move in steps of 0.1, so 0.25 admits two steps either way.
+        late_move_reductions: if > 0, at nodes with at least LMR_MIN_DEPTH plies left, moves after the first
+                              late_move_reductions that neither win nor block a win are searched LMR_REDUCTION plies
+                              shallower with a null window, and again at full depth if they beat alpha. 0 disables it.
+        futility_margin: if > 0, at nodes with at most FUTILITY_DEPTH plies left whose static value plus
+                         futility_margin per ply left cannot reach alpha, moves after the first that neither win nor
+                         block a win are skipped. The opponent must have no winning cell. 0 disables it.
+        search_stats: also count leaves, terminal hits and nodes per ply, and time move generation, terminal checks and
+                      evaluation, in last_search_stats (see mnk/stats.py). Off, the search runs without any of it.
+        stats_callback: called with the SearchStats of every move, once the move is chosen.
+        verbose: print a line describing each move (its source, value, depth and speed).
+        profile: a Profiler (see mnk/profiling.py), or its mode ("sample" or "deterministic") for a new one, that every
+                 get_next_move is profiled into, including the searches of worker processes. None does not profile.
+        """
         self.player_number = player_number
         self.board_size = tuple(board_size) if isinstance(board_size, list) else board_size if isinstance(board_size, tuple) else (board_size, board_size)
         self.winning_size = winning_size
@@ -14,6 +76,14 @@ class Agent:
         self.name = name
         self.circle_of_two = circle_of_two
         self.search_depth = depth # Store depth as an instance variable
+        self.time_limit = time_limit
+        self.pvs = pvs
+        self.aspiration_window = aspiration_window
+        self.late_move_reductions = late_move_reductions
+        self.futility_margin = futility_margin
+        self.stats_callback = stats_callback
+        self.verbose = verbose
+        self.profiler = Profiler(profile) if isinstance(profile, str) else profile
 
         # Initialize memory
         self.memory = {
@@ -23,6 +93,10 @@ class Agent:
             "last_move_played": None
         }
         self.game = None  # Will be set when added to a game
+        # Search state of the game's current position, kept from the last search and updated by move_played.
+        # root_key is the (game.board_version, game.moves_played) it matches; None when it matches nothing.
+        self.root_state = None
+        self.root_key = None
 
         # Store directions as flattened array like in Mojo
         self.directions = np.array([
@@ -32,10 +106,86 @@ class Agent:
             1, -1,  # up-right
         ], dtype=np.int32)
 
-        # Debug counters (optional, but can be useful)
+        # Flat indices of every k-window on the board, shared by all agents playing this (m, n, k)
+        self.windows = window_indices(self.board_size[0], self.board_size[1], self.winning_size)
+        # Per-window occupancy of the position being searched, kept in sync by minimax on every ply
+        self.tracker = WindowTracker(self.board_size[0], self.board_size[1], self.winning_size)
+        # Candidate moves of the position being searched, kept in sync the same way
+        self.frontier = Frontier(self.board_size[0], self.board_size[1], circle_of_two)
+
+        if engine not in ("array", "bitboard"):
+            raise ValueError(f"Unknown engine {engine!r}, expected 'array' or 'bitboard'")
+        self.engine = engine
+        self.bitboard = BitBoard(self.board_size[0], self.board_size[1], self.winning_size, circle_of_two) if engine == "bitboard" else None
+
+        # Zobrist keys for the incrementally maintained position hash; the table persists across the moves of a game
+        self.zobrist = zobrist_keys(self.board_size[0] * self.board_size[1])
+        self.transposition_table = TranspositionTable(int(tt_size_mb * 1024 * 1024)) if tt_size_mb else None
+        self.orderer = MoveOrderer(self.board_size[0] * self.board_size[1], max_ply=depth + 2) if move_ordering else None
+        self.iteration_nodes = [] # Nodes searched by each iteration of the last move, for the branching factor
+
+        # Symmetries that map the board and the circle_of_two neighbourhood onto themselves
+        self.symmetry_plies = symmetry_plies
+        self.symmetries = symmetry_group(self.board_size[0], self.board_size[1], circle_of_two) if symmetry_plies else None
+        self.symmetry_inverses = inverse_permutations(self.symmetries) if symmetry_plies else None
+
+        if isinstance(tablebase, str):
+            tablebase = Tablebase(tablebase)
+        if tablebase is not None and not tablebase.matches(self.board_size, winning_size):
+            raise ValueError(f"Tablebase {tablebase.path} is for {tablebase.width}x{tablebase.height} k={tablebase.winning_size}, "
+                             f"not {self.board_size[0]}x{self.board_size[1]} k={winning_size}")
+        self.tablebase = tablebase
+        if isinstance(opening_book, str):
+            opening_book = OpeningBook(opening_book)
+        if opening_book is not None and not opening_book.matches(self.board_size, winning_size):
+            raise ValueError(f"Opening book {opening_book.path} is for {opening_book.width}x{opening_book.height} k={opening_book.winning_size}, "
+                             f"not {self.board_size[0]}x{self.board_size[1]} k={winning_size}")
+        self.opening_book = opening_book
+        self.book_exit_ply = book_exit_ply if book_exit_ply is not None else opening_book.exit_ply if opening_book is not None else 0
+        self.threat_search_nodes = threat_search_nodes
+        self.threat_search = ThreatSearch(self.board_size[0], self.board_size[1], winning_size) if threat_search_nodes else None
+        self.proof_search = None # ProofNumberSearch of solve(), created on first use
+
+        if strategy not in ("minimax", "mcts"):
+            raise ValueError(f"Unknown strategy {strategy!r}, expected 'minimax' or 'mcts'")
+        self.strategy = strategy
+        self.mcts_playouts = mcts_playouts
+        self.mcts = MCTSSearch(self.board_size[0], self.board_size[1], winning_size, circle_of_two, batch_size=mcts_batch_size) if strategy == "mcts" else None
+
+        # Parallel search: worker processes rebuild this agent (single-process) from these options
+        if parallel not in ("root", "lazy_smp"):
+            raise ValueError(f"Unknown parallel mode {parallel!r}, expected 'root' or 'lazy_smp'")
+        self.workers = workers
+        self.parallel = parallel
+        self.worker_options = dict(player_number=player_number, board_size=self.board_size, winning_size=winning_size, scoring_array=scoring_array,
+                                   circle_of_two=circle_of_two, name=f"{name}_worker", depth=depth, engine=engine, tt_size_mb=tt_size_mb,
+                                   time_limit=time_limit, move_ordering=move_ordering, symmetry_plies=symmetry_plies, pvs=pvs,
+                                   aspiration_window=aspiration_window, late_move_reductions=late_move_reductions, futility_margin=futility_margin,
+                                   profile=self.profiler.mode if self.profiler is not None else None,
+                                   tablebase=tablebase.path if tablebase is not None else None)
+        # Book moves are played by this agent before any search starts, so workers never need the book
+        self.root_split = None
+        self.lazy_smp = None
+        self.stop_flag = None # Shared flag that ends a lazy-SMP helper's search early, set in worker processes
+
+        # Counters of the current move; the search's other counters live in self.stats until the move is chosen
         self.states_evaluated = 0
-        self.max_depth_reached_in_last_move = 0 # Renamed for clarity
+        self.completed_depth_in_last_move = 0
+        self.search_stats = search_stats
+        self.stats = SearchStats(search_stats)
+        self.last_search_stats = None # SearchStats of the last get_next_move
+        if search_stats:
+            instrument(self)
         self.last_move_start_time = None # Renamed for clarity
+        self.last_move_value = None # Value of the last move from get_next_move's search (None if it did not search)
+
+        # Iterative deepening bookkeeping: deadline of the current move and the principal variation
+        self.search_deadline = float("inf")
+        self.iteration_depth = depth
+        self.pv_table = [[] for _ in range(depth + 2)]
+        self.pv_line = []
+        self.follow_pv = False
+        self.search_timed_out = False
 
     def set_game(self, game):
         """Set the game instance for this agent"""
@@ -49,44 +199,131 @@ class Agent:
             "counts": None,
             "last_move_played": None
         }
+        self.root_state = self.root_key = None
+        if self.transposition_table is not None:
+            self.transposition_table.clear()
+        if self.orderer is not None:
+            self.orderer.clear()
+        self.close()
+
+    def close(self):
+        """Shut down the worker processes (and shared table) of a parallel agent, if any; they restart on the next move."""
+        if self.root_split is not None:
+            self.root_split.close()
+            self.root_split = None
+        if self.lazy_smp is not None:
+            self.lazy_smp.close()
+            self.lazy_smp = None
+
+    def solve(self, board_state, player_to_move, max_nodes=None):
+        """Prove the outcome of a position with proof-number search (see mnk/pns.py) instead of a depth-limited search.
+
+        Returns (outcome, line): outcome 1 if player 0 wins with best play, -1 if player 1 wins, 0 for a draw,
+        None if max_nodes nodes were not enough; line is a principal line to the end of the game.
+        The proof tables are kept between calls.
+        """
+        if self.proof_search is None:
+            self.proof_search = ProofNumberSearch(self.board_size[0], self.board_size[1], self.winning_size, self.circle_of_two)
+        return self.proof_search.solve(board_state, player_to_move, max_nodes)
 
     def get_next_move(self):
-        """Get the next move for this agent"""
-        # Reset debug counters
+        """Get the next move for this agent. What it did to find it is left in last_search_stats (see mnk/stats.py)."""
+        # Reset the counters of the move
         self.states_evaluated = 0
-        self.max_depth_reached_in_last_move = 0 # Reset specific counter
         self.last_move_start_time = time.time() # Reset specific timer
+        self.last_move_value = None
+        self.stats = stats = SearchStats(self.search_stats)
+        tt = self.transposition_table
+        tt_hits, tt_misses = (tt.hits, tt.misses) if tt is not None else (0, 0)
 
-        print(f"\n{self.name} (Player {self.player_number}, Depth {self.search_depth}) thinking...")
-
-        best_move_index = -1 # Store index of the move
-        # Best value for P0 (maximizer) is -inf, for P1 (minimizer) is +inf
-        best_value = float("-inf") if self.player_number == 0 else float("inf")
-
-        # Current game state for the agent to consider
-        current_board_state_for_minimax = self.game.board.copy()
-        
-        # Generate possible moves from the current game board state
-        # The generate_next_moves method needs the board state and whose turn it is.
-        # It should generate moves for the current agent (self.player_number).
-        
-        # Create an initial 'state' dict for generate_next_moves, similar to how minimax receives it.
-        # The 'last_move' in this initial state isn't strictly necessary if generate_next_moves only uses board_state.
-        initial_state_for_move_gen = {
-            "board_state": current_board_state_for_minimax,
-            "last_move": self.memory["last_move"] # or None, depends on generate_next_moves
-        }
-        
-        next_possible_moves_states = self.generate_next_moves(initial_state_for_move_gen, self.player_number)
-
-        if not next_possible_moves_states:
+        if self.profiler is None:
+            move, stats.source = self.choose_move()
+        else:
+            with self.profiler:
+                move, stats.source = self.choose_move()
+
+        stats.move = move
+        stats.value = self.last_move_value
+        stats.elapsed = time.time() - self.last_move_start_time
+        stats.nodes = self.states_evaluated
+        stats.depth = self.completed_depth_in_last_move
+        stats.iteration_nodes = list(self.iteration_nodes)
+        stats.timed_out = self.search_timed_out
+        if tt is not None:
+            stats.tt_hits = tt.hits - tt_hits
+            stats.tt_probes = stats.tt_hits + tt.misses - tt_misses
+        if self.orderer is not None:
+            stats.cutoffs_by_move_index = list(self.orderer.cutoffs_by_move_index)
+        self.last_search_stats = stats
+        if self.verbose:
+            print(f"{self.name} (Player {self.player_number}) selected {stats.summary()}")
+        if self.stats_callback is not None:
+            self.stats_callback(stats)
+        return move
+
+    def choose_move(self):
+        """The move for the position of self.game, and where it came from (a SearchStats source)."""
+        self.completed_depth_in_last_move = 0
+        self.search_deadline = self.last_move_start_time + self.time_limit
+        self.search_timed_out = False
+        self.pv_line = []
+        self.iteration_nodes = []
+        if self.orderer is not None:
+            self.orderer.new_search()
+
+        # The game's board, read in place: nothing below writes to it
+        current_board_state_for_minimax = self.game.board_view
+
+        # Solved position: play the tablebase move (fastest win, slowest loss) without searching
+        if self.tablebase is not None:
+            known = self.tablebase.best_move(current_board_state_for_minimax, self.player_number)
+            if known is not None:
+                move, outcome, distance = known
+                self.last_move_value = float(outcome)
+                self.stats.plies_to_end = distance
+                return move, "tablebase"
+
+        # Opening: play the stored result of a deep offline search
+        if self.opening_book is not None:
+            stones = int(np.count_nonzero(current_board_state_for_minimax != EMPTY))
+            if stones < self.book_exit_ply and stones % 2 == self.player_number:
+                entry = self.opening_book.lookup(current_board_state_for_minimax)
+                if entry is not None and current_board_state_for_minimax[entry[0]] == EMPTY:
+                    move, score, book_depth = entry
+                    self.last_move_value = score
+                    self.completed_depth_in_last_move = book_depth
+                    return move, "book"
+
+        # Forced win by continuous threats: found many plies deeper than the full-width search reaches, at a few nodes per ply
+        if self.threat_search is not None:
+            line = self.threat_search.find_win(current_board_state_for_minimax, self.player_number, node_budget=self.threat_search_nodes)
+            self.states_evaluated += self.threat_search.nodes
+            if line is not None:
+                self.last_move_value = 1.0 if self.player_number == 0 else -1.0
+                self.stats.plies_to_end = len(line)
+                return line[0], "threats"
+
+        if self.mcts is not None:
+            move, score = self.mcts.search(current_board_state_for_minimax, self.player_number, self.search_deadline, self.mcts_playouts)
+            self.last_move_value = (2 * score - 1) * (1 if self.player_number == 0 else -1)
+            self.stats.playouts = self.mcts.playouts
+            self.states_evaluated = self.mcts.size # Tree nodes
+            return move, "mcts"
+
+        # One mutable search state for the whole search: minimax plays and takes back moves on it in place
+        search_state = self.root_search_state()
+
+        # Moves for the current agent (self.player_number), as plain board indices
+        next_possible_moves = self.generate_next_moves(search_state)
+
+        if not next_possible_moves:
             # This case should ideally be handled by is_game_over (e.g., a draw if no moves left)
             # or if generate_next_moves can return empty when it's not a terminal draw state (e.g. zugzwang in other games)
             # For m,n,k this usually means board is full.
             empty_spaces = [i for i, x in enumerate(current_board_state_for_minimax) if x == EMPTY]
             if empty_spaces: # Should not happen if game isn't over.
                  print(f"Warning: No moves generated by generate_next_moves but board is not full for {self.name}.")
-                 return empty_spaces[0] # Fallback: pick first available
+                 return empty_spaces[0], "fallback" # Fallback: pick first available
             else: # Board is full, likely a draw if no winner yet
                  print(f"Warning: No moves generated by generate_next_moves, board is full for {self.name}.")
                  # This scenario should ideally be caught by game.is_game_over() before calling get_next_move.
@@ -97,56 +334,180 @@ class Agent:
                  # For robustness, if somehow called in such a state:
                  raise ValueError(f"{self.name} called for move, but no moves possible and game not flagged as over.")
 
+        if self.symmetries is not None:
+            next_possible_moves = unique_moves(next_possible_moves, self.symmetries, search_state["hashes"])
+        if self.orderer is not None:
+            next_possible_moves = self.order_moves(search_state, next_possible_moves, self.player_number, 0)
+
+        # Iterative deepening: the answer is always the best move of the deepest iteration that finished before the deadline
+        if self.workers > 1 and self.parallel == "lazy_smp":
+            best_move_index, best_value = self.search_lazy_smp(current_board_state_for_minimax, next_possible_moves)
+        else:
+            best_move_index, best_value = self.iterative_deepening(search_state, next_possible_moves, current_board_state_for_minimax)
+        if self.search_timed_out: # The aborted iteration left moves on the search state
+            self.root_state = self.root_key = None
 
-        for move_state in next_possible_moves_states:
-            # Check if we've exceeded time limit
-            if time.time() - self.last_move_start_time > MAX_TIME:
-                print(f"{self.name} timed out during move selection.")
-                if best_move_index == -1: # If no good move found yet
-                    # Fallback: return the first move from the generated list
-                    # (or a random one from the list if preferred)
-                    print(f"Timeout fallback: selecting first generated move: {next_possible_moves_states[0]['last_move']}")
-                    return next_possible_moves_states[0]["last_move"]
-                break # Exit loop, use best_move found so far
-
-            # The `move_state` is the state *after* the current agent makes a hypothetical move.
-            # So, the next call to minimax is for the *opponent* to play from this `move_state`.
-            # Therefore, `maximizing_player` for the next call is `not (self.player_number == 0)`.
-            # The `depth` for the initial call to minimax from get_next_move should be `self.search_depth -1`
-            # because `self.search_depth` includes the current move being considered.
-            # Or, more clearly, minimax explores `self.search_depth` *plies down from the opponent's turn*.
-            # If self.search_depth = 1, minimax is called with depth 0 (evaluate current board after move).
-            
-            value = self.minimax(move_state, self.search_depth -1, float("-inf"), float("inf"), self.player_number == 1) # True if P1 (agent) just moved, so P0 (opponent) is maximizing
-            
-            # Debug output for critical positions
-            if self.player_number == 1 and self.search_depth == 1:
-                print(f"  Move {move_state['last_move']}: value = {value:.2f}")
-
-            if self.player_number == 0:  # Agent is P0 (Maximizing player)
-                if value > best_value:
-                    best_value = value
-                    best_move_index = move_state["last_move"]
-            else:  # Agent is P1 (Minimizing player)
-                if value < best_value:
-                    best_value = value
-                    best_move_index = move_state["last_move"]
-        
         if best_move_index == -1 :
-            # This could happen if all moves timed out before one was fully evaluated,
-            # or if next_possible_moves_states was empty initially (handled above).
-            # Or if all evaluated moves somehow resulted in values that didn't update best_value (e.g. all -inf for maximizer)
-            print(f"Warning: {self.name} did not select a best move. Fallback to first generated move.")
-            if next_possible_moves_states: # Ensure list is not empty
-                 return next_possible_moves_states[0]["last_move"]
-            else: # Should have been caught earlier, but as a safeguard
-                 raise ValueError(f"{self.name} has no moves to select from.")
-
-        print(f"{self.name} selected move: {best_move_index} with value: {best_value:.2f}. States evaluated: {self.states_evaluated}. Max depth reached: {self.max_depth_reached_in_last_move}")
-        return best_move_index
+            # This could happen if even the depth 1 iteration timed out: play the first generated move
+            return next_possible_moves[0], "fallback"
+
+        self.last_move_value = best_value
+        return best_move_index, "search"
+
+    def iterative_deepening(self, search_state, root_moves, board_state, first_depth=1):
+        """Search root_moves at depths first_depth..search_depth; returns (best move, value) of the deepest completed
+        iteration, or (-1, 0.0) if none completed. root_moves is reordered in place, best move first.
+        Each iteration searches the previous iteration's best line first.
+        """
+        best_move_index = -1 # Store index of the move
+        best_value = 0.0
+        iteration_values = [] # Value of each completed iteration, for the aspiration window
+        self.search_timed_out = False
+        for iteration_depth in range(first_depth, self.search_depth + 1):
+            nodes_before_iteration = self.states_evaluated
+            try:
+                if self.workers > 1:
+                    iteration_move, iteration_value = self.search_root_parallel(board_state, root_moves, iteration_depth)
+                elif not self.aspiration_window or len(iteration_values) < 2:
+                    iteration_move, iteration_value = self.search_root(search_state, root_moves, iteration_depth)
+                else:
+                    # Values alternate between odd and even depths (the side that moved last looks better),
+                    # so the window is centred on the last iteration of the same parity
+                    iteration_move, iteration_value = self.search_root_aspiration(search_state, root_moves, iteration_depth, iteration_values[-2])
+            except SearchTimeout:
+                # The aborted iteration left moves on the search state; it is rebuilt on the next call
+                self.search_timed_out = True
+                break
+            best_move_index, best_value = iteration_move, iteration_value
+            iteration_values.append(iteration_value)
+            self.completed_depth_in_last_move = iteration_depth
+            self.iteration_nodes.append(self.states_evaluated - nodes_before_iteration)
+            # Root moves in the same order next time, but with the best one first
+            root_moves.remove(best_move_index)
+            root_moves.insert(0, best_move_index)
+            if abs(best_value) == 1.0: # Proven win or loss, deeper iterations cannot change it
+                break
+        return best_move_index, best_value
+
+    def search_root_aspiration(self, search_state, root_moves, depth, previous_value):
+        """search_root inside a window around previous_value (for player 0), widened to the failing side and searched
+        again while the value falls outside it. Returns the same (best move, value) as a full-window search_root.
+        """
+        sign = 1 if self.player_number == 0 else -1
+        alpha, beta = sign * previous_value - self.aspiration_window, sign * previous_value + self.aspiration_window
+        while True:
+            move, value = self.search_root(search_state, root_moves, depth, alpha, beta)
+            if sign * value <= alpha:
+                alpha = float("-inf")
+            elif sign * value >= beta:
+                beta = float("inf")
+            else:
+                return move, value
+            self.stats.aspiration_researches += 1
+
+    def search_root(self, search_state, root_moves, depth, alpha=float("-inf"), beta=float("inf")):
+        """Search every root move to the given depth; returns (best move, its value for player 0).
+        alpha, beta: the window, for this agent; a value outside it is only a bound (see search_root_aspiration).
+        Raises SearchTimeout if the deadline passes before the iteration is complete.
+        """
+        self.iteration_depth = depth
+        self.pv_table = [[] for _ in range(depth + 2)]
+        self.follow_pv = bool(self.pv_line)
+
+        sign = 1 if self.player_number == 0 else -1
+        opponent = 1 - self.player_number
+        best_move_index = -1
+        best_value = float("-inf") # For this agent; negated back for P1 on return
+        for move_index, move in enumerate(root_moves):
+            # After make_move, `search_state` is the state *after* the current agent makes a hypothetical move,
+            # so the opponent is to move in it. The `depth` for the call is `depth - 1`
+            # because `depth` includes the current move being considered.
+            # If depth = 1, negamax is called with depth 0 (evaluate current board after move).
+            previous_last_move = self.make_move(search_state, move, self.player_number)
+            if move_index == 0 or not self.pvs:
+                value = -self.negamax(search_state, depth - 1, -beta, -alpha, opponent)
+            else:
+                value = -self.negamax(search_state, depth - 1, -alpha - NULL_WINDOW, -alpha, opponent)
+                if alpha < value < beta:
+                    value = -self.negamax(search_state, depth - 1, -beta, -alpha, opponent)
+            self.unmake_move(search_state, move, self.player_number, previous_last_move)
+            self.follow_pv = False
+
+            if value > best_value:
+                best_value = value
+                best_move_index = move
+                self.pv_table[0] = [move] + self.pv_table[1]
+            alpha = max(alpha, value)
+            if alpha >= beta: # Fail high: already above the aspiration window
+                break
+
+        self.pv_line = self.pv_table[0]
+        return best_move_index, sign * best_value
+
+    def start_workers(self):
+        """Create the worker pool of a parallel agent and start its processes, which otherwise start on the first
+        search of the first move that uses them (benchmarks call this to time searches without the start-up).
+        """
+        if self.parallel == "lazy_smp":
+            if self.lazy_smp is None:
+                self.lazy_smp = LazySMPSearch(self.worker_options, self.workers, self.profiler)
+                self.lazy_smp.start()
+        elif self.root_split is None:
+            self.root_split = RootSplitSearch(self.worker_options, self.workers, self.profiler)
+            self.root_split.start()
+
+    def search_root_parallel(self, board_state, root_moves, depth):
+        """search_root across the worker pool; the same move and value as the serial search without a transposition table,
+        late_move_reductions or futility_margin. (With a table, each worker's can return a deeper result than the serial search
+        would have seen; reductions and futility pruning depend on the window, which workers take from the shared bound.)
+        """
+        if self.root_split is None:
+            self.start_workers()
+        best_move_index, best_value, nodes = self.root_split.search_root(board_state, self.player_number, root_moves, depth, self.search_deadline)
+        self.states_evaluated += nodes
+        if best_move_index is None:
+            raise SearchTimeout()
+        return best_move_index, best_value
+
+    def search_lazy_smp(self, board_state, root_moves):
+        """Iterative deepening in every worker at once (see mnk/parallel.py); returns the deepest completed (move, value)."""
+        if self.lazy_smp is None:
+            self.start_workers()
+        result = self.lazy_smp.search(board_state, root_moves, self.search_deadline)
+        self.states_evaluated += result["nodes"]
+        self.completed_depth_in_last_move = result["depth"]
+        self.search_timed_out = result["timed_out"]
+        return result["move"], result["value"]
+
+    def move_played(self, move, player, board_state):
+        """Game's notice that player's stone went on move. board_state is the board after it: a read-only view of the
+        game's own buffer, which memory keeps instead of a copy. The search state kept from the last search gets the
+        move with make_move, so the next search starts from it without rebuilding anything from the board.
+        """
+        self.memory["board_state"] = board_state
+        self.memory["last_move"] = move
+        self.memory["counts"] = None
+        self.memory["last_move_played"] = np.array([move % self.board_size[0], move // self.board_size[0]], dtype=np.int32)
+        game = self.game
+        if self.root_state is not None and game is not None and self.root_key == (game.board_version, game.moves_played - 1):
+            self.make_move(self.root_state, move, player)
+            self.root_state["last_move"] = None # As built by new_search_state: the root is not checked for a win
+            self.root_key = (game.board_version, game.moves_played)
+        else:
+            self.root_state = self.root_key = None
+
+    def root_search_state(self):
+        """The search state of the game's current position: the one kept up to date by move_played, or a new one."""
+        key = (self.game.board_version, self.game.moves_played)
+        if self.root_state is None or self.root_key != key:
+            self.root_state = self.new_search_state(self.game.board_view)
+            self.root_key = key
+        return self.root_state
 
     def new_move_played(self, board_state):
-        """Update our memory with the new board state"""
+        """Update our memory with the new board state, working out the move by comparing the boards.
+        Games call move_played instead, which is told the move.
+        """
         last_move = None
         # Compare current self.memory["board_state"] with the new board_state
         # This assumes self.memory["board_state"] is the state *before* the latest move.
@@ -189,6 +550,7 @@ class Agent:
         self.memory["board_state"] = board_state_np.copy()
         self.memory["last_move"] = last_move # Store the index of the move
         self.memory["counts"] = None  # Reset counts when board changes, will be re-calculated by evaluate/minimax
+        self.root_state = self.root_key = None # The board may have changed in any way
 
         if last_move is not None:
             self.memory["last_move_played"] = np.array([last_move % self.board_size[0], last_move // self.board_size[0]], dtype=np.int32)
@@ -208,66 +570,41 @@ class Agent:
         else:
             board_state = board_state_param
 
-        counts = np.zeros((2, self.winning_size + 1), dtype=np.int32)
-        empty_count = np.sum(board_state == EMPTY)
+        # Gather every k-window at once: cells[w, i] is the i-th cell of window w
+        cells = board_state[self.windows]
+        pieces = np.stack((np.count_nonzero(cells == 0, axis=1), np.count_nonzero(cells == 1, axis=1)))
+
+        # A window counts for a player only if the opponent has no piece in it.
+        # Windows owned by nobody land in bin 0, which is overwritten by the empty count below.
+        bins = self.winning_size + 1
+        p0_bins = np.where(pieces[1] == 0, pieces[0], 0)
+        p1_bins = np.where(pieces[0] == 0, pieces[1], 0) + bins
+        counts = np.bincount(np.concatenate((p0_bins, p1_bins)), minlength=2 * bins).astype(np.int32).reshape(2, bins)
+
+        empty_count = np.count_nonzero(board_state == EMPTY)
         counts[0][0] = empty_count
         counts[1][0] = empty_count
-
-        for player in range(2): # 0 and 1
-            # Horizontal
-            for r in range(self.board_size[1]):
-                for c in range(self.board_size[0] - self.winning_size + 1):
-                    segment_indices = [r * self.board_size[0] + c + i for i in range(self.winning_size)]
-                    current_player_pieces = 0
-                    opponent_pieces = 0
-                    for idx in segment_indices:
-                        if board_state[idx] == player:
-                            current_player_pieces += 1
-                        elif board_state[idx] != EMPTY:
-                            opponent_pieces += 1
-                    if opponent_pieces == 0 and current_player_pieces > 0:
-                        counts[player][current_player_pieces] += 1
-            # Vertical
-            for c in range(self.board_size[0]):
-                for r in range(self.board_size[1] - self.winning_size + 1):
-                    segment_indices = [(r + i) * self.board_size[0] + c for i in range(self.winning_size)]
-                    current_player_pieces = 0
-                    opponent_pieces = 0
-                    for idx in segment_indices:
-                        if board_state[idx] == player:
-                            current_player_pieces += 1
-                        elif board_state[idx] != EMPTY:
-                            opponent_pieces += 1
-                    if opponent_pieces == 0 and current_player_pieces > 0:
-                        counts[player][current_player_pieces] += 1
-            # Diagonal down-right
-            for r in range(self.board_size[1] - self.winning_size + 1):
-                for c in range(self.board_size[0] - self.winning_size + 1):
-                    segment_indices = [(r + i) * self.board_size[0] + (c + i) for i in range(self.winning_size)]
-                    current_player_pieces = 0
-                    opponent_pieces = 0
-                    for idx in segment_indices:
-                        if board_state[idx] == player:
-                            current_player_pieces += 1
-                        elif board_state[idx] != EMPTY:
-                            opponent_pieces += 1
-                    if opponent_pieces == 0 and current_player_pieces > 0:
-                        counts[player][current_player_pieces] += 1
-            # Diagonal up-right (actually TR to BL)
-            for r in range(self.winning_size - 1, self.board_size[1]):
-                for c in range(self.board_size[0] - self.winning_size + 1):
-                    segment_indices = [(r - i) * self.board_size[0] + (c + i) for i in range(self.winning_size)]
-                    current_player_pieces = 0
-                    opponent_pieces = 0
-                    for idx in segment_indices:
-                        if board_state[idx] == player:
-                            current_player_pieces += 1
-                        elif board_state[idx] != EMPTY:
-                            opponent_pieces += 1
-                    if opponent_pieces == 0 and current_player_pieces > 0:
-                        counts[player][current_player_pieces] += 1
         return counts
 
+    def count_sequences_batch(self, boards):
+        """count_sequences for an (N, m*n) stack of boards: an (N, 2, k+1) int32 array, from one vectorized pass."""
+        return count_windows_batch(boards, self.board_size[0], self.board_size[1], self.winning_size)[0]
+
+    def is_game_over_batch(self, boards):
+        """is_game_over's winner for an (N, m*n) stack of boards: (N,) int32 of 0/1 (win), -2 (draw) or NOONE (ongoing)."""
+        return count_windows_batch(boards, self.board_size[0], self.board_size[1], self.winning_size)[1]
+
+    def evaluate_batch(self, boards):
+        """evaluate(state, winner) for an (N, m*n) stack of boards, as an (N,) float64 array, from one pass
+        (windows.count_windows_batch gives both the counts and the winners, if both are needed).
+        """
+        counts, winners = count_windows_batch(boards, self.board_size[0], self.board_size[1], self.winning_size)
+        values = np.clip((counts[:, 0, 2] - counts[:, 1, 2]) * 0.1, -0.9, 0.9)
+        values[winners == 0] = 1.0
+        values[winners == 1] = -1.0
+        values[winners == -2] = 0.0
+        return values
+
     def is_move_too_far_from_action(self, board, move_tuple, circle_of_two_config):
         # Ensure board is numpy array
         if not isinstance(board, np.ndarray):
@@ -287,42 +624,93 @@ class Agent:
                     return False # Found a nearby piece, so move is not too far
         return True # No nearby pieces found
 
-    def generate_next_moves(self, current_state_dict, current_player_to_move):
-        next_moves_states = []
-        board = current_state_dict["board_state"]
-        # Ensure board is numpy array
-        if not isinstance(board, np.ndarray):
-            board_np = np.array(board, dtype=np.int32)
+    def generate_next_moves(self, current_state_dict):
+        """Indices of the empty cells worth playing from this state, in board-index order.
+        Only moves are produced; minimax plays each one on the shared search state with make_move.
+        Array-engine search states carry a Frontier updated by make_move/unmake_move, so this costs O(frontier size).
+        """
+        if "bitboards" in current_state_dict:
+            return self.bitboard.generate_next_moves(current_state_dict)
+        if "frontier" in current_state_dict:
+            return current_state_dict["frontier"].moves()
+
+        # A bare state dict (not built by new_search_state): build its frontier once, O(stones * offsets)
+        frontier = Frontier(self.board_size[0], self.board_size[1], self.circle_of_two)
+        frontier.load(current_state_dict["board_state"])
+        return frontier.moves()
+
+    def new_search_state(self, board_state):
+        """Build the mutable state a search plays moves on, in this agent's engine representation."""
+        self.root_state = self.root_key = None # Array-engine states share self.tracker and self.frontier
+        if self.bitboard is not None:
+            state = {"bitboards": list(self.bitboard.from_array(board_state)), "last_move": None, "hash": zobrist_hash(board_state)}
         else:
-            board_np = board
-
-        # Simple validation (optional, but good for robustness)
-        # p0_count_on_board = np.sum(board_np == 0)
-        # p1_count_on_board = np.sum(board_np == 1)
-        # if current_player_to_move == 0 and p0_count_on_board > p1_count_on_board: return []
-        # if current_player_to_move == 1 and p1_count_on_board >= p0_count_on_board: return [] # P1 cannot have more or equal if P0 played last (unless P0 starts)
-
-        any_pieces_on_board = np.any(board_np != EMPTY)
-
-        for i in range(len(board_np)):
-            if board_np[i] == EMPTY:
-                move_coord = (i % self.board_size[0], i // self.board_size[0])
-                # Only add move if it's not too far from action, or if board is empty
-                if not any_pieces_on_board or not self.is_move_too_far_from_action(board_np, move_coord, self.circle_of_two):
-                    new_board_state_after_move = board_np.copy()
-                    new_board_state_after_move[i] = current_player_to_move
-                    next_moves_states.append({
-                        "board_state": new_board_state_after_move,
-                        "last_move": i # The move just made to reach this state
-                    })
-        return next_moves_states
+            self.tracker.load(board_state)
+            self.frontier.load(board_state)
+            state = {"board_state": np.array(board_state, dtype=np.int32), "last_move": None, "counts": self.tracker.counts,
+                     "frontier": self.frontier, "hash": zobrist_hash(board_state)}
+        if self.symmetries is not None:
+            state["hashes"] = symmetric_hashes(board_state, self.symmetries)
+        return state
+
+    def make_move(self, state_dict, move, player):
+        """Play player's stone on move in place. Returns the previous last_move, which unmake_move needs."""
+        previous_last_move = state_dict["last_move"]
+        if "bitboards" in state_dict:
+            state_dict["bitboards"][player] |= self.bitboard.cell_bits[move]
+        else:
+            state_dict["board_state"][move] = player
+            self.tracker.place(move, player)
+            self.frontier.place(move)
+        state_dict["last_move"] = move
+        state_dict["hash"] ^= self.zobrist[player][move]
+        if self.symmetries is not None:
+            self.update_symmetric_hashes(state_dict["hashes"], move, player)
+        return previous_last_move
+
+    def unmake_move(self, state_dict, move, player, previous_last_move):
+        """Take back make_move(state_dict, move, player)."""
+        if "bitboards" in state_dict:
+            state_dict["bitboards"][player] ^= self.bitboard.cell_bits[move]
+        else:
+            state_dict["board_state"][move] = EMPTY
+            self.tracker.remove(move, player)
+            self.frontier.remove(move)
+        state_dict["last_move"] = previous_last_move
+        state_dict["hash"] ^= self.zobrist[player][move]
+        if self.symmetries is not None:
+            self.update_symmetric_hashes(state_dict["hashes"], move, player)
+
+    def update_symmetric_hashes(self, hashes, move, player):
+        """Toggle player's stone on move in the hash of every transformed copy of the position."""
+        keys = self.zobrist[player]
+        for g, permutation in enumerate(self.symmetries):
+            hashes[g] ^= keys[permutation[move]]
 
     def is_game_over(self, state_dict):
-        """Check if the current state is a terminal state. state_dict contains 'board_state'."""
+        """Check if the current state is a terminal state. state_dict contains 'board_state'.
+        If it also has 'last_move' (as every child state in the search does), only the lines through that move are checked,
+        and the draw check uses the tracked empty-cell count from 'counts' when present.
+        """
+        if "bitboards" in state_dict:
+            return self.bitboard.is_game_over(state_dict)
+
         board = state_dict["board_state"]
         if not isinstance(board, np.ndarray): # Ensure numpy array
             board = np.array(board, dtype=np.int32)
 
+        # Fast path: a new win can only go through the stone just placed
+        last_move = state_dict.get("last_move")
+        if last_move is not None:
+            player = board[last_move]
+            if is_winning_move(board, last_move, player, self.board_size[0], self.board_size[1], self.winning_size):
+                return True, player
+            counts = state_dict.get("counts")
+            empty_count = counts[0][0] if counts is not None else np.count_nonzero(board == EMPTY)
+            if empty_count == 0: # Board is full
+                return True, -2
+            return False, NOONE
+
         moves_played = np.sum(board != EMPTY)
         if moves_played < self.winning_size * 2 - 1 and moves_played < self.winning_size : # Optimization
              # if P1 plays 3rd move of game, total moves = 3. winning_size = 3. 3 < 3*2-1 (5) is true.
@@ -359,68 +747,204 @@ class Agent:
 
         return False, NOONE # Game not over, no winner yet
 
-    def evaluate(self, state_dict, winner_code): # winner_code from is_game_over
+    def evaluate(self, state_dict, winner): # winner from is_game_over
         """Evaluate the state from perspective of maximizing player (player 0)"""
-        if winner_code == 0:  # Max player (P0) won
+        if "bitboards" in state_dict:
+            return self.bitboard.evaluate(state_dict, winner)
+
+        if winner == 0:  # Max player (P0) won
             return 1.0
-        elif winner_code == 1:  # Min player (P1) won
+        elif winner == 1:  # Min player (P1) won
             return -1.0
-        elif winner_code == -2:  # Draw
+        elif winner == -2:  # Draw
             return 0.0
         
         # Game is ongoing - use heuristic
-        # Ensure board_state from dict is used
-        current_board_for_eval = state_dict["board_state"]
-        counts = self.count_sequences(current_board_for_eval)
+        # Inside a search the state carries the tracker's live histogram, so no rescan is needed
+        counts = state_dict.get("counts")
+        if counts is None:
+            counts = self.count_sequences(state_dict["board_state"])
         
         score = (counts[0][2] - counts[1][2]) * 0.1 # P0's "threats" - P1's "threats"
         return max(min(score, 0.9), -0.9)
 
+    def winning_moves(self, state_dict, moves, player):
+        """The moves in moves that would immediately give player k or more in a row."""
+        if "bitboards" in state_dict:
+            bitboards = state_dict["bitboards"]
+            cells = self.bitboard.winning_cells(bitboards[player], self.bitboard.full & ~(bitboards[0] | bitboards[1]))
+            cell_bits = self.bitboard.cell_bits
+            return {move for move in moves if cells & cell_bits[move]}
+        # No open window holds k - 1 of player's stones, so no single move can complete one
+        counts = state_dict.get("counts")
+        if counts is not None and counts[player][self.winning_size - 1] == 0:
+            return set()
+        board = state_dict["board_state"]
+        return {move for move in moves if is_winning_move(board, move, player, self.board_size[0], self.board_size[1], self.winning_size)}
+
+    def order_moves(self, state_dict, moves, player, ply, pv_move=None, tt_move=None, wins=None, blocks=None):
+        """Sort moves for searching: PV and TT moves, immediate wins, blocks of the opponent's wins, killers, history.
+        wins and blocks are computed with winning_moves unless given.
+        """
+        if wins is None:
+            wins = self.winning_moves(state_dict, moves, player)
+        if blocks is None:
+            blocks = self.winning_moves(state_dict, moves, 1 - player)
+        return self.orderer.order(moves, player, ply, pv_move, tt_move, wins, blocks)
+
+    def ordering_statistics(self):
+        """Cutoff statistics of the last get_next_move: first-move cutoff rate and effective branching factor."""
+        if self.orderer is None:
+            return {}
+        return self.orderer.statistics(self.iteration_nodes[-1] if self.iteration_nodes else self.states_evaluated, self.completed_depth_in_last_move)
+
     def minimax(self, current_node_state_dict, depth, alpha, beta, opponent_is_maximizing):
-        """Minimax implementation with alpha-beta pruning.
-        current_node_state_dict: The board state to evaluate or expand.
+        """Value of the search state for player 0 (the maximizing player), within the window (alpha, beta).
+        opponent_is_maximizing: True if it is P0's turn to move from current_node_state_dict.
+        The search itself is negamax (see negamax); this converts its mover's-view value and window to P0's.
+        """
+        if opponent_is_maximizing:
+            return self.negamax(current_node_state_dict, depth, alpha, beta, 0)
+        return -self.negamax(current_node_state_dict, depth, -beta, -alpha, 1)
+
+    def negamax(self, current_node_state_dict, depth, alpha, beta, player):
+        """Alpha-beta negamax with principal variation search. Returns the value of the state for player, who is to move.
+        current_node_state_dict: The search state to evaluate or expand. Children are visited by playing
+                                 each move on it with make_move and taking it back with unmake_move, so it is
+                                 left exactly as it was found.
         depth: Remaining depth to search.
-        opponent_is_maximizing: True if the player whose turn it is from current_node_state_dict is the maximizing player.
-                                (i.e., if it's P0's turn to move from this state).
+        The first move (the PV, TT or best-ordered move) is searched with the full window; every later one first
+        with a null window (alpha, alpha + NULL_WINDOW), which only tells whether it beats alpha, and again with
+        the full window only if it does. Results are fail-soft: a value <= alpha or >= beta is a bound.
         """
         self.states_evaluated += 1
-        self.max_depth_reached_in_last_move = max(self.search_depth - depth, self.max_depth_reached_in_last_move)
+        if not self.states_evaluated % DEADLINE_CHECK_NODES and (time.time() > self.search_deadline or self.stop_flag is not None and self.stop_flag.value):
+            raise SearchTimeout()
+        ply = self.iteration_depth - depth
+        self.pv_table[ply] = []
+        sign = 1 if player == 0 else -1 # evaluate() scores for P0
 
         # Check for terminal state or depth limit
         game_over, winner = self.is_game_over(current_node_state_dict)
         if game_over:
-            return self.evaluate(current_node_state_dict, winner)
+            return sign * self.evaluate(current_node_state_dict, winner)
         if depth == 0:
-            return self.evaluate(current_node_state_dict, NOONE) # NOONE indicates game not over, evaluate heuristically
+            return sign * self.evaluate(current_node_state_dict, NOONE) # NOONE indicates game not over, evaluate heuristically
 
-        # Determine whose turn it is to make a move from current_node_state_dict
-        # If opponent_is_maximizing is True, it's P0's turn (the maximizing player).
-        # If opponent_is_maximizing is False, it's P1's turn (the minimizing player).
-        player_to_move_from_this_state = 0 if opponent_is_maximizing else 1
-        
-        child_states = self.generate_next_moves(current_node_state_dict, player_to_move_from_this_state)
+        moves = self.generate_next_moves(current_node_state_dict)
 
-        if not child_states: # No valid moves from this state, but not flagged as game_over earlier
+        if not moves: # No valid moves from this state, but not flagged as game_over earlier
             # This implies a draw that wasn't caught by board full in is_game_over, or a logic issue.
             # Evaluate current state as if it's a draw or based on heuristic if not strictly full.
             # This path should ideally not be hit often if is_game_over is robust.
-            return self.evaluate(current_node_state_dict, -2) # Treat as draw
-
-        if opponent_is_maximizing: # Current player (P0) is maximizing
-            max_eval = float("-inf")
-            for child_state in child_states:
-                eval_score = self.minimax(child_state, depth - 1, alpha, beta, False) # Opponent (P1) will minimize
-                max_eval = max(max_eval, eval_score)
-                alpha = max(alpha, eval_score)
-                if beta <= alpha:
-                    break
-            return max_eval
-        else: # Current player (P1) is minimizing
-            min_eval = float("inf")
-            for child_state in child_states:
-                eval_score = self.minimax(child_state, depth - 1, alpha, beta, True) # Opponent (P0) will maximize
-                min_eval = min(min_eval, eval_score)
-                beta = min(beta, eval_score)
-                if beta <= alpha:
-                    break
-            return min_eval
\ No newline at end of file
+            return sign * self.evaluate(current_node_state_dict, -2) # Treat as draw
+
+        # Transposition table: reuse a result from another move order, or at least search its best move first.
+        # Keys include the side to move, so values and bounds are stored from the mover's point of view.
+        tt = self.transposition_table
+        tt_move = None
+        if tt is not None:
+            if self.symmetries is None:
+                position_key = current_node_state_dict["hash"]
+            else:
+                # Canonical key: the same for every rotation/reflection; moves are stored in that frame
+                position_key = min(current_node_state_dict["hashes"])
+                canonical_transform = current_node_state_dict["hashes"].index(position_key)
+            tt_key = position_key if player == 0 else position_key ^ self.zobrist[2][0]
+            alpha_original, beta_original = alpha, beta
+            entry = tt.probe(tt_key)
+            if entry is not None:
+                tt_value, tt_depth, tt_flag, tt_move = entry
+                if self.symmetries is not None and tt_move is not None:
+                    tt_move = self.symmetry_inverses[canonical_transform][tt_move]
+                if tt_depth >= depth:
+                    if tt_flag == EXACT:
+                        return tt_value
+                    if tt_flag == LOWER_BOUND:
+                        alpha = max(alpha, tt_value)
+                    else:
+                        beta = min(beta, tt_value)
+                    if beta <= alpha:
+                        return tt_value
+
+        if ply < self.symmetry_plies:
+            moves = unique_moves(moves, self.symmetries, current_node_state_dict["hashes"])
+
+        # Along the previous iteration's principal variation, search its move first
+        pv_move = None
+        if self.follow_pv:
+            pv_move = self.pv_line[ply] if ply < len(self.pv_line) else None
+            if pv_move not in moves:
+                pv_move = None
+                self.follow_pv = False
+
+        orderer = self.orderer
+        opponent = 1 - player
+        # Wins and blocks are searched first by the orderer, and never reduced or pruned
+        wins = blocks = ()
+        if orderer is not None or self.late_move_reductions or self.futility_margin:
+            wins = self.winning_moves(current_node_state_dict, moves, player)
+            blocks = self.winning_moves(current_node_state_dict, moves, opponent)
+        if orderer is not None:
+            moves = self.order_moves(current_node_state_dict, moves, player, ply, pv_move, tt_move, wins, blocks)
+        else:
+            for first_move in (tt_move, pv_move):
+                if first_move is not None and first_move in moves:
+                    moves.remove(first_move)
+                    moves.insert(0, first_move)
+
+        # Futility pruning: this close to the leaves, a quiet move is assumed to gain at most futility_margin per ply
+        futility_bound = None
+        if self.futility_margin and depth <= FUTILITY_DEPTH and not blocks:
+            futility_bound = sign * self.evaluate(current_node_state_dict, NOONE) + self.futility_margin * depth
+            if futility_bound > alpha:
+                futility_bound = None
+        reduce_late_moves = self.late_move_reductions and depth >= LMR_MIN_DEPTH and not blocks
+
+        best_move = None
+        best_eval = float("-inf")
+        for move_index, move in enumerate(moves):
+            quiet = move not in wins and move not in blocks
+            if futility_bound is not None and move_index > 0 and quiet:
+                self.stats.futility_pruned += 1
+                best_eval = max(best_eval, futility_bound)
+                continue
+            previous_last_move = self.make_move(current_node_state_dict, move, player)
+            eval_score = None
+            if reduce_late_moves and move_index >= self.late_move_reductions and quiet:
+                self.stats.reduced_moves += 1
+                eval_score = -self.negamax(current_node_state_dict, depth - 1 - LMR_REDUCTION, -alpha - NULL_WINDOW, -alpha, opponent)
+                if eval_score > alpha: # The reduced search cannot be trusted to beat alpha: search it again at full depth
+                    self.stats.reduction_researches += 1
+                    eval_score = None
+            if eval_score is None:
+                if move_index == 0 or not self.pvs:
+                    eval_score = -self.negamax(current_node_state_dict, depth - 1, -beta, -alpha, opponent)
+                else:
+                    eval_score = -self.negamax(current_node_state_dict, depth - 1, -alpha - NULL_WINDOW, -alpha, opponent)
+                    if alpha < eval_score < beta: # Better than the first move after all: get its exact value
+                        eval_score = -self.negamax(current_node_state_dict, depth - 1, -beta, -alpha, opponent)
+            self.unmake_move(current_node_state_dict, move, player, previous_last_move)
+            self.follow_pv = False
+            if eval_score > best_eval:
+                best_eval = eval_score
+                best_move = move
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+            alpha = max(alpha, eval_score)
+            if beta <= alpha:
+                if orderer is not None:
+                    orderer.record_cutoff(move, player, ply, depth, move_index, quiet and move != tt_move and move != pv_move)
+                break
+
+        if tt is not None:
+            if best_eval <= alpha_original:
+                flag = UPPER_BOUND
+                best_move = None # Every move failed low: the best of those bounds says nothing about move order
+            elif best_eval >= beta_original:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            if self.symmetries is not None and best_move is not None:
+                best_move = self.symmetries[canonical_transform][best_move]
+            tt.store(tt_key, depth, best_eval, flag, best_move)
+        return best_eval
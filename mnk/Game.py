@@ -1,19 +1,60 @@
+import itertools
+
+import numpy as np
+
+from mnk.rules import is_winning_move
+
 EMPTY = -1
 NOONE = -1
 
+# Every board a game is given gets a new version, so an agent can tell whether the moves it was sent
+# since its last look at the board are the whole story (see Agent.move_played)
+_board_versions = itertools.count()
+
 class Game:
     def __init__(self, board_size, winning_size, end_turn_print=True):
         """Initialize a new game"""
         self.board_size = board_size if isinstance(board_size, tuple) else (board_size, board_size)
         self.winning_size = winning_size
         self.end_turn_print = end_turn_print
-        self.board = [EMPTY] * (self.board_size[0] * self.board_size[1])
+        # Setting the board also sets last_move, empty_cells and the version, which the play methods then maintain
+        self.board = np.full(self.board_size[0] * self.board_size[1], EMPTY, dtype=np.int32)
         self.agents = []
         self.player_turn = 0
         self.played_games = 0
         self.scores = [0, 0]
         self.winner = None
 
+    @property
+    def board(self):
+        # Read-only: a position changes only through the setter (which every agent notices by the new version)
+        # or place(), so game.board[move] = player raises instead of going past board_version and is_game_over
+        return self.board_view
+
+    @board.setter
+    def board(self, board):
+        # The game owns its board: one int32 buffer, which agents read through board_view instead of copies.
+        # A board assigned directly (set up by hand, or reset) was not checked move by move: recount the empty
+        # cells, and have is_game_over scan it once unless it is empty, before trusting the last move alone
+        self._board = np.array(board, dtype=np.int32)
+        self.board_view = self._board.view()
+        self.board_view.flags.writeable = False
+        self.board_version = next(_board_versions)
+        self.moves_played = 0 # Moves played with play_move / play_agent_move since the board was set
+        self.last_move = None
+        self.empty_cells = int(np.count_nonzero(self._board == EMPTY))
+        self.board_checked = self.empty_cells == len(self._board)
+
+    def place(self, move):
+        """Put the current player's stone on the empty cell move and tell every agent (see Agent.move_played)."""
+        player = self.player_turn
+        self._board[move] = player
+        self.last_move = move
+        self.empty_cells -= 1
+        self.moves_played += 1
+        for agent in self.agents:
+            agent.move_played(move, player, self.board_view)
+
     def play_agent_move(self):
         """Play a move from the current agent"""
         move = self.agents[self.player_turn].get_next_move()
@@ -22,12 +63,8 @@ class Game:
         if self.board[move] != EMPTY:
             raise ValueError(f"Invalid move {move} - space already occupied")
             
-        # Make move
-        self.board[move] = self.player_turn
-        
-        # Notify agents
-        for agent in self.agents:
-            agent.new_move_played(self.board)
+        # Make move and notify agents
+        self.place(move)
             
         # Check for win before switching turns
         if self.is_game_over():
@@ -42,9 +79,7 @@ class Game:
             return
             
         if self.board[move] == EMPTY:
-            self.board[move] = self.player_turn
-            for agent in self.agents:
-                agent.new_move_played(self.board)
+            self.place(move)
             if self.end_turn_print:
                 self.print_board()
             self.end_turn()
@@ -87,46 +122,61 @@ class Game:
 
     def is_game_over(self):
         """Check if the game is over"""
+        if self.last_move is not None and self.board_checked:
+            # Every earlier position was checked already, so a win must go through the last move
+            player = int(self.board[self.last_move])
+            if is_winning_move(self.board, self.last_move, player, self.board_size[0], self.board_size[1], self.winning_size):
+                self.winner = player
+                return True
+            if self.empty_cells == 0:
+                self.winner = NOONE
+                return True
+            return False
+
+        # A board set up by hand: scan everything (once, if the game goes on)
+        board = self.board.tolist()
+        self.empty_cells = board.count(EMPTY)
         # Check for winning sequences
-        for i in range(len(self.board)):
-            if self.board[i] == EMPTY:
+        for i in range(len(board)):
+            if board[i] == EMPTY:
                 continue
                 
-            player = self.board[i]
+            player = board[i]
             
             # Check horizontal
             if i % self.board_size[0] < self.board_size[0] - self.winning_size + 1:
-                if all(self.board[i+j] == player for j in range(self.winning_size)):
+                if all(board[i+j] == player for j in range(self.winning_size)):
                     self.winner = player
                     return True
                     
             # Check vertical
             if i < self.board_size[0] * (self.board_size[1] - self.winning_size + 1):
-                if all(self.board[i+j*self.board_size[0]] == player for j in range(self.winning_size)):
+                if all(board[i+j*self.board_size[0]] == player for j in range(self.winning_size)):
                     self.winner = player
                     return True
                     
             # Check diagonal
             if i < self.board_size[0] * (self.board_size[1] - self.winning_size + 1) and i % self.board_size[0] < self.board_size[0] - self.winning_size + 1:
-                if all(self.board[i+j*(self.board_size[0]+1)] == player for j in range(self.winning_size)):
+                if all(board[i+j*(self.board_size[0]+1)] == player for j in range(self.winning_size)):
                     self.winner = player
                     return True
                     
             if i < self.board_size[0] * (self.board_size[1] - self.winning_size + 1) and i % self.board_size[0] >= self.winning_size - 1:
-                if all(self.board[i+j*(self.board_size[0]-1)] == player for j in range(self.winning_size)):
+                if all(board[i+j*(self.board_size[0]-1)] == player for j in range(self.winning_size)):
                     self.winner = player
                     return True
                     
         # Check for tie
-        if all(x != EMPTY for x in self.board):
+        if self.empty_cells == 0:
             self.winner = NOONE
             return True
-            
+
+        self.board_checked = True
         return False
 
     def reset_game(self):
         """Reset the game state for a new game"""
-        self.board = [EMPTY] * (self.board_size[0] * self.board_size[1])
+        self.board = np.full(self.board_size[0] * self.board_size[1], EMPTY, dtype=np.int32)
         self.player_turn = 0
         self.winner = None
         # Reset agent states
@@ -0,0 +1,325 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from mnk.Agent import Agent
+from mnk.Game import Game
+from mnk.constants import EMPTY, NOONE
+from mnk.frontier import Frontier
+from mnk.profiling import Profiler
+from mnk.rules import is_winning_move
+
+CIRCLE_OF_ONE = [(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2) if (dx, dy) != (0, 0)]
+
+# (m, n, k) of the boards the per-position functions are timed on
+BOARD_MATRIX = [(3, 3, 3), (6, 6, 4), (8, 8, 5), (10, 10, 5), (15, 15, 5)]
+ENGINES = ("array", "bitboard")
+
+# Each corpus holds CORPUS_SIZE boards per fill (share of the cells holding stones), from random games
+# that never complete a line, so every board is a position the search can meet
+CORPUS_SIZE = 16
+CORPUS_FILLS = (0.1, 0.25, 0.5)
+CORPUS_SEED = 20240601
+
+# get_next_move is timed at these depths on the first SEARCH_POSITIONS boards of the lowest fill
+SEARCH_BOARDS = [(6, 6, 4), (10, 10, 5)]
+SEARCH_DEPTHS = (1, 2, 3)
+SEARCH_POSITIONS = 4
+
+# Full games from the empty board between two agents of this depth
+GAME_BOARDS = [(3, 3, 3), (6, 6, 4), (8, 8, 5)]
+GAME_DEPTH = 2
+
+WARMUP = 1
+REPEAT = 5
+# Each sample runs a benchmark as many times as it takes to last at least this long, and reports the mean
+MIN_SAMPLE_SECONDS = 0.05
+# A median more than this much slower than the baseline's is a regression
+REGRESSION_THRESHOLD = 0.25
+
+
+def board_corpus(width, height, winning_size, size=CORPUS_SIZE, fills=CORPUS_FILLS, seed=CORPUS_SEED):
+    """Fixed positions for (width, height, winning_size): (board, last move) pairs, size of them per fill.
+
+    Players alternate random moves, skipping any move that would complete a line, until the fill is reached
+    (or no such move is left). The same seed gives the same corpus on every machine.
+    """
+    rng = np.random.default_rng([seed, width, height, winning_size])
+    cells = width * height
+    corpus = []
+    for fill in fills:
+        for _ in range(size):
+            board = np.full(cells, EMPTY, dtype=np.int32)
+            last_move = None
+            player = 0
+            for move in rng.permutation(cells).tolist():
+                if np.count_nonzero(board != EMPTY) >= max(1, int(fill * cells)):
+                    break
+                if is_winning_move(board, move, player, width, height, winning_size):
+                    continue
+                board[move] = player
+                last_move = move
+                player = 1 - player
+            corpus.append((board, last_move))
+    return corpus
+
+
+def calibrate_loops(run, min_sample_seconds=MIN_SAMPLE_SECONDS):
+    """Runs of run() per sample: doubled until a sample lasts min_sample_seconds."""
+    loops = 1
+    while sum(run() for _ in range(loops)) < min_sample_seconds:
+        loops *= 2
+    return loops
+
+
+def sample(run, loops):
+    return sum(run() for _ in range(loops)) / loops
+
+
+def measure(run, warmup=WARMUP, repeat=REPEAT, min_sample_seconds=MIN_SAMPLE_SECONDS, reference_loops=None):
+    """Statistics of the seconds one run() takes, as run() reports them (so it can leave out its setup).
+
+    Each sample is the mean of as many runs as it takes to last min_sample_seconds. warmup samples are
+    discarded, then repeat kept. With reference_loops, every sample is preceded by a sample of calibration(),
+    and "relative" is the median ratio of the two: the benchmark's time in units of the machine's speed right then.
+    """
+    loops = calibrate_loops(run, min_sample_seconds)
+    for _ in range(warmup):
+        run()
+    samples, relative = [], []
+    for _ in range(repeat):
+        if reference_loops is not None:
+            reference = sample(calibration, reference_loops)
+        samples.append(sample(run, loops))
+        if reference_loops is not None:
+            relative.append(samples[-1] / reference)
+    result = {"median": statistics.median(samples), "variance": statistics.variance(samples) if len(samples) > 1 else 0.0,
+              "min": min(samples), "loops": loops, "samples": samples}
+    if relative:
+        result["relative"] = statistics.median(relative)
+    return result
+
+
+def calibration():
+    """A fixed pure-Python workload (integer arithmetic, list indexing, dict updates, like the agent's inner loops),
+    timed next to every sample so that comparisons do not depend on the machine's speed or its load at the time."""
+    start = time.perf_counter()
+    cells = list(range(225))
+    totals = {}
+    for i in range(20000):
+        cell = cells[(i * 7) % 225]
+        totals[cell % 17] = totals.get(cell % 17, 0) + cell * i
+    return time.perf_counter() - start
+
+
+def make_agent(width, height, winning_size, engine="array", depth=1, player_number=0):
+    return Agent(player_number=player_number, board_size=(width, height), winning_size=winning_size, scoring_array=[],
+                 circle_of_two=CIRCLE_OF_ONE, name=f"Bench_P{player_number}", depth=depth, engine=engine)
+
+
+def timed_move(agent, board):
+    """(move, seconds) of agent.get_next_move on a copy of board, with the agent to move and its output silenced."""
+    game = Game(agent.board_size, agent.winning_size, end_turn_print=False)
+    game.board = board.copy()
+    game.player_turn = agent.player_number
+    agent.set_game(game)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        move = agent.get_next_move()
+        return move, time.perf_counter() - start
+
+
+def play_out(game):
+    """Play game to its end between its agents, with their output silenced; returns the seconds it took."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        while not game.is_game_over():
+            game.play_move(game.agents[game.player_turn].get_next_move())
+        return time.perf_counter() - start
+
+
+def position_benchmarks(width, height, winning_size, engine):
+    """{name: run} for the per-position functions on the corpus of this board."""
+    agent = make_agent(width, height, winning_size, engine)
+    corpus = board_corpus(width, height, winning_size)
+    board_name = f"{width}x{height}x{winning_size}"
+
+    # Search states as the search sees them; array-engine states share the agent's window tracker and frontier,
+    # so each gets its own copy of the histogram and its own Frontier
+    states = []
+    for board, last_move in corpus:
+        state = agent.new_search_state(board)
+        state["last_move"] = last_move
+        if engine == "array":
+            state["counts"] = [list(counts) for counts in state["counts"]]
+            state["frontier"] = Frontier(width, height, CIRCLE_OF_ONE)
+            state["frontier"].load(board)
+        states.append(state)
+
+    def timed_states(call):
+        def run():
+            start = time.perf_counter()
+            for state in states:
+                call(state)
+            return time.perf_counter() - start
+        return run
+
+    def count_sequences():
+        start = time.perf_counter()
+        for board, _ in corpus:
+            agent.count_sequences(board)
+        return time.perf_counter() - start
+
+    benchmarks = {
+        f"is_game_over[{engine}]/{board_name}": timed_states(agent.is_game_over),
+        f"generate_next_moves[{engine}]/{board_name}": timed_states(agent.generate_next_moves),
+        f"evaluate[{engine}]/{board_name}": timed_states(lambda state: agent.evaluate(state, NOONE)),
+    }
+    if engine == "array": # count_sequences is the engine-independent full rescan
+        benchmarks[f"count_sequences/{board_name}"] = count_sequences
+    return benchmarks
+
+
+def search_benchmark(width, height, winning_size, engine, depth):
+    """get_next_move from fresh search tables on the first positions of the corpus."""
+    corpus = board_corpus(width, height, winning_size)[:SEARCH_POSITIONS]
+    agents = [make_agent(width, height, winning_size, engine, depth, player_number) for player_number in range(2)]
+
+    def run():
+        elapsed = 0.0
+        for board, _ in corpus:
+            agent = agents[int(np.count_nonzero(board != EMPTY)) % 2]
+            agent.forget()
+            elapsed += timed_move(agent, board)[1]
+        return elapsed
+    return run
+
+
+def game_benchmark(width, height, winning_size, engine, depth):
+    """A whole game from the empty board between two agents; deterministic, so every run plays the same moves."""
+    agents = [make_agent(width, height, winning_size, engine, depth, player_number) for player_number in range(2)]
+    game = Game((width, height), winning_size, end_turn_print=False)
+    game.agents = agents
+    for agent in agents:
+        agent.set_game(game)
+
+    def run():
+        game.reset_game()
+        return play_out(game)
+    return run
+
+
+def all_benchmarks(boards=BOARD_MATRIX, engines=ENGINES, search_boards=SEARCH_BOARDS, depths=SEARCH_DEPTHS, game_boards=GAME_BOARDS):
+    """{name: run} of the whole suite, built lazily: each value is a function returning the run function."""
+    benchmarks = {}
+    for engine in engines:
+        for width, height, winning_size in boards:
+            benchmarks[f"positions[{engine}]/{width}x{height}x{winning_size}"] = (
+                lambda width=width, height=height, winning_size=winning_size, engine=engine: position_benchmarks(width, height, winning_size, engine))
+        for width, height, winning_size in search_boards:
+            for depth in depths:
+                benchmarks[f"get_next_move[{engine}]/{width}x{height}x{winning_size}/d{depth}"] = (
+                    lambda width=width, height=height, winning_size=winning_size, engine=engine, depth=depth: search_benchmark(width, height, winning_size, engine, depth))
+        for width, height, winning_size in game_boards:
+            benchmarks[f"game[{engine}]/{width}x{height}x{winning_size}/d{GAME_DEPTH}"] = (
+                lambda width=width, height=height, winning_size=winning_size, engine=engine: game_benchmark(width, height, winning_size, engine, GAME_DEPTH))
+    return benchmarks
+
+
+def run_suite(select=None, warmup=WARMUP, repeat=REPEAT, progress=None, min_sample_seconds=MIN_SAMPLE_SECONDS, **matrix):
+    """Time every benchmark whose name contains one of the select substrings (all if None); returns the results document."""
+    results = {}
+    reference_loops = calibrate_loops(calibration, min_sample_seconds)
+    for group_name, build in all_benchmarks(**matrix).items():
+        if select and not group_name.startswith("positions") and not any(pattern in group_name for pattern in select):
+            continue # Only position groups hold several benchmarks, filtered by name below
+        built = build()
+        runs = built if isinstance(built, dict) else {group_name: built}
+        for name, run in runs.items():
+            if select and not any(pattern in name for pattern in select):
+                continue
+            results[name] = measure(run, warmup, repeat, min_sample_seconds, reference_loops)
+            if progress is not None:
+                progress(name, results[name])
+    return {"meta": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                     "processor": platform.processor(), "cpus": os.cpu_count(), "warmup": warmup, "repeat": repeat,
+                     "min_sample_seconds": min_sample_seconds,
+                     "corpus_seed": CORPUS_SEED, "time": time.strftime("%Y-%m-%d %H:%M:%S")},
+            "results": results}
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """[(name, baseline median, median, ratio, status)] for the benchmarks in both documents.
+    ratio is the change of the "relative" times (measured against calibration()) when both documents have them,
+    else of the medians. status is "slower" past the threshold (a regression), "faster" past it the other way, else "ok".
+    """
+    rows = []
+    for name, result in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before, after = baseline["results"][name]["median"], result["median"]
+        key = "relative" if "relative" in result and "relative" in baseline["results"][name] else "median"
+        ratio = result[key] / baseline["results"][name][key] if baseline["results"][name][key] > 0 else float("inf")
+        status = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 / (1 + threshold) else "ok"
+        rows.append((name, before, after, ratio, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the agent's core functions, searches and full games; "
+                                                 "optionally compare with a stored baseline")
+    parser.add_argument("--select", nargs="+", help="Only benchmarks whose name contains one of these substrings")
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results (JSON)")
+    parser.add_argument("--baseline", help="Results file to compare against; exits with status 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown of a median that counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--profile", choices=("sample", "deterministic"),
+                        help="Profile the benchmarks (see mnk/profiling.py); deterministic profiling slows down the timings")
+    parser.add_argument("--profile-output", default="benchmark_profile",
+                        help="Prefix of the profile files: PREFIX.collapsed (flame graph input) and PREFIX.txt (hot functions)")
+    args = parser.parse_args()
+
+    def progress(name, result):
+        spread = result["variance"] ** 0.5 / result["median"] if result["median"] > 0 else 0.0
+        print(f"{name:<48} median {result['median'] * 1000:>10.3f} ms  +-{spread:>5.1%}")
+
+    if args.profile:
+        profiler = Profiler(args.profile)
+        with profiler:
+            results = run_suite(args.select, args.warmup, args.repeat, progress)
+        print(f"\n{profiler.format_table()}Profile written to {', '.join(profiler.write(args.profile_output))}\n")
+    else:
+        results = run_suite(args.select, args.warmup, args.repeat, progress)
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=1)
+    print(f"{len(results['results'])} benchmarks written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["meta"].get("platform") != results["meta"]["platform"]:
+            print(f"Note: the baseline was recorded on {baseline['meta'].get('platform')}, timings may not be comparable")
+        rows = compare(results, baseline, args.threshold)
+        print(f"\nRatios compare times measured in units of the calibration workload, so machine speed and load cancel out")
+        print(f"{'benchmark':<48} {'baseline ms':>11} {'now ms':>10} {'ratio':>6}")
+        for name, before, after, ratio, status in rows:
+            print(f"{name:<48} {before * 1000:>11.3f} {after * 1000:>10.3f} {ratio:>6.2f}  {status if status != 'ok' else ''}")
+        regressions = [row for row in rows if row[4] == "slower"]
+        if regressions:
+            print(f"{len(regressions)} of {len(rows)} benchmarks are more than {args.threshold:.0%} slower than the baseline")
+            sys.exit(1)
+        print(f"No benchmark is more than {args.threshold:.0%} slower than the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import numpy as np
+
+from mnk.constants import EMPTY, NOONE
+from mnk.rules import DIRECTIONS
+from mnk.windows import window_indices
+
+
+class BitBoard:
+    """Game engine that stores each player's stones as a Python int bitmask.
+
+    Cell (x, y) lives at bit y * stride + x, where stride = width + padding. The padding columns
+    are always zero, so shifting a mask sideways can never wrap a line onto the next row;
+    padding is as wide as the furthest horizontal offset in circle_of_two (and at least 1).
+    States handled by this engine are dicts with "bitboards": [player 0 mask, player 1 mask]
+    and "last_move", so playing or taking back a move is a single OR / XOR on an int.
+    """
+
+    def __init__(self, width, height, winning_size, circle_of_two):
+        self.width = width
+        self.height = height
+        self.winning_size = winning_size
+        padding = max([1] + [abs(dx) for dx, _ in circle_of_two])
+        self.stride = width + padding
+
+        self.cell_bits = [1 << (idx // width * self.stride + idx % width) for idx in range(width * height)]
+        self.bit_to_cell = {bit.bit_length() - 1: idx for idx, bit in enumerate(self.cell_bits)}
+        self.full = sum(self.cell_bits)
+
+        # Shift amount for each line direction, in the same order as rules.DIRECTIONS.
+        # A line read backwards is the same line, so up-right is checked as down-left (a positive shift).
+        self.line_shifts = [abs(dy * self.stride + dx) for dx, dy in DIRECTIONS]
+        # Shift amount that brings a stone at cell + (dx, dy) onto cell, for the neighbourhood mask
+        self.neighbour_shifts = [dy * self.stride + dx for dx, dy in circle_of_two]
+
+        self.window_masks = [sum(self.cell_bits[idx] for idx in window) for window in window_indices(width, height, winning_size).tolist()]
+
+    def from_array(self, board_state):
+        """Convert a -1/0/1 board into the (player 0, player 1) bitmask pair."""
+        board_state = np.asarray(board_state)
+        return tuple(sum(self.cell_bits[idx] for idx in np.flatnonzero(board_state == player).tolist()) for player in range(2))
+
+    def to_array(self, bitboards):
+        board_state = np.full(self.width * self.height, EMPTY, dtype=np.int32)
+        for player in range(2):
+            for idx in self.cells(bitboards[player]):
+                board_state[idx] = player
+        return board_state
+
+    def cells(self, mask):
+        """Cell indices of the set bits of mask, in increasing board-index order."""
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(self.bit_to_cell[low.bit_length() - 1])
+            mask ^= low
+        return cells
+
+    def neighbourhood(self, occupied):
+        """Mask of cells that have a stone at one of the circle_of_two offsets."""
+        near = 0
+        for shift in self.neighbour_shifts:
+            near |= occupied >> shift if shift >= 0 else occupied << -shift
+        return near & self.full
+
+    def has_line(self, mask):
+        """True if mask contains winning_size or more set cells in a row in any direction."""
+        for shift in self.line_shifts:
+            run = mask
+            for _ in range(self.winning_size - 1):
+                run &= run >> shift
+                if not run:
+                    break
+            if run:
+                return True
+        return False
+
+    def winning_cells(self, own, empty):
+        """Mask of empty cells that would complete a line of winning_size for the stones in own.
+
+        For each direction and each gap position j in a k-window, the window start x qualifies when
+        every other cell x + i * shift is in own; prefix and suffix ANDs of the shifted masks give all
+        k gap positions in O(k) big-int operations per direction, for the whole board at once.
+        """
+        k = self.winning_size
+        cells = 0
+        for shift in self.line_shifts:
+            shifted = [own >> (i * shift) for i in range(k)]
+            prefix = [-1] * (k + 1) # prefix[j]: AND of shifted[0:j]
+            for i in range(k):
+                prefix[i + 1] = prefix[i] & shifted[i]
+            suffix = -1 # AND of shifted[j + 1:]
+            for j in range(k - 1, -1, -1):
+                starts = prefix[j] & suffix
+                if starts:
+                    cells |= (starts << (j * shift)) & empty
+                suffix &= shifted[j]
+        return cells
+
+    def generate_next_moves(self, current_state_dict):
+        """Same moves, in the same order, as Agent.generate_next_moves on the equivalent array board."""
+        bitboards = current_state_dict["bitboards"]
+        occupied = bitboards[0] | bitboards[1]
+        empty = self.full & ~occupied
+        return self.cells(empty & self.neighbourhood(occupied) if occupied else empty)
+
+    def is_game_over(self, state_dict):
+        bitboards = state_dict["bitboards"]
+        last_move = state_dict.get("last_move")
+        if last_move is not None:
+            # Only the player who just moved can have completed a line
+            players = [0 if bitboards[0] & self.cell_bits[last_move] else 1]
+        else:
+            players = [0, 1]
+        for player in players:
+            if self.has_line(bitboards[player]):
+                return True, player
+        if bitboards[0] | bitboards[1] == self.full:
+            return True, -2
+        return False, NOONE
+
+    def evaluate(self, state_dict, winner):
+        """Agent.evaluate's heuristic, counting open windows with exactly two stones by popcount."""
+        if winner == 0:
+            return 1.0
+        elif winner == 1:
+            return -1.0
+        elif winner == -2:
+            return 0.0
+
+        p0, p1 = state_dict["bitboards"]
+        twos = 0
+        for window in self.window_masks:
+            mine, theirs = p0 & window, p1 & window
+            if not theirs:
+                if mine and mine.bit_count() == 2:
+                    twos += 1
+            elif not mine and theirs.bit_count() == 2:
+                twos -= 1
+        score = twos * 0.1
+        return max(min(score, 0.9), -0.9)
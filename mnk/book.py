@@ -0,0 +1,181 @@
+import argparse
+import contextlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mnk.constants import EMPTY
+from mnk.frontier import Frontier
+from mnk.rules import is_winning_move
+from mnk.symmetry import canonical_hash, inverse_permutations, symmetric_hashes, symmetry_group, symmetry_transform_indices, unique_moves
+
+# File layout: header, then the sorted canonical Zobrist keys (uint64), best moves in the canonical
+# frame (uint16), scores (float32, player 0's point of view) and completed search depths (uint8),
+# each as one contiguous array. symmetries is a bitmask of the TRANSFORMS used to canonicalize.
+MAGIC = 0x314B4F4F_424B4E4D # "MNKBOOK1"
+HEADER = np.dtype([("magic", "<u8"), ("width", "<u8"), ("height", "<u8"), ("winning_size", "<u8"),
+                   ("exit_ply", "<u8"), ("symmetries", "<u8"), ("entries", "<u8")])
+
+
+def book_positions(width, height, winning_size, circle_of_two, plies):
+    """Every position of the first `plies` plies (0 = the empty board), one per symmetry class, in ply order.
+
+    From each position every candidate move of the side to move (the agent's circle_of_two
+    neighbourhood) is followed, so the book covers any line either player can choose; moves that
+    end the game are not followed.
+    """
+    group = symmetry_group(width, height, circle_of_two)
+    frontier = Frontier(width, height, circle_of_two)
+    level = [np.full(width * height, EMPTY, dtype=np.int32)]
+    seen = {canonical_hash(level[0], group)[0]}
+    positions = []
+    for ply in range(plies):
+        positions.extend(level)
+        if ply == plies - 1:
+            break
+        player = ply % 2
+        next_level = []
+        for board_state in level:
+            frontier.load(board_state)
+            for move in unique_moves(frontier.moves(), group, symmetric_hashes(board_state, group)):
+                if is_winning_move(board_state, move, player, width, height, winning_size) or ply + 1 == width * height:
+                    continue
+                child = board_state.copy()
+                child[move] = player
+                key = canonical_hash(child, group)[0]
+                if key not in seen:
+                    seen.add(key)
+                    next_level.append(child)
+        level = next_level
+    return positions
+
+
+# Per-process agents of a book-building worker, one per side to move
+_book_agents = {}
+
+
+def _init_book_worker(agent_options):
+    from mnk.Agent import Agent # Imported here: Agent imports this module
+
+    for player_number in range(2):
+        _book_agents[player_number] = Agent(**dict(agent_options, player_number=player_number))
+
+
+def _search_book_position(board_state):
+    """Deep search of one book position from a fresh agent; returns (move, score, completed depth)."""
+    from mnk.Game import Game
+
+    player = int(np.count_nonzero(board_state != EMPTY) % 2)
+    agent = _book_agents[player]
+    agent.forget() # Every position from an empty table, so the book does not depend on the worker count
+    game = Game(agent.board_size, agent.winning_size, end_turn_print=False)
+    game.board = np.array(board_state, dtype=np.int32)
+    game.player_turn = player
+    agent.set_game(game)
+    with contextlib.redirect_stdout(io.StringIO()):
+        move = agent.get_next_move()
+    score = agent.last_move_value if agent.last_move_value is not None else 0.0
+    return move, score, agent.completed_depth_in_last_move
+
+
+def build_book(width, height, winning_size, circle_of_two, plies, depth, workers=1, tt_size_mb=16, engine="bitboard"):
+    """Search every book position (see book_positions) to depth on a pool of workers.
+
+    Returns {canonical key: (best move in the canonical frame, score, completed depth)} and the symmetry bitmask.
+    """
+    indices = symmetry_transform_indices(width, height, circle_of_two)
+    group = symmetry_group(width, height, indices=indices)
+    positions = book_positions(width, height, winning_size, circle_of_two, plies)
+    agent_options = dict(board_size=(width, height), winning_size=winning_size, scoring_array=[], circle_of_two=circle_of_two,
+                         name="BookBuilder", depth=depth, engine=engine, tt_size_mb=tt_size_mb)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_book_worker, initargs=(agent_options,)) as executor:
+            results = list(executor.map(_search_book_position, positions, chunksize=1))
+    else:
+        _init_book_worker(agent_options)
+        results = [_search_book_position(board_state) for board_state in positions]
+
+    book = {}
+    for board_state, (move, score, completed_depth) in zip(positions, results):
+        key, transform = canonical_hash(board_state, group)
+        book[key] = (group[transform][move], score, completed_depth)
+    return book, sum(1 << index for index in indices)
+
+
+def write_book(path, width, height, winning_size, exit_ply, symmetries, book):
+    keys = np.fromiter(book.keys(), dtype=np.uint64, count=len(book))
+    order = np.argsort(keys)
+    entries = list(book.values())
+    moves = np.array([entry[0] for entry in entries], dtype="<u2")[order]
+    scores = np.array([entry[1] for entry in entries], dtype="<f4")[order]
+    depths = np.array([entry[2] for entry in entries], dtype=np.uint8)[order]
+    header = np.array([(MAGIC, width, height, winning_size, exit_ply, symmetries, len(book))], dtype=HEADER)
+    with open(path, "wb") as book_file:
+        for array in (header, keys[order].astype("<u8"), moves, scores, depths):
+            book_file.write(array.tobytes())
+
+
+class OpeningBook:
+    """Read-only view of an opening book file through np.memmap; lookups binary-search the sorted keys."""
+
+    def __init__(self, path):
+        header = np.fromfile(path, dtype=HEADER, count=1)[0]
+        if int(header["magic"]) != MAGIC:
+            raise ValueError(f"{path} is not an m,n,k opening book")
+        self.path = path
+        self.width, self.height = int(header["width"]), int(header["height"])
+        self.winning_size = int(header["winning_size"])
+        self.exit_ply = int(header["exit_ply"])
+        symmetries = int(header["symmetries"])
+        self.group = symmetry_group(self.width, self.height, indices=[index for index in range(8) if symmetries >> index & 1])
+        self.inverses = inverse_permutations(self.group)
+        entries = int(header["entries"])
+        offset = HEADER.itemsize
+        self.keys = np.memmap(path, dtype="<u8", mode="r", offset=offset, shape=(entries,))
+        offset += 8 * entries
+        self.moves = np.memmap(path, dtype="<u2", mode="r", offset=offset, shape=(entries,))
+        offset += 2 * entries
+        self.scores = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(entries,))
+        offset += 4 * entries
+        self.depths = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(entries,))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def matches(self, board_size, winning_size):
+        return tuple(board_size) == (self.width, self.height) and winning_size == self.winning_size
+
+    def lookup(self, board_state):
+        """(best move, score, depth) for board_state, with the move mapped back onto this board; None if not in the book."""
+        key, transform = canonical_hash(board_state, self.group)
+        index = int(np.searchsorted(self.keys, np.uint64(key)))
+        if index == len(self.keys) or int(self.keys[index]) != key:
+            return None
+        move = self.inverses[transform][int(self.moves[index])]
+        return move, float(self.scores[index]), int(self.depths[index])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book for an m,n,k game by deep searches of its first plies")
+    parser.add_argument("width", type=int)
+    parser.add_argument("height", type=int)
+    parser.add_argument("winning_size", type=int)
+    parser.add_argument("--plies", type=int, default=3, help="Book positions have fewer stones than this (the exit ply)")
+    parser.add_argument("--depth", type=int, default=5, help="Search depth of each book position")
+    parser.add_argument("--radius", type=int, default=1, help="circle_of_two: candidate moves within this Chebyshev distance")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tt-size-mb", type=float, default=16)
+    parser.add_argument("--output", help="Output file (default: <width>x<height>x<k>.book)")
+    args = parser.parse_args()
+
+    circle_of_two = [(dx, dy) for dx in range(-args.radius, args.radius + 1) for dy in range(-args.radius, args.radius + 1) if (dx, dy) != (0, 0)]
+    book, symmetries = build_book(args.width, args.height, args.winning_size, circle_of_two, args.plies, args.depth, args.workers, args.tt_size_mb)
+    path = args.output or f"{args.width}x{args.height}x{args.winning_size}.book"
+    write_book(path, args.width, args.height, args.winning_size, args.plies, symmetries, book)
+    print(f"{path}: {len(book)} positions of the first {args.plies} plies, searched to depth {args.depth}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,4 +4,14 @@ NOONE = -1
 # Or keep DEPTH global as a fallback if no depth is specified in constructor
 
 # Keep MAX_TIME if you want a timeout for get_next_move
-MAX_TIME = 100
\ No newline at end of file
+MAX_TIME = 100
+# How many minimax nodes are searched between checks of the per-move deadline
+DEADLINE_CHECK_NODES = 1024
+# Width of the null window of principal variation search: values are 0, multiples of 0.1 or +-1, so nothing
+# lies strictly between alpha and alpha + NULL_WINDOW
+NULL_WINDOW = 1e-9
+# Late-move reductions: plies taken off a reduced move, and the least remaining depth at which moves are reduced
+LMR_REDUCTION = 1
+LMR_MIN_DEPTH = 3
+# Futility pruning applies at nodes with at most this many plies left, with the margin scaled by the plies
+FUTILITY_DEPTH = 2
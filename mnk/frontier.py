@@ -0,0 +1,75 @@
+import functools
+
+import numpy as np
+
+from mnk.constants import EMPTY
+
+
+@functools.lru_cache(maxsize=None)
+def frontier_neighbours(width, height, circle_of_two):
+    """For every cell s, the cells m with s = m + (dx, dy) for some (dx, dy) in circle_of_two.
+
+    A stone on s makes exactly these cells candidate moves, the same relation
+    Agent.is_move_too_far_from_action tests cell by cell. circle_of_two must be a tuple of (dx, dy) tuples.
+    """
+    neighbours = []
+    for cell in range(width * height):
+        x, y = cell % width, cell // width
+        neighbours.append(tuple((y - dy) * width + (x - dx) for dx, dy in circle_of_two
+                                if 0 <= x - dx < width and 0 <= y - dy < height))
+    return tuple(neighbours)
+
+
+class Frontier:
+    """The empty cells within the circle_of_two neighbourhood of some stone, kept up to date move by move.
+
+    refcounts[cell] is the number of stones that have cell in their neighbourhood. place() and
+    remove() only touch the precomputed neighbour list of the changed cell, and self.cells holds
+    the empty cells whose refcount is positive, so producing the moves costs O(frontier size)
+    instead of a scan of the whole board per empty cell.
+    """
+
+    def __init__(self, width, height, circle_of_two):
+        self.size = width * height
+        self.neighbours = frontier_neighbours(width, height, tuple(map(tuple, circle_of_two)))
+        self.load(np.full(self.size, EMPTY, dtype=np.int32))
+
+    def load(self, board_state):
+        """Reset the frontier to an arbitrary board."""
+        board_state = np.asarray(board_state)
+        self.occupied = (board_state != EMPTY).tolist()
+        self.stones = sum(self.occupied)
+        self.refcounts = [0] * self.size
+        for stone in np.flatnonzero(board_state != EMPTY).tolist():
+            for cell in self.neighbours[stone]:
+                self.refcounts[cell] += 1
+        self.cells = {cell for cell in range(self.size) if self.refcounts[cell] and not self.occupied[cell]}
+
+    def place(self, move):
+        """Account for a stone placed on the empty cell move."""
+        self.occupied[move] = True
+        self.stones += 1
+        self.cells.discard(move)
+        refcounts, occupied, cells = self.refcounts, self.occupied, self.cells
+        for cell in self.neighbours[move]:
+            refcounts[cell] += 1
+            if refcounts[cell] == 1 and not occupied[cell]:
+                cells.add(cell)
+
+    def remove(self, move):
+        """Undo place(move)."""
+        refcounts, cells = self.refcounts, self.cells
+        for cell in self.neighbours[move]:
+            refcounts[cell] -= 1
+            if not refcounts[cell]:
+                cells.discard(cell)
+        self.occupied[move] = False
+        self.stones -= 1
+        if refcounts[move]:
+            cells.add(move)
+
+    def moves(self):
+        """Candidate moves in board-index order; every cell while the board is still empty."""
+        if not self.stones:
+            return list(range(self.size))
+        return sorted(self.cells)
@@ -0,0 +1,211 @@
+import math
+import time
+
+import numpy as np
+
+from mnk.constants import EMPTY, NOONE
+from mnk.frontier import Frontier
+from mnk.rules import is_winning_move
+from mnk.windows import window_indices
+
+# Random playouts per batch, and how many leaves they are spread over (playouts per leaf = the ratio)
+MCTS_BATCH_SIZE = 256
+MCTS_LEAVES_PER_BATCH = 16
+# Playouts per move when the time limit is not reached first
+MCTS_PLAYOUTS = 20000
+# UCT exploration constant (sqrt(2) for rewards in [0, 1])
+EXPLORATION = math.sqrt(2)
+# Node pool capacity to start with; it doubles when full
+INITIAL_NODES = 1 << 14
+
+# Node outcome: still open, a draw, or the winner's player number
+ONGOING = -3
+DRAW = -2
+
+
+def random_playouts(boards, to_move, windows, rng):
+    """Play every board of a (B, cells) stack to the end with uniformly random moves, all at once.
+
+    Each board's empty cells are put in a random order and filled alternately, starting with
+    to_move[b]; a window owned by one player is completed at the time of its last stone, and the
+    game's winner is whoever completes a window first. Returns the (B,) winners: 0, 1, or NOONE
+    for a draw. Boards must not already contain a line.
+    """
+    batch, cells = boards.shape
+    empty = boards == EMPTY
+    keys = rng.random((batch, cells))
+    keys[~empty] = -1.0 # Stones on the board sort first
+    order = np.argsort(keys, axis=1)
+    ranks = np.empty((batch, cells), dtype=np.int32)
+    ranks[np.arange(batch)[:, None], order] = np.arange(cells, dtype=np.int32)
+    times = ranks - (cells - empty.sum(axis=1, dtype=np.int32))[:, None] # Move number of each empty cell, < 0 for stones
+    owners = np.where(empty, (to_move[:, None] + times) % 2, boards)
+
+    completed = times[:, windows].max(axis=2)
+    window_owners = owners[:, windows]
+    never = np.int32(cells)
+    first = [np.where((window_owners == player).all(axis=2), completed, never).min(axis=1) for player in range(2)]
+    return np.where(first[0] < first[1], 0, np.where(first[1] < first[0], 1, NOONE)).astype(np.int32)
+
+
+class MCTSSearch:
+    """Monte Carlo tree search with UCT selection and batched, vectorized random playouts.
+
+    The tree is a pool of nodes in parallel NumPy arrays: parent, the move into the node and its
+    mover, visits, total reward (for the mover: 1 per win, 0.5 per draw), the offset and count of
+    its children (stored contiguously) and its outcome if the game ended on that move. A node is
+    expanded on its second visit, into the agent's circle_of_two candidate moves, or only its
+    winning moves if it has any, or only the blocks of the opponent's winning cells.
+
+    Each batch selects leaves_per_batch leaves. Every path gets a virtual visit for each of its
+    playouts, so the selections spread out. It then plays batch_size random games from those leaves
+    in one random_playouts call and backs the results up.
+    """
+
+    def __init__(self, width, height, winning_size, circle_of_two, batch_size=MCTS_BATCH_SIZE,
+                 leaves_per_batch=MCTS_LEAVES_PER_BATCH, exploration=EXPLORATION, seed=None):
+        self.width = width
+        self.height = height
+        self.winning_size = winning_size
+        self.windows = window_indices(width, height, winning_size)
+        self.frontier = Frontier(width, height, circle_of_two)
+        self.leaves_per_batch = max(1, min(leaves_per_batch, batch_size))
+        self.playouts_per_leaf = max(1, batch_size // self.leaves_per_batch)
+        self.exploration = exploration
+        self.rng = np.random.default_rng(seed)
+        self.allocate(INITIAL_NODES)
+        self.playouts = 0
+        self.playouts_per_second = 0.0
+        self.elapsed = 0.0
+
+    def allocate(self, capacity):
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.move = np.full(capacity, -1, dtype=np.int32)
+        self.mover = np.zeros(capacity, dtype=np.int8)
+        self.visits = np.zeros(capacity, dtype=np.float64)
+        self.reward = np.zeros(capacity, dtype=np.float64)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.child_count = np.zeros(capacity, dtype=np.int32)
+        self.outcome = np.full(capacity, ONGOING, dtype=np.int8)
+        self.size = 0
+
+    def grow(self, needed):
+        capacity = len(self.parent)
+        while capacity < needed:
+            capacity *= 2
+        if capacity == len(self.parent):
+            return
+        for name, fill in (("parent", -1), ("move", -1), ("mover", 0), ("visits", 0), ("reward", 0),
+                           ("first_child", -1), ("child_count", 0), ("outcome", ONGOING)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def new_root(self, player):
+        self.size = 1
+        self.parent[0], self.move[0], self.mover[0] = -1, -1, 1 - player
+        self.visits[0] = self.reward[0] = 0
+        self.first_child[0], self.child_count[0], self.outcome[0] = -1, 0, ONGOING
+
+    def expand(self, node, board, player):
+        """Add the children of node, player to move on board."""
+        self.frontier.load(board)
+        candidates = self.frontier.moves()
+        wins = [move for move in candidates if is_winning_move(board, move, player, self.width, self.height, self.winning_size)]
+        if wins:
+            moves = wins[:1]
+        else:
+            blocks = [move for move in candidates if is_winning_move(board, move, 1 - player, self.width, self.height, self.winning_size)]
+            moves = blocks or list(candidates)
+        empty_after = int(np.count_nonzero(board == EMPTY)) - 1
+        start = self.size
+        self.grow(start + len(moves))
+        end = start + len(moves)
+        self.parent[start:end] = node
+        self.move[start:end] = moves
+        self.mover[start:end] = player
+        self.visits[start:end] = 0
+        self.reward[start:end] = 0
+        self.first_child[start:end] = -1
+        self.child_count[start:end] = 0
+        self.outcome[start:end] = player if wins else DRAW if empty_after == 0 else ONGOING
+        self.first_child[node], self.child_count[node] = start, len(moves)
+        self.size = end
+
+    def select_child(self, node):
+        start = self.first_child[node]
+        end = start + self.child_count[node]
+        visits = self.visits[start:end]
+        if not visits.all():
+            return start + int(np.argmin(visits != 0)) # First unvisited child
+        scores = self.reward[start:end] / visits + self.exploration * np.sqrt(math.log(self.visits[node]) / visits)
+        return start + int(np.argmax(scores))
+
+    def select(self, root_board, player):
+        """Walk from the root to a leaf, adding virtual visits; returns (path, board at the leaf, player to move there)."""
+        node, board = 0, root_board.copy()
+        path = [0]
+        while self.outcome[node] == ONGOING:
+            if self.first_child[node] < 0:
+                if node != 0 and self.visits[node] == 0:
+                    break
+                self.expand(node, board, player)
+            node = self.select_child(node)
+            board[self.move[node]] = player
+            player = 1 - player
+            path.append(node)
+        self.visits[path] += self.playouts_per_leaf
+        return path, board, player
+
+    def backup(self, path, wins, draws):
+        """Add playout results (wins per player, draws) to every node of path, as seen by each node's mover."""
+        path = np.asarray(path)
+        movers = self.mover[path]
+        self.reward[path] += np.where(movers == 0, wins[0], wins[1]) + 0.5 * draws
+
+    def search(self, board_state, player, deadline, max_playouts=MCTS_PLAYOUTS):
+        """Search until the deadline (time.time()) or max_playouts playouts; returns (best move, its expected score).
+
+        The move is the root child with the most visits; its score is its mean reward for player, in [0, 1].
+        """
+        start_time = time.time()
+        root_board = np.array(board_state, dtype=np.int8)
+        self.new_root(player)
+        self.playouts = 0
+        self.expand(0, root_board, player)
+        children = slice(self.first_child[0], self.first_child[0] + self.child_count[0])
+        forced = self.child_count[0] == 1 or (self.outcome[children] == player).any()
+
+        while not forced and self.playouts < max_playouts and time.time() < deadline:
+            paths, boards, movers = [], [], []
+            for _ in range(self.leaves_per_batch):
+                path, board, to_move = self.select(root_board, player)
+                outcome = self.outcome[path[-1]]
+                if outcome == ONGOING:
+                    paths.append(path)
+                    boards.append(board)
+                    movers.append(to_move)
+                else: # Known result: back it up without playing
+                    wins = [self.playouts_per_leaf * (outcome == 0), self.playouts_per_leaf * (outcome == 1)]
+                    self.backup(path, wins, self.playouts_per_leaf * (outcome == DRAW))
+                    self.playouts += self.playouts_per_leaf
+            if not paths:
+                continue
+            batch = np.repeat(np.array(boards, dtype=np.int8), self.playouts_per_leaf, axis=0)
+            to_move = np.repeat(np.array(movers, dtype=np.int8), self.playouts_per_leaf)
+            winners = random_playouts(batch, to_move, self.windows, self.rng).reshape(len(paths), self.playouts_per_leaf)
+            for path, leaf_winners in zip(paths, winners):
+                wins = [int(np.count_nonzero(leaf_winners == 0)), int(np.count_nonzero(leaf_winners == 1))]
+                self.backup(path, wins, self.playouts_per_leaf - wins[0] - wins[1])
+            self.playouts += len(paths) * self.playouts_per_leaf
+
+        self.elapsed = time.time() - start_time
+        self.playouts_per_second = self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+        visits = self.visits[children]
+        if forced:
+            best = children.start + int(np.argmax(self.outcome[children] == player))
+        else:
+            best = children.start + int(np.argmax(visits))
+        score = 1.0 if self.outcome[best] == player else float(self.reward[best] / self.visits[best]) if self.visits[best] else 0.5
+        return int(self.move[best]), score
@@ -0,0 +1,91 @@
+import math
+
+# Ordering scores, highest first. History scores are capped at HISTORY_LIMIT (in record_cutoff), below KILLER_SCORE.
+PV_SCORE = 4_000_000_000
+TT_SCORE = 3_000_000_000
+WIN_SCORE = 2_000_000_000
+BLOCK_SCORE = 1_000_000_000
+KILLER_SCORE = 500_000_000
+HISTORY_LIMIT = 100_000_000
+
+
+class MoveOrderer:
+    """Orders moves for alpha-beta: PV/TT move, immediate wins, blocks, killer moves, then history.
+
+    killers[ply] holds the two most recent quiet moves that caused a beta cutoff at that ply;
+    they are reset for every new root search. history[player][cell] accumulates depth^2 for every
+    cutoff caused by player playing cell and persists across the moves of a game (halved at the
+    start of each search so older games and positions fade out).
+    """
+
+    def __init__(self, cells, max_ply=64):
+        self.cells = cells
+        self.max_ply = max_ply
+        self.killers = [[None, None] for _ in range(max_ply)]
+        self.history = [[0] * cells, [0] * cells]
+        self.reset_cutoff_statistics()
+
+    def clear(self):
+        """Forget everything, for a new game."""
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        self.history = [[0] * self.cells, [0] * self.cells]
+        self.reset_cutoff_statistics()
+
+    def new_search(self):
+        """Drop killers from the previous move (plies no longer line up) and age the history table."""
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        for table in self.history:
+            for cell in range(self.cells):
+                table[cell] >>= 1
+        self.reset_cutoff_statistics()
+
+    def reset_cutoff_statistics(self):
+        self.cutoffs_by_move_index = []
+
+    def order(self, moves, player, ply, pv_move=None, tt_move=None, wins=(), blocks=()):
+        """Return moves sorted by ordering score; equal scores keep their board-index order."""
+        killers = self.killers[ply] if ply < self.max_ply else (None, None)
+        history = self.history[player]
+
+        def score(move):
+            if move == pv_move:
+                return PV_SCORE
+            if move == tt_move:
+                return TT_SCORE
+            if move in wins:
+                return WIN_SCORE
+            if move in blocks:
+                return BLOCK_SCORE
+            if move == killers[0]:
+                return KILLER_SCORE + 1
+            if move == killers[1]:
+                return KILLER_SCORE
+            return history[move]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def record_cutoff(self, move, player, ply, depth, move_index, quiet=True):
+        """A beta cutoff by move, which was the move_index-th child searched at this node. Only quiet moves (not the
+        PV/TT move, a win or a block, which are searched first anyway) take a killer slot.
+        """
+        while len(self.cutoffs_by_move_index) <= move_index:
+            self.cutoffs_by_move_index.append(0)
+        self.cutoffs_by_move_index[move_index] += 1
+
+        if quiet and ply < self.max_ply:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        history = self.history[player]
+        history[move] = min(history[move] + depth * depth, HISTORY_LIMIT)
+
+    def statistics(self, nodes, depth):
+        """First-move cutoff rate and effective branching factor (nodes ** (1 / depth)) of the last search."""
+        cutoffs = sum(self.cutoffs_by_move_index)
+        return {
+            "cutoffs": cutoffs,
+            "cutoffs_by_move_index": list(self.cutoffs_by_move_index),
+            "first_move_cutoff_rate": self.cutoffs_by_move_index[0] / cutoffs if cutoffs else 0.0,
+            "effective_branching_factor": math.pow(nodes, 1.0 / depth) if nodes and depth else 0.0,
+        }
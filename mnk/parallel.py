@@ -0,0 +1,224 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mnk.transposition import SharedTranspositionTable
+
+# Root children are searched with their window widened by this much past the shared best value,
+# so a move that only ties the best comes back with its exact value (values are multiples of 0.1 or +-1)
+# and the earliest such move in root order wins, as in the serial search.
+TIE_MARGIN = 1e-9
+
+# Lazy-SMP shared transposition table size when the agent has tt_size_mb=0
+LAZY_SMP_TT_MB = 16
+
+# Per-process state of a pool worker, set up once by _init_worker / _init_lazy_smp_worker
+_worker = {}
+
+
+def _init_worker(agent_options, shared_bound):
+    from mnk.Agent import Agent # Imported here: Agent imports this module
+
+    _worker["agent"] = Agent(**agent_options)
+    _worker["bound"] = shared_bound
+
+
+def _forget_in_worker():
+    """Clear the worker agent's transposition and move-ordering tables; returns the worker's pid."""
+    _worker["agent"].forget()
+    return os.getpid()
+
+
+def _start_workers(executor, workers):
+    """Start the pool's processes with tasks that search nothing, so the next search is not the one paying for
+    the start-up and no worker's tables hold anything it did not learn in that search.
+    """
+    return {future.result() for future in [executor.submit(_forget_in_worker) for _ in range(workers)]}
+
+
+def _search_root_move(board_state, move, depth, deadline):
+    """Search one root move in a worker; returns (move, value or None if the deadline passed, nodes,
+    the stacks profiled during the search or None if the agent does not profile).
+    """
+    profiler = _worker["agent"].profiler
+    if profiler is None:
+        return _search_root_move_unprofiled(board_state, move, depth, deadline) + (None,)
+    with profiler:
+        result = _search_root_move_unprofiled(board_state, move, depth, deadline)
+    return result + (profiler.take(),)
+
+
+def _search_root_move_unprofiled(board_state, move, depth, deadline):
+    from mnk.Agent import SearchTimeout
+
+    agent, bound = _worker["agent"], _worker["bound"]
+    agent.states_evaluated = 0
+    if time.time() > deadline: # Still queued when the iteration ran out of time
+        return move, None, 0
+    if deadline != agent.search_deadline: # First root move of a new move: age the ordering tables like get_next_move does
+        agent.search_deadline = deadline
+        if agent.orderer is not None:
+            agent.orderer.new_search()
+    agent.iteration_depth = depth
+    agent.pv_table = [[] for _ in range(depth + 2)]
+    agent.follow_pv = False
+
+    maximizing = agent.player_number == 0
+    with bound.get_lock():
+        best = bound.value
+    alpha, beta = (best - TIE_MARGIN, float("inf")) if maximizing else (float("-inf"), best + TIE_MARGIN)
+
+    search_state = agent.new_search_state(board_state)
+    agent.make_move(search_state, move, agent.player_number)
+    try:
+        value = agent.minimax(search_state, depth - 1, alpha, beta, not maximizing)
+    except SearchTimeout:
+        return move, None, agent.states_evaluated
+
+    with bound.get_lock():
+        if (value > bound.value) if maximizing else (value < bound.value):
+            bound.value = value
+    return move, value, agent.states_evaluated
+
+
+class RootSplitSearch:
+    """Searches the root moves of one iteration concurrently across a process pool.
+
+    Each worker process holds its own Agent built from agent_options (with its own transposition
+    table and move-ordering tables, kept for the life of the pool). The best root value found so far
+    is shared through a multiprocessing.Value: every root move is searched with alpha (or beta) at
+    that value, so subtrees that start later are still pruned against the best move found anywhere.
+    Moves that cannot beat the best value come back as bounds, moves that reach it come back exact,
+    so picking the first best move in root order returns the serial search's move. That holds without a
+    transposition table, late-move reductions or futility pruning: each worker's table can hold deeper
+    results than the serial search would have seen, and reductions and futility pruning make a move's
+    value depend on its window, which here is the shared bound rather than the serial search's alpha.
+    If profiler is given, what the workers profiled (agent_options["profile"]) is added to it.
+    """
+
+    def __init__(self, agent_options, workers, profiler=None):
+        context = multiprocessing.get_context()
+        self.workers = workers
+        self.profiler = profiler
+        self.bound = context.Value("d", 0.0)
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(agent_options, self.bound))
+
+    def start(self):
+        """Start the worker processes now rather than on the first search; returns their pids."""
+        return _start_workers(self.executor, self.workers)
+
+    def search_root(self, board_state, player_number, root_moves, depth, deadline):
+        """Returns (best move, its value, nodes searched); best move is None if the deadline passed."""
+        with self.bound.get_lock():
+            self.bound.value = float("-inf") if player_number == 0 else float("inf")
+        futures = [self.executor.submit(_search_root_move, board_state, move, depth, deadline) for move in root_moves]
+
+        best_move, best_value, nodes, timed_out = None, None, 0, False
+        for future in futures:
+            move, value, move_nodes, stacks = future.result()
+            nodes += move_nodes
+            if stacks is not None and self.profiler is not None:
+                self.profiler.add(stacks)
+            if value is None:
+                timed_out = True
+            elif not timed_out and (best_value is None or ((value > best_value) if player_number == 0 else (value < best_value))):
+                best_move, best_value = move, value
+        if timed_out:
+            return None, None, nodes
+        return best_move, best_value, nodes
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+def _init_lazy_smp_worker(agent_options, table_name, table_bytes, stop_flag):
+    from mnk.Agent import Agent
+
+    agent = Agent(**dict(agent_options, tt_size_mb=0))
+    agent.transposition_table = SharedTranspositionTable.attach(table_name, table_bytes)
+    agent.stop_flag = stop_flag
+    _worker["agent"] = agent
+
+
+def _lazy_smp_search(board_state, root_moves, worker_index, deadline):
+    """Full iterative deepening in one worker; returns its deepest completed result (with the stacks it profiled
+    under "profile" if the agent profiles).
+
+    Worker 0 searches exactly like the serial agent. Helpers rotate the root moves after the
+    first one by their index and odd helpers skip depth 1, so they reach different parts of the
+    tree first and leave results there in the shared table for the others.
+    """
+    agent = _worker["agent"]
+    if agent.profiler is None:
+        return _lazy_smp_search_unprofiled(agent, board_state, root_moves, worker_index, deadline)
+    with agent.profiler:
+        result = _lazy_smp_search_unprofiled(agent, board_state, root_moves, worker_index, deadline)
+    result["profile"] = agent.profiler.take()
+    return result
+
+
+def _lazy_smp_search_unprofiled(agent, board_state, root_moves, worker_index, deadline):
+    agent.states_evaluated = 0
+    agent.search_deadline = deadline
+    agent.completed_depth_in_last_move = 0
+    agent.pv_line = []
+    agent.iteration_nodes = []
+    if agent.orderer is not None:
+        agent.orderer.new_search()
+
+    root_moves = list(root_moves)
+    if worker_index and len(root_moves) > 2:
+        shift = worker_index % (len(root_moves) - 1)
+        root_moves[1:] = root_moves[1 + shift:] + root_moves[1:1 + shift]
+    search_state = agent.new_search_state(board_state)
+    move, value = agent.iterative_deepening(search_state, root_moves, board_state, first_depth=1 + worker_index % 2)
+    if not agent.search_timed_out:
+        agent.stop_flag.value = 1 # Finished every depth (or proved the result): the others can stop
+    return {"worker": worker_index, "depth": agent.completed_depth_in_last_move, "move": move, "value": value,
+            "nodes": agent.states_evaluated, "timed_out": agent.search_timed_out}
+
+
+class LazySMPSearch:
+    """Runs the agent's whole iterative-deepening search in every worker at once (Lazy SMP).
+
+    The workers share nothing but one lock-free SharedTranspositionTable and a stop flag; the
+    slightly different root orders and starting depths (see _lazy_smp_search) make them fill the
+    table for each other. As soon as one worker finishes its last depth, the others abandon their
+    current iteration, and the move is the result of the deepest completed iteration across all
+    workers, preferring the lowest worker index on equal depth.
+    """
+
+    def __init__(self, agent_options, workers, profiler=None):
+        context = multiprocessing.get_context()
+        self.workers = workers
+        self.profiler = profiler
+        table_bytes = int((agent_options.get("tt_size_mb") or LAZY_SMP_TT_MB) * 1024 * 1024)
+        self.table = SharedTranspositionTable(table_bytes)
+        self.stop_flag = context.Value("b", 0, lock=False)
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_lazy_smp_worker,
+                                            initargs=(agent_options, self.table.name, table_bytes, self.stop_flag))
+
+    def start(self):
+        """Start the worker processes now rather than on the first search; returns their pids."""
+        return _start_workers(self.executor, self.workers)
+
+    def search(self, board_state, root_moves, deadline):
+        """Returns a dict with the chosen "move" (-1 if no worker completed an iteration), "value", "depth",
+        total "nodes" and "timed_out" (True if no worker got through every depth).
+        """
+        self.stop_flag.value = 0
+        futures = [self.executor.submit(_lazy_smp_search, board_state, root_moves, worker_index, deadline) for worker_index in range(self.workers)]
+        results = [future.result() for future in futures]
+        if self.profiler is not None:
+            for result in results:
+                if "profile" in result:
+                    self.profiler.add(result["profile"])
+        completed = [result for result in results if result["move"] != -1]
+        best = max(completed, key=lambda result: (result["depth"], -result["worker"])) if completed else {"move": -1, "value": 0.0, "depth": 0}
+        return {"move": best["move"], "value": best["value"], "depth": best["depth"],
+                "nodes": sum(result["nodes"] for result in results), "timed_out": all(result["timed_out"] for result in results)}
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.table.close()
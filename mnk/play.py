@@ -1,5 +1,11 @@
 from mnk.Agent import Agent
 from mnk.Game import Game
+from mnk.profiling import Profiler
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import contextlib
+import io
+import os
 import time
 
 from mnk.constants import EMPTY, NOONE, MAX_TIME
@@ -20,6 +26,9 @@ AGENTS_CONFIG = [
 # If you want to play with agents having the same depth, adjust here or in AGENTS_CONFIG
 DEFAULT_AGENT_DEPTH = 3
 
+# Processes for run_tournament_parallel; 1 plays every game in this process
+TOURNAMENT_WORKERS = os.cpu_count() or 1
+
 # Helper functions
 def generate_circle(radius):
     # Generates a list of (dx, dy) tuples for a filled circle
@@ -44,6 +53,47 @@ def generate_circle(radius):
 
 CIRCLE_OF_TWO_CONFIG = generate_circle(2) # For the agent
 
+def play_game(game, game_index):
+    """Play one game from the current (reset) position of game until it is over; the result is left in game.winner."""
+    game_start_time = time.time()
+    while not game.is_game_over():
+        if PRINT_MOVES:
+            print(f"Turn for Player {game.player_turn} ({game.agents[game.player_turn].name})")
+        
+        current_agent = game.agents[game.player_turn]
+        
+        # Add timeout for agent's move
+        move_decision_start = time.time()
+        try:
+            move = current_agent.get_next_move()
+        except Exception as e:
+            print(f"Error during get_next_move for {current_agent.name}: {e}")
+            game.winner = 1 - current_agent.player_number # Opponent wins by default
+            if PRINT_MOVES: game.print_board()
+            break # End game
+        
+        move_decision_time = time.time() - move_decision_start
+        if PRINT_MOVES:
+            print(f"{current_agent.name} (P{current_agent.player_number}) plays at index {move} (Time: {move_decision_time:.3f}s)")
+
+        if game.board[move] != EMPTY: # Should be caught by agent, but as a safeguard
+            print(f"Error: Agent {current_agent.name} tried to play on occupied spot {move}. Opponent wins.")
+            game.winner = 1 - current_agent.player_number
+            if PRINT_MOVES: game.print_board()
+            break
+        
+        game.play_move(move) # play_move updates board, notifies agents, and switches turn (or handles win)
+
+        if time.time() - game_start_time > (MAX_TIME * (BOARD_SIZE[0]*BOARD_SIZE[1])): # Game timeout
+             print(f"Game {game_index+1} timed out. Declaring draw.")
+             game.winner = NOONE # Tie
+             break
+
+def create_agent(agent_config, player_number):
+    return Agent(player_number=player_number, board_size=BOARD_SIZE, winning_size=WINNING_SIZE,
+                 scoring_array=agent_config["scoring"], circle_of_two=CIRCLE_OF_TWO_CONFIG,
+                 name=agent_config["name"], depth=agent_config.get("depth", DEFAULT_AGENT_DEPTH), verbose=PRINT_MOVES)
+
 def run_tournament(agent_config1, agent_config2, num_games=100): # Take full configs
     """Run a tournament between two agents"""
     game = Game(BOARD_SIZE, WINNING_SIZE, PRINT_MOVES) # Use global PRINT_MOVES
@@ -51,13 +101,8 @@ def run_tournament(agent_config1, agent_config2, num_games=100): # Take full con
     # Create agents based on configs
     # Player 0 always uses agent_config1, Player 1 always uses agent_config2 for this specific match setup
     # Swapping happens by changing which config is agent_config1/agent_config2 in the outer loop
-    agent1 = Agent(player_number=0, board_size=BOARD_SIZE, winning_size=WINNING_SIZE,
-                   scoring_array=agent_config1["scoring"], circle_of_two=CIRCLE_OF_TWO_CONFIG,
-                   name=agent_config1["name"], depth=agent_config1.get("depth", DEFAULT_AGENT_DEPTH))
-    
-    agent2 = Agent(player_number=1, board_size=BOARD_SIZE, winning_size=WINNING_SIZE,
-                   scoring_array=agent_config2["scoring"], circle_of_two=CIRCLE_OF_TWO_CONFIG,
-                   name=agent_config2["name"], depth=agent_config2.get("depth", DEFAULT_AGENT_DEPTH))
+    agent1 = create_agent(agent_config1, 0)
+    agent2 = create_agent(agent_config2, 1)
 
     game.agents = [agent1, agent2]
     agent1.set_game(game)
@@ -69,7 +114,6 @@ def run_tournament(agent_config1, agent_config2, num_games=100): # Take full con
     draws = 0
 
     for i in range(num_games):
-        game_start_time = time.time()
         print(f"\n=== Starting game {i+1}/{num_games} ===")
         game.reset_game() # Reset board, player_turn, winner, and agent memory
 
@@ -78,40 +122,8 @@ def run_tournament(agent_config1, agent_config2, num_games=100): # Take full con
         # The original code swapped agent objects in game.agents.
         # Let's stick to agent1=P0, agent2=P1 for this match for simplicity of score tracking.
         # Swapping of who is "agent_config1" happens in main().
+        play_game(game, i)
 
-        while not game.is_game_over():
-            if PRINT_MOVES:
-                print(f"Turn for Player {game.player_turn} ({game.agents[game.player_turn].name})")
-            
-            current_agent = game.agents[game.player_turn]
-            
-            # Add timeout for agent's move
-            move_decision_start = time.time()
-            try:
-                move = current_agent.get_next_move()
-            except Exception as e:
-                print(f"Error during get_next_move for {current_agent.name}: {e}")
-                game.winner = 1 - current_agent.player_number # Opponent wins by default
-                if PRINT_MOVES: game.print_board()
-                break # End game
-            
-            move_decision_time = time.time() - move_decision_start
-            if PRINT_MOVES:
-                print(f"{current_agent.name} (P{current_agent.player_number}) plays at index {move} (Time: {move_decision_time:.3f}s)")
-
-            if game.board[move] != EMPTY: # Should be caught by agent, but as a safeguard
-                print(f"Error: Agent {current_agent.name} tried to play on occupied spot {move}. Opponent wins.")
-                game.winner = 1 - current_agent.player_number
-                if PRINT_MOVES: game.print_board()
-                break
-            
-            game.play_move(move) # play_move updates board, notifies agents, and switches turn (or handles win)
-
-            if time.time() - game_start_time > (MAX_TIME * (BOARD_SIZE[0]*BOARD_SIZE[1])): # Game timeout
-                 print(f"Game {i+1} timed out. Declaring draw.")
-                 game.winner = NOONE # Tie
-                 break
-        
         # After game.is_game_over() or break:
         if game.winner == 0: # Agent1 (P0) won
             match_scores[0] += 1
@@ -131,46 +143,112 @@ def run_tournament(agent_config1, agent_config2, num_games=100): # Take full con
     return match_scores, draws
 
 
-def main():
-    all_agent_configs = AGENTS_CONFIG.copy()
-    
-    # Store overall tournament results: agent_name -> {wins: x, losses: y, draws: z, games_played: n}
-    tournament_results = {cfg["name"]: {"wins": 0, "losses": 0, "draws": 0, "games_played":0} for cfg in all_agent_configs}
+# Agents built by this process for tournament games, by (whole config, player number); see play_tournament_game
+_tournament_agents = {}
+
+def _init_tournament_worker(settings):
+    globals().update(settings) # Board and agent settings of the parent, also under the spawn start method
+
+def play_tournament_game(config_p0, config_p1, game_index, profile=None):
+    """One tournament job: a single game between two agent configs. Returns (winner, printed output, profiled stacks).
 
-    for i in range(len(all_agent_configs)):
-        for j in range(i + 1, len(all_agent_configs)):
-            config1 = all_agent_configs[i]
-            config2 = all_agent_configs[j]
+    Agents are built once per process and reused, but reset_game() makes both forget() everything
+    (transposition table, history, killers) first, so the game is the same whichever jobs this
+    process played before - which is what makes tournament results independent of the worker count.
+    profile: a Profiler mode to profile the game with (see mnk/profiling.py); the stacks are None without one.
+    """
+    agents = []
+    for player_number, config in enumerate((config_p0, config_p1)):
+        key = (repr(sorted(config.items())), player_number) # Configs hold lists; two with one name can differ in depth or scoring
+        if key not in _tournament_agents:
+            _tournament_agents[key] = create_agent(config, player_number)
+        agents.append(_tournament_agents[key])
+    game = Game(BOARD_SIZE, WINNING_SIZE, PRINT_MOVES)
+    game.agents = agents
+    for agent in agents:
+        agent.set_game(game)
+    output = io.StringIO()
+    profiler = Profiler(profile) if profile is not None else None
+    with contextlib.redirect_stdout(output):
+        game.reset_game()
+        if profiler is None:
+            play_game(game, game_index)
+        else:
+            with profiler:
+                play_game(game, game_index)
+    return game.winner, output.getvalue(), profiler.take() if profiler is not None else None
 
-            # Match 1: config1 as P0, config2 as P1
-            print(f"\n=== Match: {config1['name']} (P0) vs {config2['name']} (P1) ===")
-            scores1, draws1 = run_tournament(config1, config2, TOTAL_GAMES // 2 or 1) # Play half games
-            tournament_results[config1['name']]['wins'] += scores1[0]
-            tournament_results[config1['name']]['games_played'] += (TOTAL_GAMES // 2 or 1)
-            tournament_results[config2['name']]['losses'] += scores1[0] # P2 loss = P1 win
+def tournament_jobs(agent_configs, total_games):
+    """(P0 config, P1 config, game index) for every game of the round robin, in the order main() used to play them:
+    each pairing plays total_games // 2 (at least 1) games with each colour.
+    """
+    games_per_colour = total_games // 2 or 1
+    jobs = []
+    for i in range(len(agent_configs)):
+        for j in range(i + 1, len(agent_configs)):
+            for config_p0, config_p1 in ((agent_configs[i], agent_configs[j]), (agent_configs[j], agent_configs[i])):
+                jobs.extend((config_p0, config_p1, game_index) for game_index in range(games_per_colour))
+    return jobs
 
-            tournament_results[config2['name']]['wins'] += scores1[1]
-            tournament_results[config2['name']]['games_played'] += (TOTAL_GAMES // 2 or 1)
-            tournament_results[config1['name']]['losses'] += scores1[1] # P1 loss = P2 win
-            
-            tournament_results[config1['name']]['draws'] += draws1
-            tournament_results[config2['name']]['draws'] += draws1
+def record_game(tournament_results, name_p0, name_p1, winner):
+    for name in (name_p0, name_p1):
+        tournament_results[name]["games_played"] += 1
+    if winner == 0:
+        tournament_results[name_p0]["wins"] += 1
+        tournament_results[name_p1]["losses"] += 1
+    elif winner == 1:
+        tournament_results[name_p1]["wins"] += 1
+        tournament_results[name_p0]["losses"] += 1
+    else: # NOONE, or an unknown state, counts as a draw
+        tournament_results[name_p0]["draws"] += 1
+        tournament_results[name_p1]["draws"] += 1
 
+def run_tournament_parallel(agent_configs, total_games=TOTAL_GAMES, workers=TOURNAMENT_WORKERS, profiler=None):
+    """Round robin over agent_configs with every game as an independent job on a pool of worker processes.
 
-            # Match 2: config2 as P0, config1 as P1
-            print(f"\n=== Match: {config2['name']} (P0) vs {config1['name']} (P1) ===")
-            scores2, draws2 = run_tournament(config2, config1, TOTAL_GAMES // 2 or 1) # Play other half
-            tournament_results[config2['name']]['wins'] += scores2[0]
-            tournament_results[config2['name']]['games_played'] += (TOTAL_GAMES // 2 or 1)
-            tournament_results[config1['name']]['losses'] += scores2[0]
+    Results are merged in job order into the tournament_results structure main() prints
+    (agent_name -> {wins, losses, draws, games_played}), so they do not depend on workers.
+    If profiler is given, every game is profiled in its worker with the profiler's mode and added to it.
+    """
+    tournament_results = {cfg["name"]: {"wins": 0, "losses": 0, "draws": 0, "games_played":0} for cfg in agent_configs}
+    jobs = tournament_jobs(agent_configs, total_games)
+    columns = list(zip(*jobs)) if jobs else [[], [], []]
+    columns.append([profiler.mode if profiler is not None else None] * len(jobs))
 
-            tournament_results[config1['name']]['wins'] += scores2[1]
-            tournament_results[config1['name']]['games_played'] += (TOTAL_GAMES // 2 or 1)
-            tournament_results[config2['name']]['losses'] += scores2[1]
+    if workers <= 1:
+        _tournament_agents.clear()
+        outcomes = map(play_tournament_game, *columns)
+        executor = None
+    else:
+        settings = {"BOARD_SIZE": BOARD_SIZE, "WINNING_SIZE": WINNING_SIZE, "PRINT_MOVES": PRINT_MOVES,
+                    "CIRCLE_OF_TWO_CONFIG": CIRCLE_OF_TWO_CONFIG, "DEFAULT_AGENT_DEPTH": DEFAULT_AGENT_DEPTH}
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_tournament_worker, initargs=(settings,))
+        outcomes = executor.map(play_tournament_game, *columns)
+    try:
+        for (config_p0, config_p1, game_index), (winner, output, stacks) in zip(jobs, outcomes):
+            if stacks is not None:
+                profiler.add(stacks)
+            if PRINT_MOVES:
+                print(output, end="")
+            print(f"Game {game_index+1}: {config_p0['name']} (P0) vs {config_p1['name']} (P1) ended. Winner: Player {winner if winner != NOONE else 'Draw'}")
+            record_game(tournament_results, config_p0["name"], config_p1["name"], winner)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return tournament_results
 
-            tournament_results[config2['name']]['draws'] += draws2
-            tournament_results[config1['name']]['draws'] += draws2
 
+def main():
+    parser = argparse.ArgumentParser(description="Round-robin tournament between the agents of AGENTS_CONFIG")
+    parser.add_argument("--profile", choices=("sample", "deterministic"), help="Profile every game (see mnk/profiling.py)")
+    parser.add_argument("--profile-output", default="play_profile",
+                        help="Prefix of the profile files: PREFIX.collapsed (flame graph input) and PREFIX.txt (hot functions)")
+    args = parser.parse_args()
+    all_agent_configs = AGENTS_CONFIG.copy()
+    profiler = Profiler(args.profile) if args.profile else None
+    
+    # Store overall tournament results: agent_name -> {wins: x, losses: y, draws: z, games_played: n}
+    tournament_results = run_tournament_parallel(all_agent_configs, TOTAL_GAMES, TOURNAMENT_WORKERS, profiler)
 
     print("\n--- Overall Tournament Results ---")
     for name, stats in tournament_results.items():
@@ -178,6 +256,9 @@ def main():
         print(f"{name}: Wins: {stats['wins']}, Losses: {stats['losses']}, Draws: {stats['draws']} "
               f"(Games: {stats['games_played']}, Win Rate: {win_rate:.1f}%)")
 
+    if profiler is not None:
+        print(f"\n{profiler.format_table()}Profile written to {', '.join(profiler.write(args.profile_output))}")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
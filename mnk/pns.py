@@ -0,0 +1,234 @@
+import sys
+
+import numpy as np
+
+from mnk.constants import EMPTY
+from mnk.frontier import Frontier
+from mnk.symmetry import symmetric_hashes, symmetry_permutations
+from mnk.threats import ThreatSearch
+
+# Proof and disproof numbers saturate here: a node with proof number INFINITY is disproven
+INFINITY = 10 ** 12
+
+# Table entries kept before the smallest subtrees are collected, about 200 bytes each in a dict
+DEFAULT_MAX_ENTRIES = 1 << 20
+
+# Share of the table that survives a collection
+COLLECT_KEEP = 0.5
+
+# Table keys are the smallest Zobrist hash of the stones over the board's symmetries, XOR this when player 1 is to move
+MOVER_KEY = 0x5BD1E995_9E3779B9
+
+
+class ProofBudgetExceeded(Exception):
+    """Raised inside ProofNumberSearch when a solve call has visited max_nodes nodes."""
+
+
+class ProofNumberSearch:
+    """Depth-first proof-number search (df-pn) that proves the outcome of a position.
+
+    A df-pn search proves or disproves one goal, "attacker wins". Every node stores (phi, delta)
+    from its mover's point of view, with phi = proof number of the mover's goal and delta = its
+    disproof number. The attacker's goal is to win; the defender's goal is to stop the attacker
+    winning, which includes a draw. The search always expands the child with the smallest delta.
+    It stays in that subtree until the subtree's numbers cross the thresholds its parent passed
+    down. A win, a loss and a draw therefore take two searches: "the player to move wins", then
+    "the opponent wins".
+
+    Terminal and forced positions come from the threat search's window state (mnk/threats.py):
+    - A mover with a winning cell has won.
+    - A mover facing two of the opponent's winning cells has lost.
+    - A mover facing one must block it.
+    - An attacker without a window it can still complete has failed.
+    Other moves come neighbourhood first from the agent's Frontier, then the rest of the board.
+    Cells outside every open window are skipped: a stone there is a pass, and in k-in-a-row an
+    extra stone never hurts, so passing is never better than any other move. The proof stays
+    complete.
+
+    Positions are keyed up to the board's rotations and reflections (their outcomes are equal), and
+    moves leading to symmetric positions are searched once. Results are cached in one table per
+    attacker, which keeps its results across solve calls. When a table grows past max_entries,
+    unproven entries with the least work (nodes spent below them) are dropped first: proven ones
+    are final and dropping them makes the search redo finished work.
+    """
+
+    def __init__(self, width, height, winning_size, circle_of_two, max_entries=DEFAULT_MAX_ENTRIES):
+        self.width = width
+        self.height = height
+        self.winning_size = winning_size
+        self.max_entries = max_entries
+        self.board = ThreatSearch(width, height, winning_size)
+        self.frontier = Frontier(width, height, circle_of_two)
+        self.group = tuple(tuple(permutation) for permutation in symmetry_permutations(width, height).tolist())
+        self.tables = ({}, {}) # Per attacker: key -> (phi, delta, work)
+        self.nodes = 0
+        self.collections = 0
+
+    def solve(self, board_state, player_to_move, max_nodes=None):
+        """(outcome, line) of the position with best play, or (None, []) if max_nodes nodes were not enough.
+
+        outcome is 1 if player 0 wins, -1 if player 1 wins and 0 for a draw (as in mnk/tablebase.py). line is a
+        principal line from this position to the end of the game: the winner wins, the loser resists longest.
+        """
+        board_state = np.asarray(board_state)
+        self.board.load(board_state)
+        self.frontier.load(board_state)
+        self.hashes = symmetric_hashes(board_state, self.group)
+        self.empty = int(np.count_nonzero(board_state == EMPTY))
+        self.nodes = 0
+        self.max_nodes = max_nodes
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * self.empty + 100))
+        opponent = 1 - player_to_move
+        try:
+            if self.prove(player_to_move, player_to_move):
+                winner = player_to_move
+            elif self.prove(opponent, player_to_move):
+                winner = opponent
+            else:
+                winner = None
+            line = self.principal_line(player_to_move, winner)
+        except ProofBudgetExceeded:
+            self.board.load(board_state)
+            self.frontier.load(board_state)
+            return None, []
+        outcome = 0 if winner is None else 1 if winner == 0 else -1
+        return outcome, line
+
+    def prove(self, attacker, mover):
+        """Whether attacker wins the position on the board, mover to move."""
+        phi, delta = self.mid(self.tables[attacker], attacker, mover, INFINITY, INFINITY)
+        return phi == 0 if mover == attacker else delta == 0
+
+    def key(self, mover):
+        return min(self.hashes) ^ (MOVER_KEY if mover else 0)
+
+    def child_key(self, mover, move):
+        """Key of the position after mover plays move, opponent to move."""
+        zobrist = self.board.zobrist[mover]
+        return min(position_hash ^ zobrist[permutation[move]] for position_hash, permutation in zip(self.hashes, self.group)) ^ (0 if mover else MOVER_KEY)
+
+    def expand(self, attacker, mover):
+        """((phi, delta), None) for a decided position, else (None, the moves to search)."""
+        board = self.board
+        if board.winning_cells(mover):
+            return (0, INFINITY), None
+        blocks = board.winning_cells(1 - mover)
+        if len(blocks) > 1:
+            return (INFINITY, 0), None
+        if self.empty == 0 or not board.open_windows[attacker]: # Draw at best: the defender's goal
+            return ((INFINITY, 0) if mover == attacker else (0, INFINITY)), None
+        if blocks:
+            return None, blocks
+        live = board.live_cells()
+        near = [cell for cell in self.frontier.moves() if cell in live]
+        return None, near + sorted(live.difference(near))
+
+    def update_hashes(self, move, mover):
+        zobrist = self.board.zobrist[mover]
+        for g, permutation in enumerate(self.group):
+            self.hashes[g] ^= zobrist[permutation[move]]
+
+    def play(self, move, mover):
+        self.update_hashes(move, mover)
+        self.board.place(move, mover)
+        self.frontier.place(move)
+        self.empty -= 1
+
+    def take_back(self, move, mover):
+        self.update_hashes(move, mover)
+        self.board.remove(move, mover)
+        self.frontier.remove(move)
+        self.empty += 1
+
+    def mid(self, table, attacker, mover, threshold_phi, threshold_delta):
+        """Multiple iterative deepening at one node: search until its (phi, delta) reach the thresholds; returns them."""
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise ProofBudgetExceeded()
+        key = self.key(mover)
+        nodes_before = self.nodes
+        decided, moves = self.expand(attacker, mover)
+        if decided is not None:
+            self.store(table, key, decided[0], decided[1], 1)
+            return decided
+
+        children = {} # One move per symmetric child position
+        for move in moves:
+            children.setdefault(self.child_key(mover, move), move)
+        child_keys, moves = list(children), list(children.values())
+        while True:
+            phi, delta = INFINITY, 0 # phi = smallest child delta, delta = sum of child phis
+            best_index, best_phi, second_delta = -1, 0, INFINITY
+            for index, child_key in enumerate(child_keys):
+                child_phi, child_delta = table.get(child_key, (1, 1, 0))[:2]
+                delta += child_phi
+                if child_delta < phi:
+                    best_index, best_phi, second_delta, phi = index, child_phi, phi, child_delta
+                elif child_delta < second_delta:
+                    second_delta = child_delta
+            delta = min(delta, INFINITY)
+            if phi >= threshold_phi or delta >= threshold_delta:
+                self.store(table, key, phi, delta, self.nodes - nodes_before + 1)
+                return phi, delta
+            move = moves[best_index]
+            self.play(move, mover)
+            self.mid(table, attacker, 1 - mover, threshold_delta + best_phi - delta, min(threshold_phi, second_delta + 1))
+            self.take_back(move, mover)
+
+    def store(self, table, key, phi, delta, work):
+        table[key] = (phi, delta, work)
+        if len(table) > self.max_entries:
+            self.collect(table)
+
+    def collect(self, table):
+        """Drop unproven entries, then proven ones, with the least work below them first, keeping COLLECT_KEEP of max_entries."""
+        self.collections += 1
+        by_work = sorted(table, key=lambda key: (table[key][0] == 0 or table[key][1] == 0, table[key][2]))
+        for key in by_work[:len(by_work) - int(self.max_entries * COLLECT_KEEP)]:
+            del table[key]
+
+    def child_entry(self, table, attacker, mover, move):
+        """The table entry of the child after mover plays move, searching it again if it was collected."""
+        entry = table.get(self.child_key(mover, move))
+        if entry is not None and (entry[0] == 0 or entry[1] == 0):
+            return entry
+        self.play(move, mover)
+        phi, delta = self.mid(table, attacker, 1 - mover, INFINITY, INFINITY)
+        entry = table.get(self.key(1 - mover), (phi, delta, 0))
+        self.take_back(move, mover)
+        return entry
+
+    def principal_line(self, player_to_move, winner):
+        """Moves from the root to the end of the game, following the proofs of the search results.
+
+        At each node the mover plays a child that the table proving its result marks as lost for the
+        opponent. A mover that cannot avoid losing plays the child that took the most work to prove.
+        """
+        line, played = [], []
+        mover = player_to_move
+        while True:
+            wins = self.board.winning_cells(mover)
+            if wins:
+                line.append(wins[0])
+                break
+            if self.empty == 0:
+                break
+            # The winner proves its win in its own table; otherwise the mover is the defender in the opponent's
+            attacker = mover if winner == mover else 1 - mover
+            table = self.tables[attacker]
+            moves = self.expand(attacker, mover)[1] or self.board.winning_cells(1 - mover) # Facing two threats: block one
+            if not moves: # No window left open for either player: the rest of the game is a draw
+                break
+            if winner is None or winner == mover:
+                proven = [move for move in moves if table.get(self.child_key(mover, move), (1, 1))[1] == 0]
+                # The proof's children can have been collected since: search them again until one is proven
+                choice = proven[0] if proven else next(move for move in moves if self.child_entry(table, attacker, mover, move)[1] == 0)
+            else:
+                choice = max(moves, key=lambda move: self.child_entry(table, attacker, mover, move)[2])
+            line.append(choice)
+            played.append((choice, mover))
+            self.play(choice, mover)
+            mover = 1 - mover
+        for move, player in reversed(played):
+            self.take_back(move, player)
+        return line
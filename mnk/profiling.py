@@ -0,0 +1,216 @@
+import os
+import sys
+import threading
+import time
+
+# Seconds between stack samples of a "sample" profiler
+SAMPLE_INTERVAL = 0.001
+# Rows of the hot-function table
+TOP_FUNCTIONS = 20
+# Time spent with no mnk function on the stack is reported under this name
+OUTSIDE_MNK = "(outside mnk)"
+
+# Profilers recording in this process; a forked child must not keep recording into its copy of them
+_running = set()
+
+
+def _stop_in_child():
+    for profiler in _running:
+        profiler.depth = 0
+    _running.clear()
+    sys.setprofile(None)
+
+
+os.register_at_fork(after_in_child=_stop_in_child)
+
+
+def frame_label(frame):
+    """module:qualified name of the function a frame is running, e.g. mnk.Agent:Agent.negamax.
+    A module run with python -m keeps its own name rather than __main__.
+    """
+    spec = frame.f_globals.get("__spec__")
+    module = spec.name if spec is not None else frame.f_globals.get("__name__", "?")
+    return f"{module}:{qualified_name(frame)}"
+
+
+def qualified_name(frame):
+    """The function's qualified name, e.g. Agent.negamax. Code objects only carry it from Python 3.11 on;
+    before that a method's class is found from its self argument.
+    """
+    code = frame.f_code
+    qualname = getattr(code, "co_qualname", None)
+    if qualname is not None:
+        return qualname
+    if code.co_argcount and code.co_varnames[0] == "self":
+        instance = frame.f_locals.get("self")
+        for cls in type(instance).__mro__: # The class that defines the method, not the instance's subclass
+            function = cls.__dict__.get(code.co_name)
+            if getattr(function, "__code__", None) is code:
+                return f"{cls.__qualname__}.{code.co_name}"
+    return code.co_name
+
+
+def builtin_label(function):
+    """Label of a C function seen by sys.setprofile, e.g. numpy:count_nonzero."""
+    module = getattr(function, "__module__", None) or type(getattr(function, "__self__", None)).__name__
+    return f"{module}:{getattr(function, '__qualname__', repr(function))}"
+
+
+def is_mnk_function(label):
+    return label.startswith("mnk.") and not label.startswith("mnk.profiling:")
+
+
+class Profiler:
+    """Where the time of a search, a game or a tournament goes, as full call stacks.
+
+    Used as a context manager (re-entrant; every with-block in one thread adds to the same totals):
+    mode "sample" reads the profiled thread's stack from a background thread every interval seconds,
+    which costs little and suits long runs (the interpreter's thread switch interval is lowered to
+    interval meanwhile, or the sampler would only get the GIL every 5 ms); mode "deterministic"
+    records every Python and C call with sys.setprofile, which is exact but makes the code several
+    times slower. Either way stacks maps
+    each call stack (a tuple of frame labels, outermost first, starting at the function that entered
+    the profiler) to the seconds spent in it.
+
+    Other processes profile into their own Profiler and send take()'s result back to be add()ed,
+    which is how the worker pools of mnk/parallel.py and play.py report.
+    """
+
+    def __init__(self, mode="sample", interval=SAMPLE_INTERVAL):
+        if mode not in ("sample", "deterministic"):
+            raise ValueError(f"Unknown profiling mode {mode!r}, expected 'sample' or 'deterministic'")
+        self.mode = mode
+        self.interval = interval
+        self.stacks = {}
+        self.depth = 0 # Nesting of with-blocks
+        self.labels = {} # Code object -> frame label, for the sampler
+
+    def __enter__(self):
+        self.depth += 1
+        if self.depth == 1:
+            self.start(sys._getframe(1))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            self.stop()
+        return False
+
+    def start(self, base_frame):
+        _running.add(self)
+        if self.mode == "sample":
+            self.switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self.interval, self.switch_interval))
+            self.stopping = threading.Event()
+            self.sampler = threading.Thread(target=self.sample, args=(threading.get_ident(), base_frame), daemon=True)
+            self.sampler.start()
+        else:
+            self.stack = (frame_label(base_frame),)
+            self.last_time = time.perf_counter()
+            sys.setprofile(self.record_event)
+
+    def stop(self):
+        _running.discard(self)
+        if self.mode == "sample":
+            self.stopping.set()
+            self.sampler.join()
+            sys.setswitchinterval(self.switch_interval)
+        else:
+            sys.setprofile(None)
+            self.add_time(self.stack, time.perf_counter() - self.last_time)
+
+    def add_time(self, stack, seconds):
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + seconds
+
+    def sample(self, thread_id, base_frame):
+        """Sampler thread: charge the time since the last sample to the profiled thread's current stack."""
+        labels = self.labels
+        last_time = time.perf_counter()
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(frame)
+                stack.append(label)
+                if frame is base_frame:
+                    break
+                frame = frame.f_back
+            stack.reverse()
+            if not any(label.startswith("mnk.profiling:") for label in stack): # Not inside the profiler's own enter or exit
+                self.add_time(tuple(stack), now - last_time)
+            last_time = now
+
+    def record_event(self, frame, event, arg):
+        """sys.setprofile hook: charge the time since the last event to the current stack, then push or pop."""
+        now = time.perf_counter()
+        stack = self.stack
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + now - self.last_time
+        if event == "call":
+            self.stack = stack + (frame_label(frame),)
+        elif event == "c_call":
+            self.stack = stack + (builtin_label(arg),)
+        elif len(stack) > 1: # return, c_return, c_exception; the base frame is never popped
+            self.stack = stack[:-1]
+        self.last_time = time.perf_counter() # The hook's own time is not charged to anything
+
+    def take(self):
+        """The stacks recorded so far, which are then forgotten (to send them to another process's add)."""
+        stacks, self.stacks = self.stacks, {}
+        return stacks
+
+    def add(self, stacks):
+        """Merge stacks recorded by another Profiler, usually in another process."""
+        for stack, seconds in stacks.items():
+            self.add_time(stack, seconds)
+
+    @property
+    def total_seconds(self):
+        return sum(self.stacks.values())
+
+    def collapsed(self):
+        """The stacks in the collapsed format of flamegraph.pl and speedscope: "a;b;c microseconds" lines."""
+        lines = [f"{';'.join(stack)} {round(seconds * 1e6)}" for stack, seconds in self.stacks.items() if round(seconds * 1e6)]
+        return "\n".join(sorted(lines)) + "\n"
+
+    def write_collapsed(self, path):
+        with open(path, "w") as output:
+            output.write(self.collapsed())
+
+    def hot_functions(self, limit=TOP_FUNCTIONS):
+        """[(mnk function, self seconds, total seconds)] by self seconds, at most limit rows.
+
+        A stack's time is self time of its innermost mnk function, so NumPy and builtin calls count towards
+        the mnk function that made them, and total time of every mnk function on it (once per stack).
+        """
+        self_seconds = {}
+        total_seconds = {}
+        for stack, seconds in self.stacks.items():
+            mnk_labels = [label for label in stack if is_mnk_function(label)]
+            innermost = mnk_labels[-1] if mnk_labels else OUTSIDE_MNK
+            self_seconds[innermost] = self_seconds.get(innermost, 0.0) + seconds
+            for label in set(mnk_labels):
+                total_seconds[label] = total_seconds.get(label, 0.0) + seconds
+        rows = [(label, seconds, total_seconds.get(label, seconds)) for label, seconds in self_seconds.items()]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:limit]
+
+    def format_table(self, limit=TOP_FUNCTIONS):
+        total = self.total_seconds
+        lines = [f"{self.mode} profile, {total:.3f} s", f"{'self s':>9} {'self':>6} {'total s':>9} {'total':>6}  function"]
+        for label, self_seconds, total_seconds in self.hot_functions(limit):
+            lines.append(f"{self_seconds:>9.3f} {self_seconds / total if total else 0.0:>6.1%} "
+                         f"{total_seconds:>9.3f} {total_seconds / total if total else 0.0:>6.1%}  {label}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, prefix):
+        """Write prefix.collapsed (for flame graphs) and prefix.txt (the hot-function table); returns both paths."""
+        paths = (f"{prefix}.collapsed", f"{prefix}.txt")
+        self.write_collapsed(paths[0])
+        with open(paths[1], "w") as output:
+            output.write(self.format_table())
+        return paths
@@ -0,0 +1,32 @@
+from mnk.constants import EMPTY
+
+# (dx, dy) for the four line directions, same order as Agent.directions
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+
+def run_length(board, move, player, width, height, dx, dy):
+    """Length of player's run through move along (dx, dy), counting move itself as player's stone."""
+    x, y = move % width, move // width
+    run = 1
+    for step_x, step_y in ((dx, dy), (-dx, -dy)):
+        cx, cy = x + step_x, y + step_y
+        while 0 <= cx < width and 0 <= cy < height and board[cy * width + cx] == player:
+            run += 1
+            cx += step_x
+            cy += step_y
+    return run
+
+
+def is_winning_move(board, move, player, width, height, winning_size):
+    """True if player having a stone on move gives a run of winning_size or more through it.
+
+    Only lines through move are walked, so this is O(k) instead of a full-board scan.
+    A new win can only pass through the stone just placed, which makes this the complete
+    terminal check after a move. board[move] may be EMPTY, to ask whether a move would win.
+    """
+    if player == EMPTY:
+        return False
+    for dx, dy in DIRECTIONS:
+        if run_length(board, move, player, width, height, dx, dy) >= winning_size:
+            return True
+    return False
@@ -0,0 +1,192 @@
+import time
+
+
+class SearchStats:
+    """What one Agent.get_next_move did: how the move was chosen, the tree it searched and where the time went.
+
+    Every move fills in the summary: source ("search", "tablebase", "book", "threats", "mcts" or
+    "fallback"), move, value (for player 0), nodes, elapsed seconds, the deepest completed
+    iteration and the nodes of each iteration, transposition table probes and hits, cutoffs by
+    move index (with move ordering) and the counters of the selective search. They are read off
+    the agent's existing counters once the move is chosen, so they cost nothing during the search.
+
+    The per-node counters (leaves, terminal hits, nodes and leaves at each ply, and the time spent
+    in generate_next_moves, is_game_over and evaluate) are only filled by an agent built with
+    search_stats=True, which wraps those methods with instrument(); detailed is True then. They
+    cover the serial search, not the nodes searched by worker processes.
+    """
+
+    def __init__(self, detailed=False):
+        self.source = None
+        self.move = None
+        self.value = None
+        self.timed_out = False
+        self.elapsed = 0.0
+        self.nodes = 0
+        self.depth = 0 # Deepest completed iteration
+        self.iteration_nodes = []
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.cutoffs_by_move_index = []
+        self.aspiration_researches = 0 # Root searches repeated after failing outside the aspiration window
+        self.reduced_moves = 0 # Moves searched at reduced depth, and those searched again at full depth
+        self.reduction_researches = 0
+        self.futility_pruned = 0 # Moves skipped by futility pruning
+        self.plies_to_end = None # Length of the tablebase or threat-space line
+        self.playouts = 0 # MCTS playouts
+
+        self.detailed = detailed
+        self.ply = 0 # Ply of the node being searched and negamax calls so far, kept by instrument()'s negamax
+        self.visits = 0
+        self.leaves = 0 # Nodes that returned without searching a child: horizon, terminal or transposition cutoff
+        self.terminal_hits = 0
+        self.nodes_by_ply = [] # Root searches at ply 0, negamax nodes below it
+        self.leaves_by_ply = []
+        self.root_values = {} # Value (for player 0) of each root move in the last root search; a bound if it failed low
+        self.move_generation_time = 0.0
+        self.terminal_check_time = 0.0
+        self.evaluation_time = 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def max_ply(self):
+        """Deepest ply any node was searched at (detailed stats only)."""
+        return len(self.nodes_by_ply) - 1
+
+    def branching_factors(self):
+        """For each ply, the nodes at the next ply per node at this one that searched children (detailed stats only)."""
+        return [self.nodes_by_ply[ply + 1] / (self.nodes_by_ply[ply] - self.leaves_by_ply[ply])
+                for ply in range(len(self.nodes_by_ply) - 1) if self.nodes_by_ply[ply] > self.leaves_by_ply[ply]]
+
+    def time_split(self):
+        """Seconds in move generation, terminal checks, evaluation and everything else (detailed stats only)."""
+        measured = self.move_generation_time + self.terminal_check_time + self.evaluation_time
+        return {"move_generation": self.move_generation_time, "terminal_check": self.terminal_check_time,
+                "evaluation": self.evaluation_time, "other": max(self.elapsed - measured, 0.0)}
+
+    def as_dict(self):
+        """Plain data for logs and tooling (json.dumps-able)."""
+        result = {
+            "source": self.source, "move": self.move, "value": self.value, "timed_out": self.timed_out,
+            "elapsed": self.elapsed, "nodes": self.nodes, "nodes_per_second": self.nodes_per_second,
+            "depth": self.depth, "iteration_nodes": list(self.iteration_nodes),
+            "tt_probes": self.tt_probes, "tt_hits": self.tt_hits, "tt_hit_rate": self.tt_hit_rate,
+            "cutoffs_by_move_index": list(self.cutoffs_by_move_index),
+            "aspiration_researches": self.aspiration_researches, "reduced_moves": self.reduced_moves,
+            "reduction_researches": self.reduction_researches, "futility_pruned": self.futility_pruned,
+            "plies_to_end": self.plies_to_end, "playouts": self.playouts,
+        }
+        if self.detailed:
+            result.update({
+                "leaves": self.leaves, "terminal_hits": self.terminal_hits, "max_ply": self.max_ply,
+                "nodes_by_ply": list(self.nodes_by_ply), "leaves_by_ply": list(self.leaves_by_ply),
+                "branching_factors": self.branching_factors(), "root_values": dict(self.root_values),
+                "time_split": self.time_split(),
+            })
+        return result
+
+    def summary(self):
+        """One line describing the move, as the agent prints it when verbose."""
+        value = f" with value {self.value:.2f}" if self.value is not None else ""
+        line = f"{self.source} move {self.move}{value}"
+        if self.source == "search":
+            line += f" (depth {self.depth}{', timed out' if self.timed_out else ''}, {self.nodes} nodes, {self.nodes_per_second:.0f}/s)"
+        elif self.plies_to_end is not None:
+            line += f" ({self.plies_to_end} plies to the end)"
+        elif self.source == "mcts":
+            line += f" ({self.playouts} playouts, {self.playouts / self.elapsed if self.elapsed else 0.0:.0f}/s)"
+        return line
+
+
+def _grow(counts, index):
+    while len(counts) <= index:
+        counts.append(0)
+
+
+def instrument(agent):
+    """Wrap agent's search methods, on the instance, to fill the detailed counters of agent.stats.
+
+    An agent that is never instrumented runs the plain methods, so the detailed counters cost
+    nothing unless they are asked for.
+    """
+    search_root, negamax = agent.search_root, agent.negamax
+    generate_next_moves, is_game_over, evaluate = agent.generate_next_moves, agent.is_game_over, agent.evaluate
+
+    def counted_search_root(search_state, root_moves, depth, alpha=float("-inf"), beta=float("inf")):
+        stats = agent.stats
+        _grow(stats.nodes_by_ply, 0)
+        _grow(stats.leaves_by_ply, 0)
+        stats.nodes_by_ply[0] += 1
+        stats.ply = 0
+        # Each root move's value is negamax's value for the opponent, negated and converted to player 0's view
+        sign = 1 if agent.player_number == 0 else -1
+        root_values = {}
+
+        def root_child(state, child_depth, child_alpha, child_beta, player):
+            agent.negamax = counted_negamax # Nodes below the root's children are plain nodes
+            try:
+                value = counted_negamax(state, child_depth, child_alpha, child_beta, player)
+            finally:
+                agent.negamax = root_child
+            root_values[state["last_move"]] = -sign * value
+            return value
+
+        agent.negamax = root_child
+        try:
+            result = search_root(search_state, root_moves, depth, alpha, beta)
+        finally:
+            agent.negamax = counted_negamax
+        stats.root_values = root_values
+        return result
+
+    def counted_negamax(state, depth, alpha, beta, player):
+        stats = agent.stats
+        parent_ply = stats.ply
+        ply = stats.ply = parent_ply + 1
+        nodes_by_ply = stats.nodes_by_ply
+        if len(nodes_by_ply) <= ply:
+            _grow(nodes_by_ply, ply)
+            _grow(stats.leaves_by_ply, ply)
+        nodes_by_ply[ply] += 1
+        stats.visits += 1
+        visits = stats.visits
+        value = negamax(state, depth, alpha, beta, player)
+        if stats.visits == visits: # No child was searched
+            stats.leaves += 1
+            stats.leaves_by_ply[ply] += 1
+        stats.ply = parent_ply
+        return value
+
+    def timed_generate_next_moves(state):
+        start = time.perf_counter()
+        moves = generate_next_moves(state)
+        agent.stats.move_generation_time += time.perf_counter() - start
+        return moves
+
+    def timed_is_game_over(state):
+        start = time.perf_counter()
+        result = is_game_over(state)
+        stats = agent.stats
+        stats.terminal_check_time += time.perf_counter() - start
+        if result[0]:
+            stats.terminal_hits += 1
+        return result
+
+    def timed_evaluate(state, winner):
+        start = time.perf_counter()
+        value = evaluate(state, winner)
+        agent.stats.evaluation_time += time.perf_counter() - start
+        return value
+
+    agent.search_root = counted_search_root
+    agent.negamax = counted_negamax
+    agent.generate_next_moves = timed_generate_next_moves
+    agent.is_game_over = timed_is_game_over
+    agent.evaluate = timed_evaluate
@@ -0,0 +1,119 @@
+import functools
+
+import numpy as np
+
+from mnk.transposition import zobrist_keys
+
+# Coordinate maps of the dihedral group; each takes (x, y, width, height) to the transformed (x, y).
+# Rectangular boards only have the first four (their other four swap width and height).
+TRANSFORMS = (
+    ("identity", lambda x, y, w, h: (x, y)),
+    ("flip_x", lambda x, y, w, h: (w - 1 - x, y)),
+    ("flip_y", lambda x, y, w, h: (x, h - 1 - y)),
+    ("rotate_180", lambda x, y, w, h: (w - 1 - x, h - 1 - y)),
+    ("rotate_90", lambda x, y, w, h: (w - 1 - y, x)),
+    ("rotate_270", lambda x, y, w, h: (y, h - 1 - x)),
+    ("transpose", lambda x, y, w, h: (y, x)),
+    ("anti_transpose", lambda x, y, w, h: (w - 1 - y, h - 1 - x)),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def symmetry_permutations(width, height):
+    """Cell permutations of the board's symmetry group, shape (8, cells) on square boards and (4, cells) otherwise.
+
+    permutations[g][i] is the cell that cell i is moved to by transform g; row 0 is the identity.
+    """
+    transforms = TRANSFORMS if width == height else TRANSFORMS[:4]
+    permutations = np.empty((len(transforms), width * height), dtype=np.intp)
+    for g, (_, fn) in enumerate(transforms):
+        for i in range(width * height):
+            x, y = fn(i % width, i // width, width, height)
+            permutations[g, i] = y * width + x
+    permutations.setflags(write=False)
+    return permutations
+
+
+def symmetry_transform_indices(width, height, circle_of_two):
+    """Indices (into TRANSFORMS) of the board's transforms that also map circle_of_two onto itself.
+
+    Only those transforms turn the move generator's neighbourhood into itself, so only under them
+    are symmetric positions guaranteed to have symmetric subtrees and equal values.
+    """
+    transforms = TRANSFORMS if width == height else TRANSFORMS[:4]
+    offsets = set(map(tuple, circle_of_two))
+    indices = []
+    for index, (_, fn) in enumerate(transforms):
+        origin = fn(0, 0, width, height)
+        mapped = {(x - origin[0], y - origin[1]) for x, y in (fn(dx, dy, width, height) for dx, dy in offsets)}
+        if mapped == offsets:
+            indices.append(index)
+    return tuple(indices)
+
+
+def symmetry_group(width, height, circle_of_two=None, indices=None):
+    """Permutations (as tuples) of the transforms in indices, identity first.
+
+    indices default to symmetry_transform_indices(width, height, circle_of_two).
+    """
+    if indices is None:
+        indices = symmetry_transform_indices(width, height, circle_of_two)
+    permutations = symmetry_permutations(width, height)
+    return tuple(tuple(permutations[index].tolist()) for index in indices)
+
+
+def inverse_permutations(group):
+    inverses = []
+    for permutation in group:
+        inverse = [0] * len(permutation)
+        for cell, image in enumerate(permutation):
+            inverse[image] = cell
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
+
+
+def symmetric_hashes(board_state, group):
+    """Zobrist hash of every transformed copy of the board, in group order (element 0 is the plain hash)."""
+    board_state = np.asarray(board_state)
+    keys = zobrist_keys(len(board_state))
+    hashes = []
+    for permutation in group:
+        position_hash = 0
+        for player in range(2):
+            for idx in np.flatnonzero(board_state == player).tolist():
+                position_hash ^= keys[player][permutation[idx]]
+        hashes.append(position_hash)
+    return hashes
+
+
+def canonical_hash(board_state, group):
+    """(smallest symmetric hash, index of the transform that gives it): equal for all symmetric positions."""
+    hashes = symmetric_hashes(board_state, group)
+    canonical = min(hashes)
+    return canonical, hashes.index(canonical)
+
+
+def canonical_board(board_state, group):
+    """Lexicographically smallest transformed copy of the board, and the index of its transform."""
+    board_state = np.asarray(board_state)
+    best, best_index = None, 0
+    for index, permutation in enumerate(group):
+        transformed = np.empty_like(board_state)
+        transformed[list(permutation)] = board_state
+        if best is None or transformed.tolist() < best.tolist():
+            best, best_index = transformed, index
+    return best, best_index
+
+
+def unique_moves(moves, group, hashes):
+    """Drop moves that a symmetry of the current position maps onto another listed move.
+
+    hashes are the position's symmetric hashes; the transforms whose hash equals the plain hash
+    leave the position unchanged (its stabilizer), and each orbit of moves under them keeps only
+    its smallest cell index, so the kept moves are still in the order they were given.
+    """
+    stabilizer = [group[g] for g in range(1, len(group)) if hashes[g] == hashes[0]]
+    if not stabilizer:
+        return moves
+    listed = set(moves)
+    return [move for move in moves if not any(permutation[move] < move and permutation[move] in listed for permutation in stabilizer)]
@@ -0,0 +1,203 @@
+import argparse
+import sys
+
+import numpy as np
+
+from mnk.constants import EMPTY
+from mnk.rules import is_winning_move
+from mnk.symmetry import symmetry_permutations
+
+# File layout: header (magic, width, height, winning_size, entries) as 5 little-endian uint64,
+# then the sorted canonical keys (uint64), outcomes (int8: 1 = player 0 wins, -1 = player 1 wins, 0 = draw)
+# and distances (uint8: plies to the end of the game with best play), each as one contiguous array.
+MAGIC = 0x31425420_4B4E4D # "MNK TB1"
+HEADER = np.dtype([("magic", "<u8"), ("width", "<u8"), ("height", "<u8"), ("winning_size", "<u8"), ("entries", "<u8")])
+
+# Base-3 keys of every cell must fit in a uint64
+MAX_CELLS = 40
+
+
+def position_keys(board_state, permutations):
+    """Base-3 key (digit = cell value + 1) of every transformed copy of the board, as a uint64 array."""
+    powers = 3 ** np.arange(len(board_state), dtype=np.uint64)
+    digits = np.asarray(board_state, dtype=np.int64) + 1
+    keys = np.zeros(len(permutations), dtype=np.uint64)
+    for cell in np.flatnonzero(digits).tolist():
+        keys += np.uint64(digits[cell]) * powers[permutations[:, cell]]
+    return keys
+
+
+def solve(width, height, winning_size):
+    """Solve every position reachable from the empty board; returns {canonical key: (outcome, distance)}.
+
+    Exhaustive memoized minimax over positions canonicalized by the board's rotations and
+    reflections. Positions where the game is already over (a line or a full board) are not
+    stored: Tablebase.best_moves recognises them from the move that ends the game.
+    Player 0 moves first, so the player to move follows from the number of stones.
+    """
+    cells = width * height
+    if cells > MAX_CELLS:
+        raise ValueError(f"{width}x{height} has more than {MAX_CELLS} cells, its keys do not fit in 64 bits")
+    permutations = symmetry_permutations(width, height).tolist()
+    powers = [3 ** cell for cell in range(cells)]
+    # digit_values[g][cell][player]: what a stone of player on cell adds to the key of transform g
+    digit_values = [[(powers[permutation[cell]], 2 * powers[permutation[cell]]) for cell in range(cells)] for permutation in permutations]
+    board = [EMPTY] * cells
+    table = {}
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * cells + 100))
+
+    def search(keys, player, stones):
+        canonical = min(keys)
+        known = table.get(canonical)
+        if known is not None:
+            return known
+        best = None
+        for move in range(cells):
+            if board[move] != EMPTY:
+                continue
+            if is_winning_move(board, move, player, width, height, winning_size):
+                result = (1 if player == 0 else -1, 1)
+            elif stones + 1 == cells:
+                result = (0, 1)
+            else:
+                board[move] = player
+                child_keys = [key + digit_values[g][move][player] for g, key in enumerate(keys)]
+                outcome, distance = search(child_keys, 1 - player, stones + 1)
+                board[move] = EMPTY
+                result = (outcome, distance + 1)
+            if best is None or better(result, best, player):
+                best = result
+        table[canonical] = best
+        return best
+
+    search([0] * len(permutations), 0, 0)
+    return table
+
+
+def better(result, best, player):
+    """Whether (outcome, distance) result is better than best for player: win fastest, lose slowest."""
+    outcome, distance = result
+    best_outcome, best_distance = best
+    if player == 1:
+        outcome, best_outcome = -outcome, -best_outcome
+    if outcome != best_outcome:
+        return outcome > best_outcome
+    return distance < best_distance if outcome > 0 else distance > best_distance
+
+
+def write_tablebase(path, width, height, winning_size, table):
+    keys = np.fromiter(table.keys(), dtype=np.uint64, count=len(table))
+    order = np.argsort(keys)
+    results = np.array(list(table.values()), dtype=np.int16).reshape(-1, 2)[order]
+    header = np.array([(MAGIC, width, height, winning_size, len(table))], dtype=HEADER)
+    with open(path, "wb") as tablebase_file:
+        tablebase_file.write(header.tobytes())
+        tablebase_file.write(keys[order].astype("<u8").tobytes())
+        tablebase_file.write(results[:, 0].astype(np.int8).tobytes())
+        tablebase_file.write(results[:, 1].astype(np.uint8).tobytes())
+
+
+class Tablebase:
+    """Read-only view of a tablebase file through np.memmap.
+
+    Opening only reads the header; lookups binary-search the sorted key array (O(log n) pages
+    touched), so an agent can use a large table without loading it.
+    """
+
+    def __init__(self, path):
+        header = np.fromfile(path, dtype=HEADER, count=1)[0]
+        if int(header["magic"]) != MAGIC:
+            raise ValueError(f"{path} is not an m,n,k tablebase")
+        self.path = path
+        self.width, self.height = int(header["width"]), int(header["height"])
+        self.winning_size = int(header["winning_size"])
+        entries = int(header["entries"])
+        offset = HEADER.itemsize
+        self.keys = np.memmap(path, dtype="<u8", mode="r", offset=offset, shape=(entries,))
+        offset += 8 * entries
+        self.outcomes = np.memmap(path, dtype=np.int8, mode="r", offset=offset, shape=(entries,))
+        offset += entries
+        self.distances = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(entries,))
+        self.permutations = np.asarray(symmetry_permutations(self.width, self.height))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def matches(self, board_size, winning_size):
+        return tuple(board_size) == (self.width, self.height) and winning_size == self.winning_size
+
+    def lookup_keys(self, canonical_keys):
+        """(outcomes, distances) for an array of canonical keys; outcome is None-like (found=False) where missing."""
+        index = np.searchsorted(self.keys, canonical_keys)
+        index = np.minimum(index, len(self.keys) - 1)
+        found = self.keys[index] == canonical_keys
+        return found, self.outcomes[index], self.distances[index]
+
+    def probe(self, board_state):
+        """(outcome, distance) of a position where the game is not over yet, or None if it is not in the table."""
+        found, outcomes, distances = self.lookup_keys(position_keys(board_state, self.permutations).min(keepdims=True))
+        if not found[0]:
+            return None
+        return int(outcomes[0]), int(distances[0])
+
+    def best_moves(self, board_state, player):
+        """Every legal move for player with its (outcome, distance) after it, or None if any position is missing.
+
+        board_state must be a position reachable in play with player to move (player 0 moves first).
+        """
+        board_state = np.asarray(board_state)
+        stones = np.count_nonzero(board_state != EMPTY)
+        if player != stones % 2 or not len(self.keys):
+            return None
+        moves = np.flatnonzero(board_state == EMPTY)
+        results = {}
+        to_look_up = []
+        for move in moves.tolist():
+            if is_winning_move(board_state, move, player, self.width, self.height, self.winning_size):
+                results[move] = (1 if player == 0 else -1, 1)
+            elif stones + 1 == len(board_state):
+                results[move] = (0, 1)
+            else:
+                to_look_up.append(move)
+        if to_look_up:
+            # Key of each child under every symmetry: the parent's key plus the new stone's digit
+            parent_keys = position_keys(board_state, self.permutations)
+            powers = 3 ** self.permutations[:, to_look_up].astype(np.uint64)
+            child_keys = (parent_keys[:, None] + np.uint64(player + 1) * powers).min(axis=0)
+            found, outcomes, distances = self.lookup_keys(child_keys)
+            if not found.all():
+                return None
+            for move, outcome, distance in zip(to_look_up, outcomes.tolist(), distances.tolist()):
+                results[move] = (outcome, distance + 1)
+        return results
+
+    def best_move(self, board_state, player):
+        """(move, outcome, distance) of the best move for player, lowest index among equals; None if not covered."""
+        results = self.best_moves(board_state, player)
+        if not results:
+            return None
+        best_move = None
+        for move in sorted(results):
+            if best_move is None or better(results[move], results[best_move], player):
+                best_move = move
+        return (best_move,) + results[best_move]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a small m,n,k game and write its tablebase")
+    parser.add_argument("width", type=int)
+    parser.add_argument("height", type=int)
+    parser.add_argument("winning_size", type=int)
+    parser.add_argument("--output", help="Output file (default: <width>x<height>x<k>.mnktb)")
+    args = parser.parse_args()
+
+    table = solve(args.width, args.height, args.winning_size)
+    path = args.output or f"{args.width}x{args.height}x{args.winning_size}.mnktb"
+    write_tablebase(path, args.width, args.height, args.winning_size, table)
+    outcome, distance = table[0]
+    result = {1: "player 0 wins", -1: "player 1 wins", 0: "draw"}[outcome]
+    print(f"{path}: {len(table)} positions, empty board: {result} in {distance} plies")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import numpy as np
+
+from mnk.constants import EMPTY
+from mnk.transposition import zobrist_keys
+from mnk.windows import cell_windows, window_indices
+
+# Attacker moves in the longest forcing line threat search tries, when no depth is given
+THREAT_SEARCH_DEPTH = 12
+
+
+class ThreatBudgetExceeded(Exception):
+    """Raised inside ThreatSearch when the node budget of a find_win call is used up."""
+
+
+class ThreatSearch:
+    """Forced-win search over continuous k-1 threats (VCF, "victory by continuous fours").
+
+    Only windows along the four line directions (the rows of windows.window_indices) matter:
+    a window with k-1 of a player's stones and no opponent stone is a threat to win on its last
+    cell, and one with k-2 stones is a threat to make such a threat. The attacker only plays
+    moves that turn a k-2 window into a k-1 one, so every attacker move forces the defender to
+    block the one winning cell it creates (or lose), and two winning cells at once cannot both
+    be blocked. A defender reply that makes a k-1 threat of its own must in turn be answered by
+    an attacker move that both blocks it and keeps the initiative. Because the defender's replies
+    are forced, a line found this way is a proof of a win, however deep it is, and the search
+    visits only a handful of moves per ply instead of every empty cell.
+
+    Window occupancy is tracked incrementally: fours[p] and threes[p] are the ids of the windows
+    where player p has k-1 / k-2 stones and the opponent none, and open_windows[p] counts the
+    windows p can still complete (no opponent stone).
+    """
+
+    def __init__(self, width, height, winning_size):
+        self.width = width
+        self.height = height
+        self.winning_size = winning_size
+        self.windows = window_indices(width, height, winning_size).tolist()
+        self.cell_windows = cell_windows(width, height, winning_size)
+        self.zobrist = zobrist_keys(width * height)
+        self.nodes = 0
+
+    def load(self, board_state):
+        self.board = [int(value) for value in np.asarray(board_state).tolist()]
+        self.pieces = [[0] * len(self.windows), [0] * len(self.windows)]
+        for window_id, window in enumerate(self.windows):
+            for cell in window:
+                if self.board[cell] != EMPTY:
+                    self.pieces[self.board[cell]][window_id] += 1
+        self.fours = [set(), set()]
+        self.threes = [set(), set()]
+        self.open_windows = [self.pieces[1].count(0), self.pieces[0].count(0)]
+        for window_id in range(len(self.windows)):
+            self.classify(window_id)
+        self.hash = 0
+        for cell, value in enumerate(self.board):
+            if value != EMPTY:
+                self.hash ^= self.zobrist[value][cell]
+
+    def classify(self, window_id):
+        k = self.winning_size
+        for player in range(2):
+            own, theirs = self.pieces[player][window_id], self.pieces[1 - player][window_id]
+            if theirs == 0 and own == k - 1:
+                self.fours[player].add(window_id)
+            else:
+                self.fours[player].discard(window_id)
+            if theirs == 0 and own == k - 2 and k > 2:
+                self.threes[player].add(window_id)
+            else:
+                self.threes[player].discard(window_id)
+
+    def place(self, cell, player):
+        self.board[cell] = player
+        self.hash ^= self.zobrist[player][cell]
+        pieces = self.pieces[player]
+        for window_id in self.cell_windows[cell]:
+            pieces[window_id] += 1
+            if pieces[window_id] == 1:
+                self.open_windows[1 - player] -= 1
+            self.classify(window_id)
+
+    def remove(self, cell, player):
+        self.board[cell] = EMPTY
+        self.hash ^= self.zobrist[player][cell]
+        pieces = self.pieces[player]
+        for window_id in self.cell_windows[cell]:
+            pieces[window_id] -= 1
+            if pieces[window_id] == 0:
+                self.open_windows[1 - player] += 1
+            self.classify(window_id)
+
+    def winning_cells(self, player):
+        """Empty cells that would give player k in a row, in board-index order."""
+        board = self.board
+        return sorted({cell for window_id in self.fours[player] for cell in self.windows[window_id] if board[cell] == EMPTY})
+
+    def live_cells(self):
+        """Empty cells on a window either player can still complete; a stone anywhere else changes nothing."""
+        board, pieces = self.board, self.pieces
+        return {cell for cell, value in enumerate(board) if value == EMPTY
+                and any(pieces[0][window_id] == 0 or pieces[1][window_id] == 0 for window_id in self.cell_windows[cell])}
+
+    def four_moves(self, player):
+        """Moves that create at least one k-1 threat for player, those creating the most threats first."""
+        board = self.board
+        created = {}
+        for window_id in self.threes[player]:
+            for cell in self.windows[window_id]:
+                if board[cell] == EMPTY:
+                    created[cell] = created.get(cell, 0) + 1
+        return sorted(created, key=lambda cell: (-created[cell], cell))
+
+    def find_win(self, board_state, attacker, max_depth=THREAT_SEARCH_DEPTH, node_budget=10000):
+        """A forced win for attacker (to move) by continuous threats: the line of moves, attacker's first,
+        ending with the winning move; or None if there is none within max_depth attacker moves or node_budget nodes.
+        self.nodes is left at the number of nodes visited.
+        """
+        self.load(board_state)
+        self.nodes = 0
+        self.node_budget = node_budget
+        self.failed = {} # hash -> deepest remaining depth at which the attacker had no forced win
+        try:
+            return self.attack(attacker, max_depth)
+        except ThreatBudgetExceeded:
+            return None
+
+    def attack(self, attacker, depth):
+        self.nodes += 1
+        if self.nodes > self.node_budget:
+            raise ThreatBudgetExceeded()
+        defender = 1 - attacker
+        wins = self.winning_cells(attacker)
+        if wins:
+            return [wins[0]]
+        if depth == 0 or self.failed.get(self.hash, -1) >= depth:
+            return None
+        blocks = self.winning_cells(defender)
+        if len(blocks) > 1: # Two defender threats: no single move both blocks them and keeps attacking
+            self.failed[self.hash] = depth
+            return None
+
+        for move in self.four_moves(attacker):
+            if blocks and move != blocks[0]:
+                continue # The defender's threat must be blocked, by a move that is also a threat
+            self.place(move, attacker)
+            line = self.defend(attacker, depth)
+            self.remove(move, attacker)
+            if line is not None:
+                return [move] + line
+        self.failed[self.hash] = depth
+        return None
+
+    def defend(self, attacker, depth):
+        """The defender's forced reply to attacker's last move, then the attacker's continuation."""
+        defender = 1 - attacker
+        if self.winning_cells(defender):
+            return None # The defender wins before having to block
+        threats = self.winning_cells(attacker)
+        if len(threats) > 1: # Blocking one lets the attacker complete the other
+            return [threats[0], threats[1]]
+        reply = threats[0]
+        self.place(reply, defender)
+        line = self.attack(attacker, depth - 1)
+        self.remove(reply, defender)
+        if line is None:
+            return None
+        return [reply] + line
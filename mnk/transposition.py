@@ -0,0 +1,216 @@
+import functools
+
+import numpy as np
+
+# Bound types stored with each entry
+EXACT = 0
+LOWER_BOUND = 1 # The search failed high: the true value is >= the stored value
+UPPER_BOUND = 2 # The search failed low: the true value is <= the stored value
+
+ZOBRIST_SEED = 20240531
+
+
+@functools.lru_cache(maxsize=None)
+def zobrist_keys(cells):
+    """Random 64-bit keys: keys[player][cell] for each stone, plus keys[2][0] for "player 1 to move".
+
+    Seeded, so every process (pool workers, book and tablebase builders) hashes positions identically.
+    """
+    rng = np.random.default_rng(ZOBRIST_SEED + cells)
+    table = rng.integers(0, 2**64, size=(3, cells), dtype=np.uint64)
+    return tuple(tuple(int(key) for key in row) for row in table)
+
+
+def zobrist_hash(board_state):
+    """Hash of the stones on a -1/0/1 board, matching what make_move/unmake_move maintain incrementally."""
+    board_state = np.asarray(board_state)
+    keys = zobrist_keys(len(board_state))
+    position_hash = 0
+    for player in range(2):
+        for idx in np.flatnonzero(board_state == player).tolist():
+            position_hash ^= keys[player][idx]
+    return position_hash
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results keyed by Zobrist hash.
+
+    Each bucket has two slots: a depth-preferred slot that only gives way to an equal or deeper
+    search of any position, and an always-replace slot that takes everything else, so deep results
+    survive while recent shallow ones are still cached. Entries are (value, depth, flag, best_move).
+    """
+
+    # Rough footprint of one slot in CPython: two list pointers, the key int and the entry tuple
+    ENTRY_BYTES = 160
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        buckets = 1
+        while buckets * 4 * self.ENTRY_BYTES <= max_bytes: # Largest power of two whose two slots fit
+            buckets *= 2
+        self.mask = buckets - 1
+        self.keys = [None] * (2 * buckets)
+        self.entries = [None] * (2 * buckets)
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0 # Probes that found the bucket holding other positions
+        self.stores = 0
+
+    def __len__(self):
+        return sum(1 for key in self.keys if key is not None)
+
+    def clear(self):
+        self.keys = [None] * len(self.keys)
+        self.entries = [None] * len(self.entries)
+        self.hits = self.misses = self.collisions = self.stores = 0
+
+    def probe(self, key):
+        """The entry stored for key, or None."""
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        if keys[slot] == key:
+            self.hits += 1
+            return self.entries[slot]
+        if keys[slot + 1] == key:
+            self.hits += 1
+            return self.entries[slot + 1]
+        if keys[slot] is not None or keys[slot + 1] is not None:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, flag, best_move):
+        slot = (key & self.mask) << 1
+        stored = self.entries[slot]
+        if self.keys[slot] == key or stored is None or depth >= stored[1]:
+            self.keys[slot] = key
+            self.entries[slot] = (value, depth, flag, best_move)
+        else:
+            self.keys[slot + 1] = key
+            self.entries[slot + 1] = (value, depth, flag, best_move)
+        self.stores += 1
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
+
+
+# One slot of SharedTranspositionTable. check = key ^ value bits ^ data, so a slot torn by two processes
+# writing at once fails verification instead of returning a mixed-up entry.
+SHARED_ENTRY_DTYPE = np.dtype([("check", np.uint64), ("value", np.float64), ("data", np.uint64)])
+
+
+def _pack_data(depth, flag, best_move):
+    """depth in bits 0-15, flag in bits 16-17, best_move + 1 (0 for None) from bit 18 up."""
+    return depth | flag << 16 | (0 if best_move is None else best_move + 1) << 18
+
+
+class SharedTranspositionTable:
+    """TranspositionTable stored in multiprocessing.shared_memory as a flat NumPy structured array.
+
+    Same interface and replacement scheme (two slots per bucket, depth-preferred + always-replace),
+    but every process attached to the same segment reads and writes one table, without locks:
+    each slot stores its key XORed with its contents (the Hyatt lockless hashing trick), so a probe
+    of a slot that another process was halfway through writing simply misses. hits / misses /
+    collisions / stores count this process's accesses only.
+
+    The creating process owns the segment and must close() it (which also unlinks it); attached
+    processes call close() too, which only detaches.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, name=None):
+        from multiprocessing import shared_memory
+
+        slot_bytes = SHARED_ENTRY_DTYPE.itemsize
+        buckets = 1
+        while buckets * 4 * slot_bytes <= max_bytes: # Largest power of two whose two slots fit
+            buckets *= 2
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=2 * buckets * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.max_bytes = max_bytes
+        self.mask = buckets - 1
+        self.slots = np.ndarray((2 * buckets,), dtype=SHARED_ENTRY_DTYPE, buffer=self.shm.buf)
+        # Field views, so a probe reads three scalars instead of building a record
+        self.checks = self.slots["check"]
+        self.values = self.slots["value"]
+        self.value_bits = self.values.view(np.uint64)
+        self.data = self.slots["data"]
+        if self.owner:
+            self.slots.fill(0) # Key 0 with all-zero contents is the empty slot
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    @classmethod
+    def attach(cls, name, max_bytes):
+        """Open the table another process created with the same max_bytes."""
+        return cls(max_bytes, name=name)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.checks ^ self.value_bits ^ self.data))
+
+    def clear(self):
+        self.slots.fill(0)
+        self.hits = self.misses = self.collisions = self.stores = 0
+
+    def read_slot(self, slot):
+        """(key, entry) stored in slot, or (None, None) if it is empty or was torn by a concurrent write."""
+        data = int(self.data[slot])
+        key = int(self.checks[slot]) ^ int(self.value_bits[slot]) ^ data
+        if not key:
+            return None, None
+        move = data >> 18
+        return key, (float(self.values[slot]), data & 0xFFFF, (data >> 16) & 0x3, move - 1 if move else None)
+
+    def probe(self, key):
+        """The entry stored for key, or None."""
+        slot = (key & self.mask) << 1
+        occupied = False
+        for candidate in (slot, slot + 1):
+            stored_key, entry = self.read_slot(candidate)
+            if stored_key == key:
+                self.hits += 1
+                return entry
+            occupied = occupied or stored_key is not None
+        if occupied:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, flag, best_move):
+        slot = (key & self.mask) << 1
+        stored_key, stored = self.read_slot(slot)
+        if not (stored_key == key or stored is None or depth >= stored[1]):
+            slot += 1
+        data = _pack_data(depth, flag, best_move)
+        self.values[slot] = value
+        self.data[slot] = data
+        self.checks[slot] = key ^ int(self.value_bits[slot]) ^ data
+        self.stores += 1
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
+
+    def close(self):
+        """Detach from the segment; the owner also destroys it."""
+        self.slots = self.checks = self.values = self.value_bits = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,195 @@
+import functools
+
+import numpy as np
+
+from mnk.constants import EMPTY, NOONE
+
+
+@functools.lru_cache(maxsize=None)
+def window_indices(width, height, winning_size):
+    """Flat board indices of every winning_size-long line segment, shape (num_windows, winning_size).
+
+    Windows are listed in the order count_sequences has always scanned them:
+    horizontal, vertical, diagonal down-right, then diagonal up-right (bottom-left to top-right).
+    The array is cached per (width, height, winning_size) and is read-only.
+    """
+    starts, steps = [], []
+    horizontal_cols = range(width - winning_size + 1)
+    vertical_rows = range(height - winning_size + 1)
+    # Horizontal
+    for r in range(height):
+        for c in horizontal_cols:
+            starts.append(r * width + c)
+            steps.append(1)
+    # Vertical
+    for c in range(width):
+        for r in vertical_rows:
+            starts.append(r * width + c)
+            steps.append(width)
+    # Diagonal down-right
+    for r in vertical_rows:
+        for c in horizontal_cols:
+            starts.append(r * width + c)
+            steps.append(width + 1)
+    # Diagonal up-right
+    for r in range(winning_size - 1, height):
+        for c in horizontal_cols:
+            starts.append(r * width + c)
+            steps.append(1 - width)
+
+    offsets = np.arange(winning_size, dtype=np.int64)
+    windows = np.array(starts, dtype=np.int64)[:, None] + np.array(steps, dtype=np.int64)[:, None] * offsets
+    windows = windows.reshape(len(starts), winning_size).astype(np.intp)
+    windows.setflags(write=False)
+    return windows
+
+
+@functools.lru_cache(maxsize=None)
+def cell_windows(width, height, winning_size):
+    """For every cell, the tuple of window ids (rows of window_indices) that pass through it."""
+    through_cell = [[] for _ in range(width * height)]
+    for window_id, window in enumerate(window_indices(width, height, winning_size).tolist()):
+        for idx in window:
+            through_cell[idx].append(window_id)
+    return tuple(tuple(ids) for ids in through_cell)
+
+
+@functools.lru_cache(maxsize=None)
+def window_scan_order(width, height, winning_size):
+    """Window ids sorted the way Agent.is_game_over's full scan meets them: by start cell, then direction.
+
+    The first complete window in this order is the one that scan reports, which decides the winner
+    on (unreachable in play) boards where both players have a line.
+    """
+    lengths = [height * (width - winning_size + 1), width * (height - winning_size + 1)] + [(height - winning_size + 1) * (width - winning_size + 1)] * 2
+    directions = np.repeat(np.arange(4), lengths)
+    order = np.lexsort((directions, window_indices(width, height, winning_size)[:, 0]))
+    order.setflags(write=False)
+    return order
+
+
+# Boards per vectorized step of count_windows_batch; bounds the (chunk, windows) temporaries to a few MB
+BATCH_CHUNK = 8192
+
+
+def count_windows_batch(boards, width, height, winning_size):
+    """count_sequences and is_game_over for a stack of boards at once.
+
+    boards: (N, width * height) array of -1/0/1 boards of one size.
+    Returns (counts, winners): counts is the (N, 2, k + 1) int32 stack of count_sequences results,
+    winners is (N,) int32 with 0 or 1 for a win, -2 for a full board without one and -1 (NOONE) otherwise.
+
+    Every cell is coded as 1 for a player 0 stone and `shift` (> k) for a player 1 stone, so the sum
+    over a window is p0 + shift * p1 and a window is open for player 0 with j stones exactly when its
+    sum is j (for player 1: shift * j). One pass of k column gathers gives all window sums of a chunk,
+    and each histogram bin is a single compare-and-count over them.
+    """
+    boards = np.asarray(boards)
+    if boards.ndim != 2 or boards.shape[1] != width * height:
+        raise ValueError(f"Expected boards of shape (N, {width * height}), got {boards.shape}")
+    windows = window_indices(width, height, winning_size)[window_scan_order(width, height, winning_size)]
+    shift = winning_size + 1
+    code_type = np.uint8 if shift * winning_size + winning_size < 256 else np.int32
+    codes = np.array([0, 1, shift], dtype=code_type) # Indexed by cell value + 1: empty, player 0, player 1
+    columns = [np.ascontiguousarray(windows[:, i]) for i in range(winning_size)]
+    count_type = np.uint8 if len(windows) < 256 else np.uint16 # Narrow accumulators sum whole rows at SIMD width
+
+    total = len(boards)
+    counts = np.empty((total, 2, winning_size + 1), dtype=np.int32)
+    winners = np.empty(total, dtype=np.int32)
+    for start in range(0, total, BATCH_CHUNK):
+        chunk = boards[start:start + BATCH_CHUNK]
+        n = len(chunk)
+        # Cells-major (cells, n) layout: gathering a window column copies whole contiguous rows
+        coded = np.ascontiguousarray(codes.take(chunk.T + 1))
+        sums = coded[columns[0]]
+        for column in columns[1:]:
+            sums += coded[column]
+
+        empty = np.count_nonzero(chunk == EMPTY, axis=1)
+        counts[start:start + n, :, 0] = empty[:, None]
+        for pieces in range(1, winning_size + 1):
+            counts[start:start + n, 0, pieces] = (sums == pieces).view(np.uint8).sum(axis=0, dtype=count_type)
+            counts[start:start + n, 1, pieces] = (sums == shift * pieces).view(np.uint8).sum(axis=0, dtype=count_type)
+
+        # First complete window in scan order decides the winner
+        p0_line = sums == winning_size
+        complete = p0_line | (sums == shift * winning_size)
+        if len(windows):
+            first = complete.argmax(axis=0)
+            has_line = complete[first, np.arange(n)]
+            line_owner = np.where(p0_line[first, np.arange(n)], 0, 1)
+        else: # k longer than the board: nobody can win
+            has_line = line_owner = np.zeros(n, dtype=bool)
+        winners[start:start + n] = np.where(has_line, line_owner, np.where(empty == 0, -2, NOONE))
+    return counts, winners
+
+
+class WindowTracker:
+    """Per-window piece counts for both players plus the running count_sequences histogram.
+
+    place() and remove() touch only the windows through the changed cell (at most 4 * k of them),
+    so the histogram in self.counts always matches count_sequences() of the tracked board
+    without ever rescanning it. self.counts is a pair of Python lists, indexed like the
+    count_sequences array: counts[player][pieces], with counts[player][0] the number of empty cells.
+    """
+
+    def __init__(self, width, height, winning_size):
+        self.winning_size = winning_size
+        self.windows = window_indices(width, height, winning_size)
+        self.cell_windows = cell_windows(width, height, winning_size)
+        self.load(np.full(width * height, EMPTY, dtype=np.int32))
+
+    def load(self, board_state):
+        """Reset the tracker to an arbitrary board in one vectorized pass."""
+        board_state = np.asarray(board_state)
+        cells = board_state[self.windows]
+        p0 = np.count_nonzero(cells == 0, axis=1)
+        p1 = np.count_nonzero(cells == 1, axis=1)
+        bins = self.winning_size + 1
+        empty_count = int(np.count_nonzero(board_state == EMPTY))
+        self.pieces = [p0.tolist(), p1.tolist()]
+        self.counts = [
+            np.bincount(np.where(p1 == 0, p0, 0), minlength=bins).tolist(),
+            np.bincount(np.where(p0 == 0, p1, 0), minlength=bins).tolist(),
+        ]
+        self.counts[0][0] = empty_count
+        self.counts[1][0] = empty_count
+
+    def place(self, cell, player):
+        """Account for a stone of player placed on an empty cell."""
+        own, opponent = self.pieces[player], self.pieces[1 - player]
+        own_counts, opponent_counts = self.counts[player], self.counts[1 - player]
+        for window_id in self.cell_windows[cell]:
+            mine = own[window_id]
+            theirs = opponent[window_id]
+            if theirs == 0:
+                if mine:
+                    own_counts[mine] -= 1
+                own_counts[mine + 1] += 1
+            elif mine == 0:
+                opponent_counts[theirs] -= 1 # Window was open for the opponent, now blocked
+            own[window_id] = mine + 1
+        own_counts[0] -= 1
+        opponent_counts[0] -= 1
+
+    def remove(self, cell, player):
+        """Undo place(cell, player)."""
+        own, opponent = self.pieces[player], self.pieces[1 - player]
+        own_counts, opponent_counts = self.counts[player], self.counts[1 - player]
+        for window_id in self.cell_windows[cell]:
+            mine = own[window_id] - 1
+            theirs = opponent[window_id]
+            if theirs == 0:
+                own_counts[mine + 1] -= 1
+                if mine:
+                    own_counts[mine] += 1
+            elif mine == 0:
+                opponent_counts[theirs] += 1 # Window is open for the opponent again
+            own[window_id] = mine
+        own_counts[0] += 1
+        opponent_counts[0] += 1
+
+    def as_array(self):
+        """The histogram as the (2, k + 1) int32 array count_sequences returns."""
+        return np.array(self.counts, dtype=np.int32)
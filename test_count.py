@@ -1,4 +1,5 @@
-from src.Agent import Agent
+from mnk.Agent import Agent
+from mnk.windows import WindowTracker
 import numpy as np
 
 EMPTY = -1
@@ -321,4 +322,80 @@ def test_count_p0_two_pieces_k4_on_4x4():
     # Diagonal TR-BL: Segment from idx=12 (board[12,9,6,3]) is [-1,1,-1,-1] -> counts[1][1]=1.
     # So, counts[1] = [13, 3, 0, 0, 0]
     expected_counts = np.array([[13,3,1,0,0], [13,3,0,0,0]], dtype=np.int32) # Changed P1 counts[1][1] from 4 to 3
-    np.testing.assert_array_equal(counts, expected_counts)
\ No newline at end of file
+    np.testing.assert_array_equal(counts, expected_counts)
+
+def reference_count_sequences(board_size, winning_size, board_state):
+    # Straightforward per-window scan, kept as the specification for the vectorized count_sequences
+    width, height = board_size
+    counts = np.zeros((2, winning_size + 1), dtype=np.int32)
+    counts[:, 0] = np.sum(board_state == EMPTY)
+    directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
+    for player in range(2):
+        for r in range(height):
+            for c in range(width):
+                for dx, dy in directions:
+                    cells = [(c + dx * i, r + dy * i) for i in range(winning_size)]
+                    if not all(0 <= x < width and 0 <= y < height for x, y in cells):
+                        continue
+                    values = [board_state[y * width + x] for x, y in cells]
+                    own = sum(1 for v in values if v == player)
+                    if own > 0 and all(v == player or v == EMPTY for v in values):
+                        counts[player][own] += 1
+    return counts
+
+def test_count_matches_reference_on_random_boards():
+    rng = np.random.default_rng(1234)
+    for board_size, winning_size in [((3, 3), 3), ((4, 3), 3), ((3, 5), 4), ((7, 5), 4), ((10, 10), 5), ((6, 6), 7)]:
+        agent = Agent(player_number=0, board_size=board_size, winning_size=winning_size, scoring_array=[], circle_of_two=[])
+        for _ in range(20):
+            board_state = rng.integers(-1, 2, size=board_size[0] * board_size[1]).astype(np.int32)
+            np.testing.assert_array_equal(agent.count_sequences(board_state), reference_count_sequences(board_size, winning_size, board_state))
+
+def test_count_accepts_python_list():
+    agent = Agent(player_number=0, board_size=[3, 3], winning_size=3, scoring_array=[], circle_of_two=[])
+    board_state = [1, -1, 0, 1, 0, -1, 1, -1, 0]
+    expected_counts = np.array([[3, 1, 1, 0], [3, 0, 0, 1]], dtype=np.int32)
+    np.testing.assert_array_equal(agent.count_sequences(board_state), expected_counts)
+
+def test_window_tracker_matches_count_sequences_through_place_and_remove():
+    board_size, winning_size = (7, 6), 4
+    agent = Agent(player_number=0, board_size=board_size, winning_size=winning_size, scoring_array=[], circle_of_two=[])
+    tracker = WindowTracker(board_size[0], board_size[1], winning_size)
+    board_state = np.full(board_size[0] * board_size[1], EMPTY, dtype=np.int32)
+    rng = np.random.default_rng(7)
+    played = []
+    for move in rng.permutation(len(board_state))[:30]:
+        player = len(played) % 2
+        board_state[move] = player
+        tracker.place(int(move), player)
+        played.append((int(move), player))
+        np.testing.assert_array_equal(tracker.as_array(), agent.count_sequences(board_state))
+    while played:
+        move, player = played.pop()
+        board_state[move] = EMPTY
+        tracker.remove(move, player)
+        np.testing.assert_array_equal(tracker.as_array(), agent.count_sequences(board_state))
+
+def test_evaluate_reads_tracked_counts_without_board():
+    agent = Agent(player_number=0, board_size=[3, 3], winning_size=3, scoring_array=[], circle_of_two=[])
+    board_state = np.array([0, 0, EMPTY, 1, 1, EMPTY, 1, EMPTY, EMPTY], dtype=np.int32)
+    agent.tracker.load(board_state)
+    assert agent.tracker.counts[0][2] == 1 and agent.tracker.counts[1][2] == 2
+    np.testing.assert_almost_equal(agent.evaluate({"counts": agent.tracker.counts}, winner=EMPTY), -0.1, decimal=5)
+
+def test_batch_counts_winners_and_values_match_single_board_calls():
+    rng = np.random.default_rng(99)
+    for board_size, winning_size in [((3, 3), 3), ((7, 5), 4), ((8, 8), 5), ((15, 15), 5), ((6, 6), 7)]:
+        agent = Agent(player_number=0, board_size=board_size, winning_size=winning_size, scoring_array=[], circle_of_two=[])
+        cells = board_size[0] * board_size[1]
+        boards = rng.choice([EMPTY, EMPTY, 0, 1], size=(60, cells)).astype(np.int32)
+        boards[:20] = rng.integers(0, 2, size=(20, cells)) # Full boards: wins and draws
+        counts = agent.count_sequences_batch(boards)
+        winners = agent.is_game_over_batch(boards.astype(np.int8))
+        values = agent.evaluate_batch(boards)
+        assert counts.shape == (60, 2, winning_size + 1) and winners.shape == (60,)
+        for board_state, board_counts, winner, value in zip(boards, counts, winners, values):
+            np.testing.assert_array_equal(board_counts, agent.count_sequences(board_state))
+            game_over, expected_winner = agent.is_game_over({"board_state": board_state})
+            assert winner == (expected_winner if game_over else EMPTY)
+            assert value == agent.evaluate({"board_state": board_state}, winner)
@@ -0,0 +1,209 @@
+from mnk.Agent import Agent
+from mnk.Game import Game
+from mnk.bitboard import BitBoard
+import numpy as np
+
+from mnk.constants import NOONE, EMPTY
+
+def play_moves(game, moves):
+    for move in moves:
+        game.play_move(move)
+
+def test_game_detects_win_through_last_move():
+    game = Game((4, 4), 3, end_turn_print=False)
+    # X at 0, 5, 10 (diagonal); O at 1, 2
+    play_moves(game, [0, 1, 5, 2, 10])
+    assert game.is_game_over()
+    assert game.winner == 0
+    assert game.last_move == 10
+
+def test_game_counts_overline_as_win():
+    # "k or more in a row": filling the gap in X X . X X makes five on a k=4 board
+    game = Game((5, 5), 4, end_turn_print=False)
+    play_moves(game, [0, 20, 1, 21, 3, 23, 4, 24])
+    assert not game.is_game_over()
+    game.play_move(2)
+    assert game.is_game_over()
+    assert game.winner == 0
+
+def test_game_detects_draw_from_empty_count():
+    game = Game((3, 3), 3, end_turn_print=False)
+    # X O X / X O O / O X X
+    play_moves(game, [0, 1, 2, 4, 3, 5, 7, 6, 8])
+    assert game.empty_cells == 0
+    assert game.is_game_over()
+    assert game.winner == NOONE
+
+def test_game_scans_board_set_up_by_hand():
+    game = Game((3, 3), 3, end_turn_print=False)
+    game.board = np.array([1, 1, 1, 0, 0, EMPTY, EMPTY, EMPTY, EMPTY], dtype=np.int32)
+    assert game.is_game_over()
+    assert game.winner == 1
+
+def test_game_recounts_empty_cells_of_assigned_board():
+    game = Game((3, 3), 3, end_turn_print=False)
+    # X O X / X O O / O X . : the last move fills the board without a line
+    game.board = np.array([0, 1, 0, 0, 1, 1, 1, 0, EMPTY], dtype=np.int32)
+    assert game.empty_cells == 1 and game.last_move is None
+    game.player_turn = 0
+    game.play_move(8)
+    assert game.empty_cells == 0
+    assert game.is_game_over()
+    assert game.winner == NOONE
+
+def test_game_finds_win_on_assigned_board_after_a_move():
+    game = Game((4, 4), 3, end_turn_print=False)
+    board = np.full(16, EMPTY, dtype=np.int32)
+    board[[0, 1, 2]] = 1 # A line that was never checked
+    game.board = board
+    game.play_move(15)
+    assert game.is_game_over()
+    assert game.winner == 1
+
+def test_reset_game_clears_last_move():
+    game = Game((3, 3), 3, end_turn_print=False)
+    play_moves(game, [4, 0])
+    game.reset_game()
+    assert game.last_move is None
+    assert game.empty_cells == 9
+    assert not game.is_game_over()
+
+def test_agent_is_game_over_uses_last_move():
+    agent = Agent(player_number=0, board_size=(5, 5), winning_size=4, scoring_array=[], circle_of_two=[])
+    board_state = np.full(25, EMPTY, dtype=np.int32)
+    board_state[[4, 8, 12, 16]] = 1 # Anti-diagonal
+    board_state[[0, 1, 2]] = 0
+    assert agent.is_game_over({"board_state": board_state, "last_move": 12}) == (True, 1)
+    assert agent.is_game_over({"board_state": board_state, "last_move": 2}) == (False, NOONE)
+    # Without a last move the whole board is scanned
+    assert agent.is_game_over({"board_state": board_state}) == (True, 1)
+
+def test_agent_is_game_over_draw_uses_tracked_empty_count():
+    agent = Agent(player_number=0, board_size=(3, 3), winning_size=3, scoring_array=[], circle_of_two=[])
+    board_state = np.array([0, 1, 0, 0, 1, 1, 1, 0, 0], dtype=np.int32)
+    agent.tracker.load(board_state)
+    state = {"board_state": board_state, "last_move": 8, "counts": agent.tracker.counts}
+    assert agent.is_game_over(state) == (True, -2)
+
+def test_bitboard_lines_do_not_wrap_between_rows():
+    bitboard = BitBoard(4, 4, 3, circle_of_two=[(2, 0), (-2, 0)])
+    board_state = np.full(16, EMPTY, dtype=np.int32)
+    board_state[[2, 3, 4]] = 0 # End of row 0 and start of row 1
+    board_state[[7, 10, 13]] = 1 # Anti-diagonal
+    bitboards = bitboard.from_array(board_state)
+    np.testing.assert_array_equal(bitboard.to_array(bitboards), board_state)
+    assert not bitboard.has_line(bitboards[0])
+    assert bitboard.is_game_over({"bitboards": bitboards, "last_move": 13}) == (True, 1)
+    assert bitboard.is_game_over({"bitboards": bitboards, "last_move": 4}) == (False, NOONE)
+
+def test_bitboard_moves_and_evaluation_match_array_agent():
+    circle_of_two = [(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3) if (dx, dy) != (0, 0)]
+    agent = Agent(player_number=0, board_size=(7, 5), winning_size=4, scoring_array=[], circle_of_two=circle_of_two, engine="bitboard")
+    rng = np.random.default_rng(3)
+    for _ in range(10):
+        board_state = rng.choice([EMPTY, EMPTY, 0, 1], size=35).astype(np.int32)
+        array_state = {"board_state": board_state}
+        bit_state = {"bitboards": agent.bitboard.from_array(board_state)}
+        assert agent.generate_next_moves(bit_state) == agent.generate_next_moves(array_state)
+        assert agent.evaluate(bit_state, NOONE) == agent.evaluate(array_state, NOONE)
+
+def test_frontier_matches_neighbourhood_scan_through_make_and_unmake():
+    circle_of_two = [(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3) if (dx, dy) != (0, 0)]
+    agent = Agent(player_number=0, board_size=(6, 5), winning_size=4, scoring_array=[], circle_of_two=circle_of_two)
+
+    def scanned_moves(board_state):
+        return [i for i in range(len(board_state)) if board_state[i] == EMPTY
+                and not agent.is_move_too_far_from_action(board_state, (i % 6, i // 6), circle_of_two)]
+
+    rng = np.random.default_rng(11)
+    state = agent.new_search_state(np.full(30, EMPTY, dtype=np.int32))
+    assert agent.generate_next_moves(state) == list(range(30))
+    played = []
+    for step in range(60):
+        if played and (len(played) == 30 or rng.random() < 0.3):
+            move, player, previous_last_move = played.pop()
+            agent.unmake_move(state, move, player, previous_last_move)
+        else:
+            move = int(rng.choice(np.flatnonzero(state["board_state"] == EMPTY)))
+            player = step % 2
+            played.append((move, player, agent.make_move(state, move, player)))
+        assert agent.generate_next_moves(state) == scanned_moves(state["board_state"])
+        assert agent.generate_next_moves({"board_state": state["board_state"]}) == scanned_moves(state["board_state"])
+
+def test_agents_follow_move_events_without_copying_the_board():
+    circle_of_one = [(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2) if (dx, dy) != (0, 0)]
+    for options in ({"engine": "array"}, {"engine": "bitboard"}, {"engine": "array", "symmetry_plies": 1, "tt_size_mb": 1}):
+        game = Game((6, 6), 4, end_turn_print=False)
+        game.agents = [Agent(player_number=player, board_size=(6, 6), winning_size=4, scoring_array=[], circle_of_two=circle_of_one,
+                             depth=2, verbose=False, **options) for player in (0, 1)]
+        for agent in game.agents:
+            agent.set_game(game)
+        game.play_move(14)
+        updated = set()
+        while not game.is_game_over():
+            mover = game.agents[game.player_turn]
+            move = mover.get_next_move()
+            assert mover.root_key == (game.board_version, game.moves_played) # Searched from the kept state
+            game.play_move(move)
+            fresh = Agent(player_number=0, board_size=(6, 6), winning_size=4, scoring_array=[], circle_of_two=circle_of_one, depth=2, **options)
+            expected = fresh.new_search_state(game.board)
+            for agent in game.agents:
+                assert agent.memory["board_state"] is game.board_view and agent.memory["last_move"] == move
+                if agent.root_state is not None: # Kept since the agent's last search and updated by every move since
+                    updated.add(agent.player_number)
+                    state = agent.root_state
+                    assert agent.root_key == (game.board_version, game.moves_played)
+                    assert state["hash"] == expected["hash"] and state["last_move"] is None
+                    assert agent.generate_next_moves(state) == fresh.generate_next_moves(expected)
+                    if "bitboards" in state:
+                        assert state["bitboards"] == expected["bitboards"]
+                    else:
+                        assert np.array_equal(state["board_state"], game.board) and state["counts"] == expected["counts"]
+                    assert state.get("hashes") == expected.get("hashes")
+        assert game.moves_played == np.count_nonzero(game.board != EMPTY) and updated == {0, 1}
+
+    # The view is read-only, and a board set by hand is a new version the kept state no longer matches
+    try:
+        game.board_view[0] = 0
+    except ValueError:
+        pass
+    else:
+        assert False, "board_view is writable"
+    version = game.board_version
+    game.board = game.board
+    assert game.board_version != version and game.moves_played == 0
+    mover = game.agents[game.player_turn]
+    assert mover.root_key != (game.board_version, game.moves_played)
+
+def test_board_edits_go_through_the_setter_and_reach_the_agents():
+    circle_of_one = [(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2) if (dx, dy) != (0, 0)]
+    game = Game((5, 5), 4, end_turn_print=False)
+    game.agents = [Agent(player_number=player, board_size=(5, 5), winning_size=4, scoring_array=[], circle_of_two=circle_of_one,
+                         depth=2, verbose=False) for player in (0, 1)]
+    for agent in game.agents:
+        agent.set_game(game)
+    game.play_move(12)
+    game.play_move(game.agents[1].get_next_move()) # O keeps the search state of this position
+    game.play_move(0)
+    assert game.agents[1].root_state is not None
+
+    # Editing a cell in place would change the position behind the game's and the agents' backs
+    try:
+        game.board[8] = 0
+    except ValueError:
+        pass
+    else:
+        assert False, "game.board is writable"
+
+    # X on the anti-diagonal 8, 12, 16 with 4 taken by O: 20 is X's only winning cell
+    board = game.board.copy()
+    assert all(board[cell] == EMPTY for cell in (4, 8, 16, 20))
+    board[[8, 16]] = 0
+    board[4] = 1
+    game.board = board
+    assert game.agents[1].get_next_move() == 20
+
+    board = game.board.copy()
+    board[20] = 0 # A win made by the edit, not by a move
+    game.board = board
+    assert game.is_game_over() and game.winner == 0
@@ -1,5 +1,9 @@
 from mnk.Agent import Agent
 from mnk.Game import Game
+from mnk import play
+from mnk.benchmark import board_corpus, compare, run_suite
+from mnk.profiling import Profiler
+from mnk.rules import is_winning_move
 import numpy as np
 
 from mnk.constants import NOONE, EMPTY
@@ -308,4 +312,108 @@ def test_minimax_prefers_heuristic_advantage_p0_depth1():
 
         print(f"Agent P0 with current heuristic chose move: {actual_move_idx}")
         # A loose assertion for now, as specific optimal move for DEPTH=3 is complex to pre-calculate here
-        assert actual_move_idx == 1 or actual_move_idx == 4 # Common strong opening/counter moves on 3x3
\ No newline at end of file
+        assert actual_move_idx == 1 or actual_move_idx == 4 # Common strong opening/counter moves on 3x3
+
+
+def test_bitboard_engine_matches_array_engine():
+    board_size = (6, 6)
+    winning_size = 4
+    circle_of_two = [(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3) if (dx, dy) != (0, 0)]
+    board = np.full(36, EMPTY, dtype=np.int32)
+    board[[14, 15, 21]] = 0
+    board[[20, 8]] = 1
+    results = []
+    for engine in ("array", "bitboard"):
+        agent = Agent(player_number=1, board_size=board_size, winning_size=winning_size, scoring_array=[],
+                      circle_of_two=circle_of_two, depth=3, engine=engine)
+        game = Game(board_size, winning_size)
+        game.board = board.copy()
+        agent.set_game(game)
+        results.append((agent.get_next_move(), agent.states_evaluated))
+    assert results[0] == results[1]
+
+def test_minimax_restores_search_state():
+    circle_of_two = [(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2) if (dx, dy) != (0, 0)]
+    board = np.full(25, EMPTY, dtype=np.int32)
+    board[[6, 12]] = 0
+    board[[7]] = 1
+    for engine in ("array", "bitboard"):
+        agent = Agent(player_number=1, board_size=(5, 5), winning_size=4, scoring_array=[], circle_of_two=circle_of_two, depth=3, engine=engine)
+        state = agent.new_search_state(board)
+        position_key = "bitboards" if engine == "bitboard" else "board_state"
+        position_before = list(state[position_key])
+        counts_before = [row[:] for row in agent.tracker.counts]
+        agent.minimax(state, 3, float("-inf"), float("inf"), False)
+        assert list(state[position_key]) == position_before
+        assert state["last_move"] is None
+        assert agent.tracker.counts == counts_before
+
+def test_parallel_tournament_is_independent_of_worker_count(monkeypatch):
+    monkeypatch.setattr(play, "BOARD_SIZE", (4, 4))
+    monkeypatch.setattr(play, "WINNING_SIZE", 3)
+    monkeypatch.setattr(play, "PRINT_MOVES", False)
+    configs = [{"name": "D1", "scoring": [], "depth": 1}, {"name": "D2", "scoring": [], "depth": 2}, {"name": "D3", "scoring": [], "depth": 3}]
+    assert len(play.tournament_jobs(configs, 4)) == 12 # 3 pairings x 2 colours x 2 games
+
+    results = [play.run_tournament_parallel(configs, 4, workers) for workers in (1, 2, 3)]
+    assert results[0] == results[1] == results[2]
+    assert all(stats["games_played"] == 8 for stats in results[0].values())
+
+    # Same totals as playing each match in one process with run_tournament
+    serial = {cfg["name"]: {"wins": 0, "losses": 0, "draws": 0} for cfg in configs}
+    for i, j in ((0, 1), (0, 2), (1, 2)):
+        for first, second in ((configs[i], configs[j]), (configs[j], configs[i])):
+            (first_wins, second_wins), draws = play.run_tournament(first, second, 2)
+            serial[first["name"]]["wins"] += first_wins
+            serial[first["name"]]["losses"] += second_wins
+            serial[second["name"]]["wins"] += second_wins
+            serial[second["name"]]["losses"] += first_wins
+            serial[first["name"]]["draws"] += draws
+            serial[second["name"]]["draws"] += draws
+    assert serial == {name: {key: stats[key] for key in ("wins", "losses", "draws")} for name, stats in results[0].items()}
+
+def test_tournament_agents_are_cached_per_config(monkeypatch):
+    monkeypatch.setattr(play, "BOARD_SIZE", (3, 3))
+    monkeypatch.setattr(play, "WINNING_SIZE", 3)
+    monkeypatch.setattr(play, "PRINT_MOVES", False)
+    monkeypatch.setattr(play, "_tournament_agents", {})
+    opponent = {"name": "Opponent", "scoring": [], "depth": 1}
+    for depth in (1, 2): # Same name, different settings: each gets its own agent
+        play.play_tournament_game({"name": "Same", "scoring": [], "depth": depth}, opponent, 0)
+    assert sorted(agent.search_depth for agent in play._tournament_agents.values() if agent.name == "Same") == [1, 2]
+
+
+def test_tournament_profile_covers_games_in_worker_processes(monkeypatch):
+    monkeypatch.setattr(play, "BOARD_SIZE", (4, 4))
+    monkeypatch.setattr(play, "WINNING_SIZE", 3)
+    monkeypatch.setattr(play, "PRINT_MOVES", False)
+    configs = [{"name": "D1", "scoring": [], "depth": 1}, {"name": "D2", "scoring": [], "depth": 2}]
+    expected = play.run_tournament_parallel(configs, 2, 1)
+    for workers in (1, 2):
+        profiler = Profiler("deterministic")
+        assert play.run_tournament_parallel(configs, 2, workers, profiler) == expected
+        assert {stack[0] for stack in profiler.stacks} == {"mnk.play:play_tournament_game"}
+        functions = [row[0] for row in profiler.hot_functions(limit=None)]
+        assert "mnk.Agent:Agent.negamax" in functions and "mnk.Agent:Agent.generate_next_moves" in functions
+
+def test_benchmark_corpus_is_fixed_and_suite_flags_regressions():
+    corpus = board_corpus(6, 6, 4, size=4)
+    assert len(corpus) == 12
+    for (board, last_move), (again, again_last_move) in zip(corpus, board_corpus(6, 6, 4, size=4)):
+        assert np.array_equal(board, again) and last_move == again_last_move
+        assert board[last_move] != EMPTY
+        for cell in np.flatnonzero(board != EMPTY):
+            player = board[cell]
+            board[cell] = EMPTY
+            assert not is_winning_move(board, cell, player, 6, 6, 4) # No line anywhere
+            board[cell] = player
+    assert [int(np.count_nonzero(board != EMPTY)) for board, _ in corpus[::4]] == [3, 9, 18]
+
+    results = run_suite(["evaluate"], warmup=0, repeat=3, min_sample_seconds=0.001, boards=[(6, 6, 4)], search_boards=[], game_boards=[])
+    assert set(results["results"]) == {"evaluate[array]/6x6x4", "evaluate[bitboard]/6x6x4"}
+    for result in results["results"].values():
+        assert len(result["samples"]) == 3 and result["median"] > 0 and result["relative"] > 0
+    assert [row[4] for row in compare(results, results)] == ["ok", "ok"]
+    slower = {"meta": results["meta"], "results": {name: dict(result, relative=result["relative"] * 2) for name, result in results["results"].items()}}
+    assert [(row[3], row[4]) for row in compare(slower, results)] == [(2.0, "slower"), (2.0, "slower")]
+    assert [row[4] for row in compare(results, slower)] == ["faster", "faster"]
@@ -0,0 +1,527 @@
+from mnk.Agent import Agent
+from mnk.Game import Game
+from mnk.symmetry import canonical_hash, symmetry_group, unique_moves
+from mnk.tablebase import Tablebase, solve, write_tablebase
+from mnk.book import OpeningBook, book_positions, build_book, write_book
+from mnk.rules import is_winning_move
+from mnk.threats import ThreatSearch
+from mnk.pns import ProofNumberSearch
+from mnk.profiling import Profiler
+from mnk.mcts import random_playouts
+from mnk.windows import window_indices
+from mnk.ordering import MoveOrderer
+from mnk.transposition import EXACT, LOWER_BOUND, SHARED_ENTRY_DTYPE, SharedTranspositionTable, TranspositionTable, zobrist_hash
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import json
+import time
+
+from mnk.constants import EMPTY, NOONE
+
+CIRCLE_OF_ONE = [(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2) if (dx, dy) != (0, 0)]
+
+def make_agent(player_number, board_size, winning_size, depth, **options):
+    return Agent(player_number=player_number, board_size=board_size, winning_size=winning_size, scoring_array=[],
+                 circle_of_two=CIRCLE_OF_ONE, name=f"SearchAgent_P{player_number}", depth=depth, **options)
+
+def search(agent, board):
+    game = Game(agent.board_size, agent.winning_size, end_turn_print=False)
+    game.board = np.array(board, dtype=np.int32)
+    game.player_turn = agent.player_number
+    agent.set_game(game)
+    return agent.get_next_move()
+
+def test_transposition_table_replacement_and_counters():
+    tt = TranspositionTable(max_bytes=2 * TranspositionTable.ENTRY_BYTES) # A single bucket
+    assert tt.probe(1) is None
+    tt.store(1, 5, 0.5, EXACT, 3)
+    tt.store(2, 2, 0.1, LOWER_BOUND, 4) # Shallower: goes to the always-replace slot
+    assert tt.probe(1) == (0.5, 5, EXACT, 3)
+    assert tt.probe(2) == (0.1, 2, LOWER_BOUND, 4)
+    tt.store(3, 1, 0.2, EXACT, 5) # Evicts 2, keeps the deep entry
+    assert tt.probe(2) is None
+    assert tt.probe(1) is not None
+    stats = tt.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 2 and stats["collisions"] == 1
+
+def test_search_hash_is_maintained_incrementally():
+    agent = make_agent(0, (4, 4), 3, depth=2, engine="bitboard")
+    board = np.full(16, EMPTY, dtype=np.int32)
+    board[5] = 0
+    state = agent.new_search_state(board)
+    agent.make_move(state, 6, 1)
+    board[6] = 1
+    assert state["hash"] == zobrist_hash(board)
+    agent.unmake_move(state, 6, 1, None)
+    board[6] = EMPTY
+    assert state["hash"] == zobrist_hash(board)
+
+def test_transposition_table_keeps_decisions_and_saves_nodes():
+    board = np.full(36, EMPTY, dtype=np.int32)
+    board[[14, 15, 20]] = 0
+    board[[21, 16]] = 1
+    plain = make_agent(1, (6, 6), 4, depth=4)
+    cached = make_agent(1, (6, 6), 4, depth=4, tt_size_mb=4)
+    assert search(cached, board) == search(plain, board)
+    assert cached.states_evaluated < plain.states_evaluated
+    assert cached.transposition_table.hits > 0
+
+def test_deadline_bounds_search_time_and_keeps_completed_iteration():
+    board = np.full(15 * 15, EMPTY, dtype=np.int32)
+    board[[112, 113, 127]] = 0
+    board[[111, 98]] = 1
+    agent = make_agent(1, (15, 15), 5, depth=8, time_limit=0.3)
+    start = time.time()
+    move = search(agent, board)
+    assert time.time() - start < 2.0
+    assert board[move] == EMPTY
+    assert 1 <= agent.completed_depth_in_last_move < 8
+
+def test_iterative_deepening_stops_on_proven_result():
+    board = np.full(16, EMPTY, dtype=np.int32)
+    board[[0, 1]] = 0
+    board[[4, 5]] = 1
+    agent = make_agent(0, (4, 4), 3, depth=5)
+    assert search(agent, board) == 2
+    assert agent.completed_depth_in_last_move == 1
+    assert agent.pv_line == [2]
+
+def test_move_ordering_puts_wins_then_blocks_then_killers_first():
+    for engine in ("array", "bitboard"):
+        agent = make_agent(0, (5, 5), 3, depth=3, engine=engine)
+        board = np.full(25, EMPTY, dtype=np.int32)
+        board[[0, 1]] = 0 # X X . -> 2 wins
+        board[[10, 11]] = 1 # O O . -> 12 blocks
+        state = agent.new_search_state(board)
+        agent.orderer.killers[1] = [7, 6]
+        moves = agent.generate_next_moves(state)
+        ordered = agent.order_moves(state, moves, 0, ply=1)
+        assert ordered[:4] == [2, 12, 7, 6]
+        assert sorted(ordered) == sorted(moves)
+        assert agent.order_moves(state, moves, 0, ply=1, tt_move=16)[0] == 16
+
+def test_cutoffs_update_killers_history_and_statistics():
+    board = np.full(64, EMPTY, dtype=np.int32)
+    board[[27, 28, 36]] = 0
+    board[[35, 19]] = 1
+    agent = make_agent(1, (8, 8), 4, depth=3)
+    search(agent, board)
+    statistics = agent.ordering_statistics()
+    assert statistics["cutoffs"] > 0
+    assert 0.5 < statistics["first_move_cutoff_rate"] <= 1.0
+    assert statistics["effective_branching_factor"] > 1.0
+    assert any(score > 0 for score in agent.orderer.history[0] + agent.orderer.history[1])
+
+    orderer = MoveOrderer(64)
+    orderer.record_cutoff(5, 0, 2, 3, 0, quiet=False) # A win, block or PV/TT move: history only
+    assert orderer.killers[2] == [None, None] and orderer.history[0][5] == 9
+    orderer.record_cutoff(6, 0, 2, 3, 1)
+    assert orderer.killers[2] == [6, None]
+
+def test_move_ordering_keeps_values_and_saves_nodes():
+    board = np.full(100, EMPTY, dtype=np.int32)
+    board[[44, 45, 54, 55]] = [0, 1, 1, 0]
+    board[[34, 66]] = [0, 1]
+    unordered = make_agent(0, (10, 10), 5, depth=4, engine="bitboard", move_ordering=False)
+    ordered = make_agent(0, (10, 10), 5, depth=4, engine="bitboard")
+    search(unordered, board)
+    search(ordered, board)
+    assert ordered.states_evaluated < unordered.states_evaluated
+    values = []
+    for agent in (unordered, ordered):
+        state = agent.new_search_state(board)
+        values.append(agent.search_root(state, agent.generate_next_moves(state), 3)[1])
+    assert values[0] == values[1]
+
+def full_minimax(agent, state, depth, player):
+    """Minimax value for player 0 without any pruning: the reference for the alpha-beta searches."""
+    game_over, winner = agent.is_game_over(state)
+    if game_over or depth == 0:
+        return agent.evaluate(state, winner if game_over else NOONE)
+    values = []
+    for move in agent.generate_next_moves(state):
+        previous_last_move = agent.make_move(state, move, player)
+        values.append(full_minimax(agent, state, depth - 1, 1 - player))
+        agent.unmake_move(state, move, player, previous_last_move)
+    return max(values) if player == 0 else min(values)
+
+def test_principal_variation_search_matches_full_minimax_and_saves_nodes():
+    nodes = {}
+    for stones in ([12], [12, 13], [12, 13, 7], [12, 13, 7, 17], [12, 6, 18, 8], [11, 12, 13]):
+        board = np.full(25, EMPTY, dtype=np.int32)
+        board[stones] = [i % 2 for i in range(len(stones))]
+        player = len(stones) % 2
+        reference = make_agent(player, (5, 5), 4, depth=4)
+        expected = full_minimax(reference, reference.new_search_state(board), 4, player)
+        for name, options in (("alpha_beta", {"pvs": False}), ("pvs", {}), ("aspiration", {"aspiration_window": 0.25})):
+            agent = make_agent(player, (5, 5), 4, depth=4, **options)
+            search(agent, board)
+            assert agent.last_move_value == expected
+            nodes[name] = nodes.get(name, 0) + agent.states_evaluated
+    assert nodes["pvs"] < nodes["alpha_beta"]
+    # From the same side to move, the minimax wrapper agrees with negamax
+    agent = make_agent(0, (5, 5), 4, depth=2)
+    state = agent.new_search_state(np.full(25, EMPTY, dtype=np.int32))
+    assert agent.minimax(state, 2, float("-inf"), float("inf"), False) == -agent.negamax(state, 2, float("-inf"), float("inf"), 1)
+
+def test_late_move_reductions_and_futility_pruning_save_nodes_and_keep_tactics():
+    board = np.full(81, EMPTY, dtype=np.int32)
+    board[[40, 41, 31, 49]] = [0, 1, 0, 1]
+    agents = {}
+    for name, options in (("full", {}), ("lmr", {"late_move_reductions": 3}), ("futility", {"futility_margin": 0.2})):
+        agents[name] = make_agent(0, (9, 9), 5, depth=5, engine="bitboard", **options)
+        search(agents[name], board)
+    stats = {name: agent.last_search_stats for name, agent in agents.items()}
+    assert stats["lmr"].nodes < stats["full"].nodes
+    assert stats["lmr"].reduced_moves > stats["lmr"].reduction_researches > 0
+    assert stats["futility"].nodes < stats["full"].nodes
+    assert stats["futility"].futility_pruned > 0
+    assert stats["full"].reduced_moves == stats["full"].futility_pruned == 0
+
+    # Wins and blocks are never reduced or pruned
+    board = np.full(81, EMPTY, dtype=np.int32)
+    board[[36, 37, 38, 39]] = 0
+    board[[10, 11, 12, 20]] = 1
+    for player in (0, 1):
+        agent = make_agent(player, (9, 9), 5, depth=4, engine="bitboard", late_move_reductions=1, futility_margin=0.1)
+        assert search(agent, board) == 40
+        assert agent.last_move_value == 1.0 if player == 0 else agent.last_move_value < 1.0 # The block saves player 1
+
+def test_symmetry_group_and_canonical_hash():
+    assert len(symmetry_group(3, 3, CIRCLE_OF_ONE)) == 8
+    assert len(symmetry_group(4, 3, CIRCLE_OF_ONE)) == 4
+    assert len(symmetry_group(3, 3, [(1, 0), (2, 0)])) == 2 # Only identity and flip_y keep a one-sided neighbourhood
+    group = symmetry_group(3, 3, CIRCLE_OF_ONE)
+    corners = []
+    for corner in (0, 2, 6, 8):
+        board = np.full(9, EMPTY, dtype=np.int32)
+        board[[corner, 4]] = [0, 1]
+        corners.append(canonical_hash(board, group)[0])
+    assert len(set(corners)) == 1
+
+def test_symmetric_root_moves_are_searched_once():
+    agent = make_agent(0, (3, 3), 3, depth=2, symmetry_plies=1)
+    state = agent.new_search_state(np.full(9, EMPTY, dtype=np.int32))
+    assert unique_moves(list(range(9)), agent.symmetries, state["hashes"]) == [0, 1, 4] # Corner, edge, centre
+    agent.make_move(state, 4, 0)
+    assert unique_moves([0, 1, 2, 3, 5, 6, 7, 8], agent.symmetries, state["hashes"]) == [0, 1]
+
+def test_symmetry_keeps_values_and_saves_nodes():
+    board = np.full(49, EMPTY, dtype=np.int32)
+    board[24] = 0
+    plain = make_agent(1, (7, 7), 4, depth=3, tt_size_mb=8)
+    symmetric = make_agent(1, (7, 7), 4, depth=3, tt_size_mb=8, symmetry_plies=2)
+    values, nodes = [], []
+    for agent in (plain, symmetric):
+        search(agent, board)
+        nodes.append(agent.states_evaluated)
+        agent.forget()
+        state = agent.new_search_state(board)
+        values.append(agent.search_root(state, agent.generate_next_moves(state), 3)[1])
+    assert values[0] == values[1]
+    assert nodes[1] < nodes[0]
+
+def test_parallel_root_search_matches_serial_move_and_value():
+    boards = []
+    board = np.full(36, EMPTY, dtype=np.int32)
+    board[[14, 15, 21]] = [0, 1, 0]
+    boards.append(board)
+    board = np.full(36, EMPTY, dtype=np.int32)
+    board[[14, 20, 15, 21]] = [0, 1, 0, 1]
+    boards.append(board)
+    for player, board in zip((1, 0), boards):
+        serial = make_agent(player, (6, 6), 4, depth=3)
+        parallel = make_agent(player, (6, 6), 4, depth=3, workers=2)
+        try:
+            parallel.start_workers() # As benchmark_parallel.py does before timing a move: no search, same result
+            assert parallel.root_split is not None and len(parallel.root_split.start()) <= 2
+            assert search(parallel, board) == search(serial, board)
+            state = serial.new_search_state(board)
+            moves = serial.generate_next_moves(state)
+            assert parallel.search_root_parallel(board, moves, 3) == serial.search_root(state, moves, 3)
+        finally:
+            parallel.close()
+
+def store_in_shared_table(name, max_bytes):
+    table = SharedTranspositionTable.attach(name, max_bytes)
+    table.store(7, 3, -0.4, LOWER_BOUND, 12)
+    table.close()
+
+def test_shared_transposition_table_is_shared_and_rejects_torn_slots():
+    max_bytes = 4 * SHARED_ENTRY_DTYPE.itemsize # Two buckets
+    table = SharedTranspositionTable(max_bytes)
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            executor.submit(store_in_shared_table, table.name, max_bytes).result()
+        assert table.probe(7) == (-0.4, 3, LOWER_BOUND, 12)
+        table.store(8, 1, 0.0, EXACT, None)
+        assert table.probe(8) == (0.0, 1, EXACT, None)
+        assert len(table) == 2
+        table.values[(7 & table.mask) << 1] = 0.9 # As if another process were halfway through rewriting the slot
+        assert table.probe(7) is None
+    finally:
+        table.close()
+
+def test_lazy_smp_search_completes_full_depth_and_finds_forced_win():
+    board = np.full(36, EMPTY, dtype=np.int32)
+    board[[13, 14, 15]] = 0 # Open three on a k=4 board: P0 wins next move
+    board[[20, 27, 8]] = 1
+    for workers in (2, 3):
+        agent = make_agent(0, (6, 6), 4, depth=3, workers=workers, parallel="lazy_smp", tt_size_mb=1)
+        try:
+            assert search(agent, board) in (12, 16)
+            assert agent.completed_depth_in_last_move >= 1
+        finally:
+            agent.close()
+    quiet = np.full(36, EMPTY, dtype=np.int32)
+    quiet[[14, 21]] = [0, 1]
+    serial = make_agent(0, (6, 6), 4, depth=3)
+    parallel = make_agent(0, (6, 6), 4, depth=3, workers=2, parallel="lazy_smp")
+    try:
+        assert search(parallel, quiet) in serial.generate_next_moves(serial.new_search_state(quiet))
+        assert parallel.completed_depth_in_last_move == 3
+    finally:
+        parallel.close()
+
+def test_tablebase_solves_small_boards_and_agrees_with_full_search(tmp_path):
+    table = solve(3, 3, 3)
+    assert len(table) == 627 # 765 distinct tic-tac-toe positions, minus the 138 where the game is over
+    assert table[0] == (0, 9)
+    path = str(tmp_path / "3x3x3.mnktb")
+    write_tablebase(path, 3, 3, 3, table)
+    tablebase = Tablebase(path)
+    assert len(tablebase) == 627 and tablebase.probe(np.full(9, EMPTY)) == (0, 9)
+
+    rng = np.random.default_rng(5)
+    searcher = Agent(player_number=0, board_size=(3, 3), winning_size=3, scoring_array=[], circle_of_two=CIRCLE_OF_ONE, depth=9)
+    for _ in range(15):
+        board = np.full(9, EMPTY, dtype=np.int32)
+        for ply, move in enumerate(rng.permutation(9)[:rng.integers(1, 6)]):
+            if searcher.is_game_over({"board_state": board})[0]:
+                break
+            board[move] = ply % 2
+        if searcher.is_game_over({"board_state": board})[0]:
+            continue
+        player = int(np.count_nonzero(board != EMPTY) % 2)
+        state = searcher.new_search_state(board)
+        searcher.player_number = player
+        value = searcher.search_root(state, [int(m) for m in np.flatnonzero(board == EMPTY)], 9)[1]
+        assert tablebase.probe(board)[0] == value
+
+def test_agent_plays_tablebase_moves(tmp_path):
+    path = str(tmp_path / "4x3x3.mnktb")
+    write_tablebase(path, 4, 3, 3, solve(4, 3, 3))
+    agent = make_agent(0, (4, 3), 3, depth=1, tablebase=path)
+    move, outcome, distance = agent.tablebase.best_move(np.full(12, EMPTY), 0)
+    assert outcome == 1 and distance == 7 # First player wins 4,3,3
+    assert search(agent, np.full(12, EMPTY, dtype=np.int32)) == move
+    assert agent.states_evaluated == 0
+    board = np.full(12, EMPTY, dtype=np.int32)
+    board[[0, 1, 4, 5]] = [0, 0, 1, 1]
+    assert search(agent, board) == 2 # Immediate win, the shortest distance
+    try:
+        make_agent(0, (4, 4), 3, depth=1, tablebase=path)
+        assert False, "a 4x3 tablebase must not load for a 4x4 agent"
+    except ValueError:
+        pass
+
+def test_opening_book_is_canonical_deterministic_and_played_before_search(tmp_path):
+    args = (6, 6, 4, CIRCLE_OF_ONE, 3, 2)
+    book, symmetries = build_book(*args, workers=1, tt_size_mb=1)
+    positions = book_positions(6, 6, 4, CIRCLE_OF_ONE, 3)
+    assert len(book) == len(positions)
+    assert [np.count_nonzero(board != EMPTY) for board in positions[:8]] == [0] + [1] * 6 + [2] # 6 first moves up to symmetry
+    assert build_book(*args, workers=2, tt_size_mb=1) == (book, symmetries)
+    path = str(tmp_path / "6x6x4.book")
+    write_book(path, 6, 6, 4, 3, symmetries, book)
+    opening_book = OpeningBook(path)
+    assert len(opening_book) == len(book) and opening_book.exit_ply == 3
+
+    # The book answers mirror images of a position with the mirrored move
+    board = np.full(36, EMPTY, dtype=np.int32)
+    board[14] = 0
+    move = opening_book.lookup(board)[0]
+    mirrored = np.full(36, EMPTY, dtype=np.int32)
+    mirrored[15] = 0 # (2, 2) -> (3, 2) under flip_x
+    x, y = move % 6, move // 6
+    assert opening_book.lookup(mirrored)[0] == y * 6 + (5 - x)
+
+    agent = make_agent(1, (6, 6), 4, depth=2, opening_book=path)
+    assert search(agent, board) == move and agent.states_evaluated == 0
+    board[move] = 1
+    board[7] = 0
+    search(agent, board) # Past the exit ply: searched
+    assert agent.states_evaluated > 0
+
+
+def test_threat_search_finds_forced_wins_beyond_full_width_depth():
+    board = np.full(81, EMPTY, dtype=np.int32)
+    for cell, player in [(21, 1), (22, 1), (23, 0), (24, 1), (33, 1), (38, 0), (50, 0), (56, 1), (57, 1), (58, 0), (59, 0), (60, 0)]:
+        board[cell] = player
+    threats = ThreatSearch(9, 9, 5)
+    line = threats.find_win(board, 0)
+    nodes = threats.nodes
+    assert len(line) == 9 and nodes < 20
+    assert threats.find_win(board, 0, node_budget=3) is None
+    assert threats.find_win(board, 1) is None
+    # Playing out the line: every defender reply blocks the attacker's only winning cell, the last move wins
+    played = board.copy()
+    for ply, move in enumerate(line):
+        assert played[move] == EMPTY
+        assert is_winning_move(played, move, ply % 2, 9, 9, 5) == (ply == len(line) - 1)
+        played[move] = ply % 2
+
+    full_width = make_agent(0, (9, 9), 5, depth=3, engine="bitboard")
+    search(full_width, board)
+    assert full_width.last_move_value < 1.0 # The win is 9 plies deep
+    agent = make_agent(0, (9, 9), 5, depth=3, engine="bitboard", threat_search_nodes=1000)
+    assert search(agent, board) == line[0]
+    assert agent.last_move_value == 1.0 and agent.states_evaluated == nodes < full_width.states_evaluated
+
+
+def replay_line(board, player_to_move, line, winning_size, width, height):
+    """Play line out on a copy of board; returns the winner (None if nobody completes a line), checking legality."""
+    board = np.array(board, dtype=np.int32)
+    for ply, move in enumerate(line):
+        player = (player_to_move + ply) % 2
+        assert board[move] == EMPTY
+        if is_winning_move(board, move, player, width, height, winning_size):
+            assert ply == len(line) - 1
+            return player
+        board[move] = player
+    return None
+
+
+def test_proof_number_search_proves_outcomes_with_principal_lines(tmp_path):
+    # Every reachable 3,3,3 position agrees with the exhaustive tablebase
+    path = str(tmp_path / "3x3x3.mnktb")
+    write_tablebase(path, 3, 3, 3, solve(3, 3, 3))
+    tablebase = Tablebase(path)
+    prover = ProofNumberSearch(3, 3, 3, CIRCLE_OF_ONE)
+    rng = np.random.default_rng(5)
+    for _ in range(40):
+        board = np.full(9, EMPTY, dtype=np.int32)
+        for ply in range(rng.integers(0, 6)):
+            move = rng.choice(np.flatnonzero(board == EMPTY))
+            if is_winning_move(board, move, ply % 2, 3, 3, 3):
+                break
+            board[move] = ply % 2
+        player = int(np.count_nonzero(board != EMPTY) % 2)
+        outcome, line = prover.solve(board, player)
+        assert outcome == tablebase.probe(board)[0]
+        winner = replay_line(board, player, line, 3, 3, 3)
+        assert outcome == (0 if winner is None else 1 - 2 * winner)
+
+    # 4,4,3 is a first-player win, proven in a few dozen nodes (exhaustive minimax visits 434k positions)
+    agent = make_agent(0, (4, 4), 3, depth=1)
+    outcome, line = agent.solve(np.full(16, EMPTY, dtype=np.int32), 0)
+    assert outcome == 1 and agent.proof_search.nodes < 200
+    assert replay_line(np.full(16, EMPTY), 0, line, 3, 4, 4) == 0
+
+    # A 5,5,4 position won by player 0, to move
+    board = np.full(25, EMPTY, dtype=np.int32)
+    for cell, player in [(12, 0), (7, 1), (6, 0), (18, 1)]:
+        board[cell] = player
+    prover = ProofNumberSearch(5, 5, 4, CIRCLE_OF_ONE)
+    assert prover.solve(board, 0, max_nodes=50) == (None, [])
+    outcome, line = prover.solve(board, 0)
+    assert outcome == 1 and replay_line(board, 0, line, 4, 5, 5) == 0
+
+    # A small memory bound still proves the result: the least-worked entries are collected and searched again
+    small = ProofNumberSearch(5, 5, 4, CIRCLE_OF_ONE, max_entries=300)
+    assert small.solve(board, 0, max_nodes=20000)[0] == 1 and small.collections > 0
+    assert max(len(table) for table in small.tables) <= 300
+
+
+def test_random_playouts_match_sequential_games():
+    windows = window_indices(5, 5, 4)
+    boards = np.full((64, 25), EMPTY, dtype=np.int8)
+    boards[:, 12] = 0
+    boards[:32, 6] = 1
+    to_move = np.where(np.arange(64) < 32, 0, 1).astype(np.int8)
+    winners = random_playouts(boards, to_move, windows, np.random.default_rng(3))
+    keys = np.random.default_rng(3).random((64, 25)) # The cell order random_playouts drew
+    for board, player, key, winner in zip(boards.astype(np.int32), to_move.tolist(), keys, winners.tolist()):
+        board = board.copy()
+        expected = NOONE
+        for cell in sorted(np.flatnonzero(board == EMPTY).tolist(), key=lambda cell: key[cell]):
+            if is_winning_move(board, cell, player, 5, 5, 4):
+                expected = player
+                break
+            board[cell] = player
+            player = 1 - player
+        assert winner == expected
+
+
+def test_mcts_agent_wins_blocks_and_reports_playouts():
+    board = np.full(49, EMPTY, dtype=np.int32)
+    board[[22, 23, 24]] = 0 # Open three on row 3
+    board[[15, 16]] = 1
+    agent = make_agent(0, (7, 7), 4, depth=1, strategy="mcts", mcts_playouts=512)
+    assert search(agent, board) in (21, 25) and agent.last_move_value == 1.0
+    blocker = make_agent(1, (7, 7), 4, depth=1, strategy="mcts", mcts_playouts=512)
+    board[40] = 1
+    assert search(blocker, board) in (21, 25) # Must block; blocking one end still loses to the other
+    # A quiet position: the search runs its playouts and grows an array-backed tree
+    quiet = np.full(49, EMPTY, dtype=np.int32)
+    quiet[[24, 25]] = [0, 1]
+    agent.mcts.rng = np.random.default_rng(0)
+    move = search(agent, quiet)
+    assert quiet[move] == EMPTY
+    assert agent.mcts.playouts >= 512 and agent.mcts.playouts_per_second > 0
+    assert agent.mcts.size > agent.mcts.child_count[0] and agent.mcts.visits[0] == agent.mcts.playouts
+
+def test_search_stats_match_the_plain_search_and_add_up():
+    board = np.full(36, EMPTY, dtype=np.int32)
+    board[[13, 14, 15, 12, 8]] = [0, 0, 0, 1, 1] # Player 1 to move has to block the open end of the three
+    reported = []
+    plain = make_agent(1, (6, 6), 4, depth=3, tt_size_mb=1)
+    detailed = make_agent(1, (6, 6), 4, depth=3, tt_size_mb=1, search_stats=True, stats_callback=reported.append)
+    assert "negamax" not in vars(plain) and "negamax" in vars(detailed) # Only the detailed agent runs wrapped methods
+    move = search(plain, board)
+    assert search(detailed, board) == move == 16 and reported == [detailed.last_search_stats]
+
+    stats, plain_stats = detailed.last_search_stats, plain.last_search_stats
+    assert stats.source == plain_stats.source == "search" and stats.move == move and stats.value == plain_stats.value
+    assert stats.nodes == plain_stats.nodes == sum(stats.nodes_by_ply[1:]) == sum(stats.iteration_nodes)
+    assert not plain_stats.detailed and plain_stats.nodes_by_ply == [] and plain_stats.depth == stats.depth == 3
+    assert stats.nodes_by_ply[0] == 3 and stats.max_ply == 3 # One root search per iteration
+    assert 0 < stats.terminal_hits <= stats.leaves < stats.nodes and stats.leaves == sum(stats.leaves_by_ply)
+    assert stats.leaves_by_ply[3] == stats.nodes_by_ply[3] # The horizon
+    assert len(stats.branching_factors()) == 3 and all(factor > 1 for factor in stats.branching_factors())
+    assert 0 < stats.tt_hits < stats.tt_probes and stats.tt_hit_rate == stats.tt_hits / stats.tt_probes
+    assert sum(stats.cutoffs_by_move_index) > 0 and stats.nodes_per_second > 0
+    assert stats.root_values[move] == stats.value and set(stats.root_values) <= set(detailed.generate_next_moves(detailed.new_search_state(board)))
+    split = stats.time_split()
+    assert all(seconds > 0 for seconds in split.values()) and abs(sum(split.values()) - stats.elapsed) < 1e-9
+    assert json.loads(json.dumps(stats.as_dict()))["time_split"].keys() == split.keys()
+
+def test_profiler_collects_stacks_of_serial_and_worker_searches(tmp_path):
+    board = np.full(64, EMPTY, dtype=np.int32)
+    board[[27, 28, 36]] = [0, 1, 0]
+    expected = search(make_agent(1, (8, 8), 5, depth=3), board)
+    for mode, workers in (("deterministic", 1), ("deterministic", 2), ("sample", 1)):
+        profiler = Profiler(mode, interval=0.0005)
+        agent = make_agent(1, (8, 8), 5, depth=3, workers=workers, profile=profiler)
+        try:
+            assert [search(agent, board) for _ in range(2)] == [expected, expected] # Both moves add to one profile
+        finally:
+            agent.close()
+        functions = [row[0] for row in profiler.hot_functions()]
+        assert profiler.total_seconds > 0 and any(label.startswith("mnk.") for label in functions)
+        if mode == "deterministic":
+            assert "mnk.Agent:Agent.negamax" in functions
+            # The workers' stacks were sent back; the table splits their time by mnk function too
+            workers_stacks = [stack for stack in profiler.stacks if stack[0] == "mnk.parallel:_search_root_move"]
+            assert bool(workers_stacks) == (workers > 1)
+    assert agent.profiler is profiler and make_agent(1, (8, 8), 5, depth=1, profile="sample").profiler.mode == "sample"
+
+    profiler = Profiler("deterministic")
+    search(make_agent(1, (8, 8), 5, depth=2, profile=profiler), board)
+    collapsed, table = profiler.write(tmp_path / "profile")
+    lines = open(collapsed).read().splitlines()
+    assert all(line.startswith("mnk.Agent:Agent.get_next_move") and int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+    for function in ("is_game_over", "generate_next_moves", "evaluate"):
+        assert any(f"mnk.Agent:Agent.{function}" in line for line in lines)
+    assert "mnk.Agent:Agent.negamax" in open(table).read()
+    assert abs(sum(row[1] for row in profiler.hot_functions(limit=None)) - profiler.total_seconds) < 1e-9